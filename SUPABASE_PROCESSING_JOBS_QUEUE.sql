@@ -0,0 +1,22 @@
+-- Processing Job Queue Extension
+-- Adds the columns used by POST /inference/jobs and the job workers to an
+-- existing processing_jobs table. Safe to run more than once.
+
+-- 1. Anonymous inference jobs are queued without an owning document/organization
+ALTER TABLE public.processing_jobs ALTER COLUMN organization_id DROP NOT NULL;
+ALTER TABLE public.processing_jobs ALTER COLUMN document_id DROP NOT NULL;
+
+-- 2. Queue payload, result and retry bookkeeping
+ALTER TABLE public.processing_jobs ADD COLUMN IF NOT EXISTS max_retries integer DEFAULT 3;
+ALTER TABLE public.processing_jobs ADD COLUMN IF NOT EXISTS file_path text;
+ALTER TABLE public.processing_jobs ADD COLUMN IF NOT EXISTS file_name text;
+ALTER TABLE public.processing_jobs ADD COLUMN IF NOT EXISTS result jsonb;
+ALTER TABLE public.processing_jobs ADD COLUMN IF NOT EXISTS locked_by text;
+ALTER TABLE public.processing_jobs ADD COLUMN IF NOT EXISTS run_after timestamp with time zone DEFAULT timezone('utc'::text, now());
+
+-- 3. Claim index: workers run
+--    SELECT ... WHERE status = 'pending' AND run_after <= now()
+--    ORDER BY priority DESC, created_at FOR UPDATE SKIP LOCKED LIMIT 1
+CREATE INDEX IF NOT EXISTS idx_processing_jobs_claim
+    ON public.processing_jobs (status, priority DESC, created_at)
+    WHERE status = 'pending';
@@ -1,8 +1,21 @@
-import multiprocessing
+import logging
+import os
+
+from models.model_sharing import preload_enabled, preload_models, recommend_worker_count, after_fork
+
+logging.basicConfig(level=logging.INFO)
+
+# PRELOAD_MODELS=true loads spaCy/LayoutLMv3/the active model once in the master;
+# forked workers share those pages copy-on-write instead of loading their own copies
+_preload = preload_models() if preload_enabled() else None
+
+# Worker count from model footprint and memory (GUNICORN_WORKERS overrides)
+_recommendation = recommend_worker_count(shared_mb=_preload["shared_mb"] if _preload and _preload["shared_mb"] else None)
+logging.getLogger("gunicorn.config").info(f"Worker recommendation: {_recommendation}")
 
 # Gunicorn config
 bind = "0.0.0.0:8000"
-workers = multiprocessing.cpu_count() * 2 + 1
+workers = int(os.getenv("GUNICORN_WORKERS", "0")) or _recommendation["workers"]
 worker_class = "uvicorn.workers.UvicornWorker"
 timeout = 300  # 5 minutes
 keepalive = 5
@@ -10,4 +23,8 @@ max_requests = 1000
 max_requests_jitter = 50
 accesslog = "-"
 errorlog = "-"
-loglevel = "info"
\ No newline at end of file
+loglevel = "info"
+
+
+def post_fork(server, worker):
+    after_fork(workers)
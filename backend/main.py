@@ -9,7 +9,12 @@ import json
 from PIL import Image
 import io
 import shutil
-from models.document_processor import DocumentProcessor
+from models.model_registry import registry, get_shared_document_processor, get_shared_active_model_manager
+from models.model_sharing import process_memory
+from models.inference_pool import InferencePool, PoolSaturatedError
+from models.job_queue import JobQueue, JobWorker
+from models.database import init_database, get_pool_stats
+from models.auth_cache import get_auth_cache_stats
 from routers import annotation, training, supabase_auth
 from pdf2image import convert_from_bytes
 import magic
@@ -17,7 +22,6 @@ import fitz  # PyMuPDF
 from pathlib import Path
 from datetime import datetime
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
 import time
 import uvicorn
 from log import logger
@@ -60,13 +64,19 @@ os.makedirs("models", exist_ok=True)
 os.makedirs("models/layout", exist_ok=True)
 os.makedirs("models/spacy", exist_ok=True)
 
-# Initialize document processor with thread pool
-MAX_WORKERS = 4  # Adjust based on your server capacity
-thread_pool = ThreadPoolExecutor(max_workers=MAX_WORKERS)
-document_processor = DocumentProcessor()
+# Initialize document processor with a bounded inference pool
+# (INFERENCE_MAX_WORKERS / INFERENCE_MAX_QUEUE / INFERENCE_POOL_MODE=thread|process)
+inference_pool = InferencePool()
+MAX_WORKERS = inference_pool.max_workers
+document_processor = get_shared_document_processor()
 
-# Request tracking
-active_requests: Dict[str, Dict[str, Any]] = {}
+# Background job queue (processing_jobs table; JOBS_DATABASE_URL, SQLite stand-in by default)
+try:
+    job_queue = JobQueue()
+except Exception as e:
+    logger.warning(f"Job queue not available: {str(e)}")
+    job_queue = None
+job_worker: Optional[JobWorker] = None
 
 # Include routers
 app.include_router(annotation.router, prefix="/annotation", tags=["annotation"])
@@ -76,8 +86,10 @@ app.include_router(supabase_auth.router, prefix="/auth", tags=["authentication"]
 # Include inference router
 try:
     from routers import inference
-    # Set the global document processor in the inference router
+    # Set the global document processor and inference pool in the inference router
     inference.document_processor = document_processor
+    inference.inference_pool = inference_pool
+    inference.job_queue = job_queue
     app.include_router(inference.router, prefix="/inference", tags=["inference"])
     logger.info("Inference router loaded successfully")
 except ImportError as e:
@@ -120,32 +132,47 @@ async def root():
 
 # Removed duplicate /process-document endpoint - now handled by inference router
 
+def _iso_seconds_between(start: Optional[str], end: Optional[str]) -> Optional[float]:
+    if not start:
+        return None
+    end_dt = datetime.fromisoformat(end) if end else datetime.utcnow()
+    return (end_dt - datetime.fromisoformat(start)).total_seconds()
+
 @app.get("/request-status/{request_id}")
 async def get_request_status(request_id: str) -> Dict[str, Any]:
-    """Get the status of a document processing request."""
-    if request_id not in active_requests:
+    """Get the status of a document processing request (a queued job)."""
+    if job_queue is None:
+        raise HTTPException(status_code=503, detail="Job queue not available")
+    job = await asyncio.to_thread(job_queue.get, request_id)
+    if job is None:
         raise HTTPException(status_code=404, detail="Request not found")
         
-    request_info = active_requests[request_id]
-    if request_info["status"] == "processing":
-        processing_time = time.time() - request_info["start_time"]
+    if job["status"] in ("pending", "processing"):
         return {
-            "status": "processing",
-            "processing_time": processing_time,
-            "filename": request_info["filename"]
+            "status": job["status"],
+            "processing_time": _iso_seconds_between(job["started_at"], None),
+            "filename": job["file_name"],
+            "retry_count": job["retry_count"]
         }
-    elif request_info["status"] == "completed":
+    elif job["status"] == "completed":
         return {
             "status": "completed",
-            "processing_time": request_info["end_time"] - request_info["start_time"],
-            "result": request_info["result"]
+            "processing_time": _iso_seconds_between(job["started_at"], job["completed_at"]),
+            "result": job["result"]
         }
     else:
         return {
             "status": "failed",
-            "error": request_info.get("error", "Unknown error")
+            "error": job.get("error") or "Unknown error"
         }
 
+@app.get("/jobs/{job_id}")
+async def get_job_status(job_id: str) -> Dict[str, Any]:
+    """Poll a job submitted via POST /inference/jobs."""
+    if job_queue is None:
+        raise HTTPException(status_code=503, detail="Job queue not available")
+    return await inference.get_job(job_id, queue=job_queue)
+
 @app.post("/process-folder")
 async def process_folder(
     folder_path: str = Form(...),
@@ -170,8 +197,10 @@ async def process_folder(
         for file_path in folder.glob('**/*'):
             if file_path.suffix.lower() in document_processor.supported_extensions:
                 try:
-                    result = document_processor.process_document(str(file_path))
+                    result = await inference_pool.process_document(document_processor, str(file_path))
                     results[str(file_path)] = result
+                except PoolSaturatedError:
+                    raise
                 except Exception as e:
                     logger.error(f"Error processing {file_path}: {str(e)}")
                     results[str(file_path)] = {
@@ -192,6 +221,10 @@ async def process_folder(
         else:
             return results
             
+    except PoolSaturatedError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error processing folder: {str(e)}")
         raise HTTPException(status_code=400, detail=str(e))
@@ -202,33 +235,45 @@ async def health_check() -> Dict[str, Any]:
     # Check active model status
     active_model_info = {"active": False, "model_name": None}
     try:
-        from models.active_model_manager import ActiveModelManager
-        active_manager = ActiveModelManager()
-        active_model_info = active_manager.get_active_model()
+        active_model_info = get_shared_active_model_manager().get_active_model()
     except Exception as e:
         logger.warning(f"Failed to get active model status: {e}")
     
     return {
         "status": "healthy",
-        "active_requests": len(active_requests),
-        "thread_pool": {
-            "max_workers": MAX_WORKERS,
-            "active_threads": len(thread_pool._threads)
-        },
+        "jobs": job_queue.get_stats() if job_queue else None,
+        "inference_pool": inference_pool.get_stats(),
         "active_model": active_model_info,
         "uptime": time.time() - app.state.start_time
     }
 
+@app.get("/metrics")
+async def metrics() -> Dict[str, Any]:
+    """Resident models (one copy per process), their refcounts and memory."""
+    return {
+        "model_registry": registry.get_stats(),
+        "process_memory": process_memory(),
+        "inference_pool": inference_pool.get_stats(),
+        "database_pool": get_pool_stats(),
+        "auth_cache": get_auth_cache_stats(),
+        "pid": os.getpid()
+    }
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize application state on startup."""
     app.state.start_time = time.time()
     
+    # Schema bootstrap runs once here; request sessions come from the shared pool (DB_POOL_*)
+    if os.getenv("DATABASE_URL"):
+        try:
+            init_database()
+        except Exception as e:
+            logger.warning(f"Database bootstrap failed: {e}")
+    
     # Try to auto-set the latest trained model as active
     try:
-        from models.active_model_manager import ActiveModelManager
-        active_manager = ActiveModelManager()
-        result = active_manager.auto_set_latest_model()
+        result = get_shared_active_model_manager().auto_set_latest_model()
         if result["success"]:
             logger.info(f"Auto-set latest model as active: {result['model_name']}")
         else:
@@ -236,12 +281,20 @@ async def startup_event():
     except Exception as e:
         logger.warning(f"Failed to auto-set active model: {e}")
     
+    # Start the in-process job worker unless jobs are drained by separate worker pods
+    global job_worker
+    if job_queue is not None and os.getenv("JOB_WORKER_ENABLED", "true").lower() in ["1", "true", "yes"]:
+        job_worker = JobWorker(job_queue, document_processor, inference_pool=inference_pool)
+        job_worker.start()
+    
     logger.info("Application startup complete")
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Cleanup on shutdown."""
-    thread_pool.shutdown(wait=True)
+    if job_worker is not None:
+        await job_worker.stop()
+    inference_pool.shutdown(wait=True)
     logger.info("Application shutdown complete")
 
 if __name__ == "__main__":
@@ -1,39 +1,113 @@
 import json
 import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Dict, Any, Optional
 from datetime import datetime
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, workers may each write the pointer
+    fcntl = None
 import torch
+from PIL import Image
 from transformers import LayoutLMv3ForTokenClassification, LayoutLMv3Processor
+from models.model_registry import registry
+from models.model_sharing import load_pretrained
 
 logger = logging.getLogger(__name__)
 
+
+@dataclass(frozen=True)
+class ActiveModelVersion:
+    """Immutable snapshot of the active model.
+
+    Inference reads one snapshot per page and keeps using it even if a swap
+    happens meanwhile; the old weights are freed once the last reader drops it.
+    """
+    version: int
+    model_name: Optional[str] = None
+    model: Any = None
+    processor: Any = None
+    registry_id: Optional[str] = None
+    file_version: Optional[int] = None
+    loaded_at: float = 0.0
+
+
 class ActiveModelManager:
-    """Manages the active model for inference"""
+    """Manages the active model for inference.
+
+    The active model is an atomically replaced, versioned pointer: new models
+    are loaded and warmed before the swap (read-copy-update), and every process
+    watches ``active_model.json`` so a change made in one gunicorn worker is
+    picked up by all of them.
+    """
     
-    def __init__(self, model_dir: str = "models/trained", active_model_file: str = "models/active_model.json"):
+    def __init__(self, model_dir: str = "models/trained", active_model_file: str = "models/active_model.json",
+                 watch_interval: float = None):
         self.model_dir = Path(model_dir)
         self.active_model_file = Path(active_model_file)
         self.active_model_file.parent.mkdir(parents=True, exist_ok=True)
         
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        self._active_model = None
-        self._active_processor = None
-        self._active_model_name = None
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._version_counter = 0
+        self._current = ActiveModelVersion(version=0, loaded_at=time.time())
+        self._loading: Optional[str] = None
+        self._last_error: Optional[str] = None
+        self._file_mtime: Optional[float] = None
         
         # Load active model on initialization
         self._load_active_model()
+
+        # Poll active_model.json so swaps made by other processes propagate here
+        self.watch_interval = float(watch_interval if watch_interval is not None else os.getenv("ACTIVE_MODEL_WATCH_INTERVAL", "5"))
+        self._stop_watch = threading.Event()
+        self._watcher = None
+        if self.watch_interval > 0:
+            self._watcher = threading.Thread(target=self._watch_loop, name="active-model-watch", daemon=True)
+            self._watcher.start()
+
+    # Backwards-compatible views of the current snapshot
+    @property
+    def _active_model(self):
+        return self._current.model
+
+    @property
+    def _active_processor(self):
+        return self._current.processor
+
+    @property
+    def _active_model_name(self) -> Optional[str]:
+        return self._current.model_name
     
+    def _read_active_file(self) -> Optional[Dict[str, Any]]:
+        if not self.active_model_file.exists():
+            return None
+        with self.active_model_file.open('r') as f:
+            return json.load(f)
+
+    def _write_active_file(self, active_info: Dict[str, Any]):
+        """Write atomically so watchers never read a half-written file"""
+        tmp_path = self.active_model_file.with_suffix(f".{os.getpid()}.tmp")
+        with tmp_path.open('w') as f:
+            json.dump(active_info, f, indent=2)
+        os.replace(tmp_path, self.active_model_file)
+        self._file_mtime = self.active_model_file.stat().st_mtime
+
     def _load_active_model(self):
         """Load the active model from disk"""
         try:
             if self.active_model_file.exists():
-                with self.active_model_file.open('r') as f:
-                    active_info = json.load(f)
+                self._file_mtime = self.active_model_file.stat().st_mtime
+                active_info = self._read_active_file()
                 
                 model_name = active_info.get("model_name")
                 if model_name and self._model_exists(model_name):
-                    self._load_model(model_name)
+                    self._load_model(model_name, file_version=active_info.get("version"))
                     logger.info(f"Loaded active model: {model_name}")
                 else:
                     logger.warning(f"Active model {model_name} not found, clearing active model")
@@ -48,38 +122,131 @@ class ActiveModelManager:
         """Check if a model exists"""
         model_path = self.model_dir / model_name
         return model_path.exists() and (model_path / "config.json").exists()
-    
-    def _load_model(self, model_name: str):
-        """Load a specific model into memory"""
+
+    def _registry_id(self, model_name: str) -> str:
+        """Registry key for a model directory; retraining under the same name gets a new key"""
+        model_path = self.model_dir / model_name
+        return f"{model_path}@{int((model_path / 'config.json').stat().st_mtime)}"
+
+    def _warm_up(self, model, processor):
+        """One tiny forward pass so the first real request doesn't pay lazy-init costs"""
         try:
-            model_path = self.model_dir / model_name
-            
-            # Load processor
-            processor = LayoutLMv3Processor.from_pretrained(str(model_path))
-            
-            # Load model
-            model = LayoutLMv3ForTokenClassification.from_pretrained(
+            encoding = processor(Image.new("RGB", (224, 224), "white"), ["warmup"], boxes=[[0, 0, 10, 10]],
+                                 return_tensors="pt")
+            with torch.no_grad():
+                model(**{k: v.to(self.device) for k, v in encoding.items()})
+        except Exception as e:
+            logger.warning(f"Model warm-up failed (continuing): {e}")
+
+    def _build_version(self, model_name: str, file_version: Optional[int] = None) -> ActiveModelVersion:
+        """Load (through the registry) and warm a model without touching the live pointer"""
+        model_path = self.model_dir / model_name
+        registry_id = self._registry_id(model_name)
+
+        processor = registry.acquire(
+            "layoutlmv3-processor", registry_id,
+            lambda: LayoutLMv3Processor.from_pretrained(str(model_path)),
+            precision="-"
+        )
+
+        def load_model():
+            model = load_pretrained(
+                LayoutLMv3ForTokenClassification,
                 str(model_path),
                 num_labels=len(self._get_label_map())
             )
             model.to(self.device)
             model.eval()
-            
-            self._active_model = model
-            self._active_processor = processor
-            self._active_model_name = model_name
-            
-            logger.info(f"Successfully loaded model: {model_name}")
-            
-        except Exception as e:
-            logger.error(f"Error loading model {model_name}: {e}")
-            self._clear_active_model()
+            return model
+        try:
+            model = registry.acquire("layoutlmv3", registry_id, load_model, device=self.device)
+        except Exception:
+            registry.release("layoutlmv3-processor", registry_id, precision="-")
+            raise
+
+        self._warm_up(model, processor)
+        with self._lock:
+            self._version_counter += 1
+            version = self._version_counter
+        return ActiveModelVersion(
+            version=version,
+            model_name=model_name,
+            model=model,
+            processor=processor,
+            registry_id=registry_id,
+            file_version=file_version,
+            loaded_at=time.time()
+        )
+
+    def _swap(self, new_version: ActiveModelVersion):
+        """Publish a new snapshot; readers holding the old one finish on it"""
+        with self._lock:
+            old = self._current
+            self._current = new_version
+        if old.registry_id:
+            # Every version holds its own registry reference, even when the weights are shared
+            registry.release("layoutlmv3", old.registry_id, device=self.device)
+            registry.release("layoutlmv3-processor", old.registry_id, precision="-")
+        logger.info(f"Active model pointer v{old.version} ({old.model_name}) -> v{new_version.version} ({new_version.model_name})")
+    
+    def _load_model(self, model_name: str, file_version: Optional[int] = None):
+        """Load a specific model and swap it in"""
+        with self._load_lock:
+            try:
+                self._loading = model_name
+                self._swap(self._build_version(model_name, file_version))
+                self._last_error = None
+                logger.info(f"Successfully loaded model: {model_name}")
+            except Exception as e:
+                logger.error(f"Error loading model {model_name}: {e}")
+                self._last_error = str(e)
+                raise
+            finally:
+                self._loading = None
     
     def _clear_active_model(self):
         """Clear the active model from memory"""
-        self._active_model = None
-        self._active_processor = None
-        self._active_model_name = None
+        with self._lock:
+            self._version_counter += 1
+            version = self._version_counter
+        self._swap(ActiveModelVersion(version=version, loaded_at=time.time()))
+
+    def _watch_loop(self):
+        while not self._stop_watch.wait(self.watch_interval):
+            try:
+                self.check_for_update()
+            except Exception as e:
+                logger.warning(f"Active model watch failed: {e}")
+
+    def check_for_update(self) -> bool:
+        """Reload if active_model.json changed on disk (e.g. set by another worker). Returns True on swap"""
+        exists = self.active_model_file.exists()
+        mtime = self.active_model_file.stat().st_mtime if exists else None
+        if mtime == self._file_mtime:
+            return False
+        self._file_mtime = mtime
+
+        if not exists:
+            if self._current.model_name is not None:
+                logger.info("active_model.json removed; clearing active model")
+                self._clear_active_model()
+                return True
+            return False
+
+        active_info = self._read_active_file() or {}
+        model_name = active_info.get("model_name")
+        current = self._current
+        if model_name == current.model_name and active_info.get("version") == current.file_version:
+            return False
+        if not model_name or not self._model_exists(model_name):
+            logger.warning(f"active_model.json points at missing model {model_name}; keeping v{current.version}")
+            return False
+        logger.info(f"active_model.json changed; hot-swapping to {model_name}")
+        self._load_model(model_name, file_version=active_info.get("version"))
+        return True
+
+    def stop_watching(self):
+        self._stop_watch.set()
     
     def _get_label_map(self) -> Dict[str, int]:
         """Get the label mapping"""
@@ -97,27 +264,55 @@ class ActiveModelManager:
             "B-description": 10
         }
     
-    def set_active_model(self, model_name: str) -> Dict[str, Any]:
-        """Set the active model"""
+    def set_active_model(self, model_name: str, background: bool = False) -> Dict[str, Any]:
+        """Set the active model.
+
+        The new model is loaded and warmed while the old one keeps serving; with
+        ``background=True`` this returns immediately and the swap happens when
+        loading finishes.
+        """
         try:
             if not self._model_exists(model_name):
                 return {
                     "success": False,
                     "error": f"Model {model_name} not found"
                 }
+
+            if background:
+                threading.Thread(target=self._set_active_model, args=(model_name,),
+                                 name="active-model-load", daemon=True).start()
+                return {
+                    "success": True,
+                    "status": "loading",
+                    "message": f"Loading {model_name}; it becomes active once warmed up",
+                    "model_name": model_name,
+                    "current_version": self._current.version
+                }
+
+            return self._set_active_model(model_name)
             
-            # Load the model
-            self._load_model(model_name)
+        except Exception as e:
+            logger.error(f"Error setting active model: {e}")
+            return {
+                "success": False,
+                "error": str(e)
+            }
+
+    def _set_active_model(self, model_name: str) -> Dict[str, Any]:
+        try:
+            file_version = int(time.time() * 1000)
+
+            # Load and swap in the model
+            self._load_model(model_name, file_version=file_version)
             
-            # Save active model info
+            # Save active model info; other processes pick it up through the watcher
             active_info = {
                 "model_name": model_name,
+                "version": file_version,
                 "timestamp": datetime.utcnow().isoformat(),
                 "model_path": str(self.model_dir / model_name)
             }
-            
-            with self.active_model_file.open('w') as f:
-                json.dump(active_info, f, indent=2)
+            self._write_active_file(active_info)
             
             logger.info(f"Set active model to: {model_name}")
             
@@ -125,6 +320,7 @@ class ActiveModelManager:
                 "success": True,
                 "message": f"Active model set to {model_name}",
                 "model_name": model_name,
+                "version": self._current.version,
                 "timestamp": active_info["timestamp"]
             }
             
@@ -135,30 +331,88 @@ class ActiveModelManager:
                 "error": str(e)
             }
     
+    def _adopt_model(self, model_name: str) -> Dict[str, Any]:
+        """Make ``model_name`` active without re-announcing a model that already is.
+
+        Every worker calls this at startup. The first one (under a lock on the
+        pointer file) writes active_model.json; the rest find it already
+        pointing at ``model_name`` and only load it if they have not yet, so a
+        boot or rolling restart of N workers loads the weights N times instead
+        of triggering a reload in every other worker on each write.
+        """
+        if not self._model_exists(model_name):
+            return {"success": False, "error": f"Model {model_name} not found"}
+
+        lock_path = self.active_model_file.with_suffix(".lock")
+        with lock_path.open("a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                active_info = self._read_active_file() or {}
+                if active_info.get("model_name") != model_name:
+                    active_info = {
+                        "model_name": model_name,
+                        "version": int(time.time() * 1000),
+                        "timestamp": datetime.utcnow().isoformat(),
+                        "model_path": str(self.model_dir / model_name)
+                    }
+                    self._write_active_file(active_info)
+                    logger.info(f"Set active model to: {model_name}")
+                # mtime of the pointer loaded below, so the watcher still sees later changes
+                file_mtime = self.active_model_file.stat().st_mtime
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+        current = self._current
+        if current.model_name != model_name or current.file_version != active_info.get("version"):
+            self._load_model(model_name, file_version=active_info.get("version"))
+        self._file_mtime = file_mtime
+        return {
+            "success": True,
+            "message": f"Active model set to {model_name}",
+            "model_name": model_name,
+            "version": self._current.version,
+            "timestamp": active_info.get("timestamp")
+        }
+
     def get_active_model(self) -> Dict[str, Any]:
         """Get information about the active model"""
-        if self._active_model_name:
-            return {
+        current = self._current
+        if current.model_name:
+            info = {
                 "active": True,
-                "model_name": self._active_model_name,
-                "model_path": str(self.model_dir / self._active_model_name),
+                "model_name": current.model_name,
+                "model_path": str(self.model_dir / current.model_name),
                 "device": self.device,
-                "loaded": self._active_model is not None
+                "loaded": current.model is not None,
+                "version": current.version,
+                "loaded_at": datetime.utcfromtimestamp(current.loaded_at).isoformat()
             }
         else:
-            return {
+            info = {
                 "active": False,
                 "model_name": None,
+                "version": current.version,
                 "message": "No active model set"
             }
+        if self._loading:
+            info["loading"] = self._loading
+        if self._last_error:
+            info["last_error"] = self._last_error
+        return info
+
+    def get_active_snapshot(self) -> ActiveModelVersion:
+        """Model and processor of one version; use this instead of the two getters below in inference"""
+        return self._current
     
     def get_active_model_instance(self) -> Optional[LayoutLMv3ForTokenClassification]:
         """Get the active model instance for inference"""
-        return self._active_model
+        return self._current.model
     
     def get_active_processor(self) -> Optional[LayoutLMv3Processor]:
         """Get the active processor instance for inference"""
-        return self._active_processor
+        return self._current.processor
     
     def clear_active_model(self) -> Dict[str, Any]:
         """Clear the active model"""
@@ -168,6 +422,7 @@ class ActiveModelManager:
             # Remove active model file
             if self.active_model_file.exists():
                 self.active_model_file.unlink()
+            self._file_mtime = None
             
             logger.info("Cleared active model")
             
@@ -210,8 +465,8 @@ class ActiveModelManager:
             models.sort(key=lambda x: x["timestamp"], reverse=True)
             latest_model = models[0]["name"]
             
-            # Set as active
-            return self.set_active_model(latest_model)
+            # Point active_model.json at it (once across workers) and load what it points at
+            return self._adopt_model(latest_model)
             
         except Exception as e:
             logger.error(f"Error auto-setting latest model: {e}")
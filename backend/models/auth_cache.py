@@ -0,0 +1,171 @@
+import base64
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """Thread-safe LRU with a per-entry expiry."""
+
+    def __init__(self, name: str, max_entries: int, ttl_seconds: float):
+        self.name = name
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = float(ttl_seconds)
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Any, Tuple[float, Any]]" = OrderedDict()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def get(self, key: Any) -> Optional[Any]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry[1]
+
+    def set(self, key: Any, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        """Store ``value``; ``ttl_seconds`` can only shorten the cache's own TTL."""
+        ttl = self.ttl_seconds if ttl_seconds is None else min(ttl_seconds, self.ttl_seconds)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def invalidate(self, key: Any) -> bool:
+        with self._lock:
+            removed = self._entries.pop(key, None) is not None
+            self._stats["invalidations"] += int(removed)
+            return removed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._stats["invalidations"] += len(self._entries)
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else None
+        stats.update({"max_entries": self.max_entries, "ttl_seconds": self.ttl_seconds})
+        return stats
+
+
+def token_key(token: str) -> str:
+    """Cache key for a bearer token (the raw token is never kept)."""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+_max_entries = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+
+# Verified token claims until AUTH_TOKEN_CACHE_SECONDS or the token's own exp, whichever is first
+token_cache = TTLCache("tokens", _max_entries, float(os.getenv("AUTH_TOKEN_CACHE_SECONDS", "300")))
+# User and organization profiles keyed by sub / organization id; writes invalidate them
+user_cache = TTLCache("users", _max_entries, float(os.getenv("AUTH_PROFILE_CACHE_SECONDS", "60")))
+organization_cache = TTLCache("organizations", _max_entries, float(os.getenv("AUTH_PROFILE_CACHE_SECONDS", "60")))
+
+
+def unverified_exp(token: str) -> Optional[float]:
+    """``exp`` claim of a token that has already been validated elsewhere."""
+    try:
+        payload = token.split(".")[1]
+        return float(json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))["exp"])
+    except Exception:
+        return None
+
+
+def cache_claims(token: str, claims: Dict[str, Any]) -> None:
+    exp = claims.get("exp") or unverified_exp(token)
+    token_cache.set(token_key(token), claims, ttl_seconds=(float(exp) - time.time()) if exp else None)
+
+
+def invalidate_user(user_id: Any) -> None:
+    """Drop a cached user after a profile, role or status change."""
+    user_cache.invalidate(str(user_id))
+
+
+def invalidate_organization(organization_id: Any) -> None:
+    """Drop a cached organization after it (or its settings) changed."""
+    organization_cache.invalidate(str(organization_id))
+
+
+def get_auth_cache_stats() -> Dict[str, Any]:
+    return {cache.name: cache.get_stats() for cache in (token_cache, user_cache, organization_cache)}
+
+
+class SupabaseTokenVerifier:
+    """Verifies Supabase access tokens locally instead of calling ``auth.get_user``.
+
+    HS256 tokens are checked against SUPABASE_JWT_SECRET; asymmetric tokens
+    (RS256/ES256) against the project's JWKS, fetched once and cached by
+    PyJWKClient for SUPABASE_JWKS_CACHE_SECONDS. ``verify`` returns None when
+    neither is available, so the caller can fall back to the remote check.
+    """
+
+    ASYMMETRIC_ALGORITHMS = ["RS256", "ES256", "EdDSA"]
+
+    def __init__(self, supabase_url: Optional[str] = None, jwt_secret: Optional[str] = None):
+        import jwt  # PyJWT
+
+        self._jwt = jwt
+        self.jwt_secret = jwt_secret if jwt_secret is not None else os.getenv("SUPABASE_JWT_SECRET")
+        self.audience = os.getenv("SUPABASE_JWT_AUDIENCE", "authenticated")
+        supabase_url = (supabase_url or os.getenv("SUPABASE_URL") or "").rstrip("/")
+        self.jwks_url = os.getenv("SUPABASE_JWKS_URL") or (f"{supabase_url}/auth/v1/.well-known/jwks.json" if supabase_url else None)
+        self._jwks_client = None
+        if self.jwks_url:
+            self._jwks_client = jwt.PyJWKClient(self.jwks_url, cache_keys=True,
+                                                lifespan=int(os.getenv("SUPABASE_JWKS_CACHE_SECONDS", "3600")))
+
+    def verify(self, token: str) -> Optional[Dict[str, Any]]:
+        """Claims of a valid token; raises jwt.InvalidTokenError for a bad one, None if it cannot be checked here."""
+        alg = self._jwt.get_unverified_header(token).get("alg")
+        if alg == "HS256":
+            if not self.jwt_secret:
+                return None
+            key = self.jwt_secret
+        elif alg in self.ASYMMETRIC_ALGORITHMS and self._jwks_client is not None:
+            try:
+                key = self._jwks_client.get_signing_key_from_jwt(token).key
+            except self._jwt.PyJWKClientError as e:
+                logger.warning(f"No signing key from {self.jwks_url}: {e}")
+                return None
+        else:
+            return None
+        return self._jwt.decode(token, key, algorithms=[alg], audience=self.audience,
+                                options={"require": ["exp", "sub"]})
+
+
+_verifier: Optional[SupabaseTokenVerifier] = None
+_verifier_lock = threading.Lock()
+
+
+def get_supabase_token_verifier() -> Optional[SupabaseTokenVerifier]:
+    """Process-wide verifier, or None when PyJWT is not installed."""
+    global _verifier
+    if _verifier is None:
+        with _verifier_lock:
+            if _verifier is None:
+                try:
+                    _verifier = SupabaseTokenVerifier()
+                except ImportError:
+                    logger.warning("PyJWT not installed; Supabase tokens are verified remotely")
+                    _verifier = False
+    return _verifier or None
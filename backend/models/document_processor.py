@@ -3,6 +3,7 @@ from typing import Dict, Any, List, Optional, Tuple
 import torch
 from PIL import Image
 import numpy as np
+import paddleocr
 from paddleocr import PaddleOCR
 try:
     # Optionally load .env for local runs; safe no-op if package/file missing
@@ -19,6 +20,26 @@ import fitz  # PyMuPDF
 import io
 import os
 import tempfile
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from models.page_ocr import PageOCR
+from models.ocr_cache import OCRArtifactCache
+from models.image_preprocessing import ImagePreprocessor
+from models.page_renderer import RenderedPage, get_page_renderer
+from models.ocr_batcher import RecognitionBatcher, sort_text_boxes, crop_text_box
+from models.layoutlm_batcher import LayoutLMBatcher, encode_windows
+from models.inference_backend import BackendModelCache
+from models.model_registry import registry, get_shared_active_model_manager, acquire_spacy, acquire_layoutlm, BASE_LAYOUTLM_MODEL
+from models.keyword_classifier import get_keyword_classifier, classify_document_type
+from models.field_extraction import (
+    prefilter_text, accept_generic_field,
+    HEADER_FOOTER_SET, GENERIC_FIELD_SET, CLASSIFIED_FIELD_SETS, DOCUMENT_TYPE_FIELD_SETS, INVOICE_VENDOR_SET, INVOICE_HEADER_SET,
+    ID_CARD_HEADER_SET, INVOICE_HEADER_MIN_LENGTH, TABLE_LABEL_SET, TABLE_ADDITIONAL_SET,
+    GENERIC_DATE_RE, GENERIC_AMOUNT_RE, BBOX_DATE_RE, NAME_PREFIX_RE, WHITESPACE_RE, TABLE_VALUE_NOISE_RE
+)
 try:
     import cv2  # type: ignore
 except Exception:  # pragma: no cover
@@ -49,14 +70,9 @@ class DocumentProcessor:
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
         print(f"Using device: {self.device}")
 
-        # Initialize field patterns early to avoid attribute errors if later init fails
-        # Will be populated with concrete patterns below
-        self.field_patterns = {}
-        
-        # Initialize active model manager
+        # Initialize active model manager (process-wide, shared with the training router)
         try:
-            from models.active_model_manager import ActiveModelManager
-            self.active_model_manager = ActiveModelManager()
+            self.active_model_manager = get_shared_active_model_manager()
             logger.info("Active model manager initialized")
         except Exception as e:
             logger.warning(f"Failed to initialize active model manager: {e}")
@@ -74,19 +90,7 @@ class DocumentProcessor:
         self.configured_ocr_langs = configured_langs
 
         # If multiple languages are provided, build multiple OCR instances and fall back across them
-        self.ocrs = []
-        for _lang in configured_langs:
-            try:
-                self.ocrs.append(
-                    PaddleOCR(
-                        use_angle_cls=True,
-                        lang=_lang,
-                        use_gpu=torch.cuda.is_available(),
-                        show_log=False
-                    )
-                )
-            except Exception as e:
-                logger.error(f"Failed to initialize PaddleOCR for lang '{_lang}': {e}")
+        self.ocrs = self._build_ocr_engines(shared=True)
 
         # Maintain backward compatibility with code that references self.ocr
         self.ocr = self.ocrs[0] if self.ocrs else PaddleOCR(
@@ -95,34 +99,48 @@ class DocumentProcessor:
             use_gpu=torch.cuda.is_available(),
             show_log=False
         )
+
+        # Parallel PDF pages: a process-wide page executor shared by all requests,
+        # capped per request so one huge PDF cannot take every page worker
+        self.pdf_page_workers = max(1, int(os.getenv("PDF_PAGE_WORKERS", "4")))
+        self.pdf_max_page_parallelism = max(1, int(os.getenv("PDF_MAX_PAGE_PARALLELISM", "2")))
+        self._page_executor = None
+        self._page_executor_lock = threading.Lock()
+
+        # PaddleOCR predictors are not thread-safe, so concurrent pages (and
+        # concurrent documents) each check out their own engine set
+        self.ocr_engine_pool_size = max(1, int(os.getenv("OCR_ENGINE_POOL_SIZE", str(self.pdf_page_workers))))
+        self._ocr_engine_pool = queue.Queue()
+        self._ocr_engine_pool.put(self.ocrs or [self.ocr])
+        self._ocr_engines_created = 1
+        self._ocr_engine_lock = threading.Lock()
+        logger.info(f"PDF page workers={self.pdf_page_workers}, per-request parallelism={self.pdf_max_page_parallelism}, OCR engine pool={self.ocr_engine_pool_size}")
+
+        # Micro-batched recognition: detection stays per page, line crops from all
+        # pages/requests are recognised together by one batcher per language
+        self.ocr_batching = os.getenv("OCR_BATCH_RECOGNITION", "false").lower() in ["1", "true", "yes"]
+        self.ocr_batchers = {}
+        if self.ocr_batching:
+            if cv2 is None:
+                logger.warning("OCR_BATCH_RECOGNITION needs OpenCV for line crops; batching disabled")
+                self.ocr_batching = False
+            else:
+                batch_size = max(1, int(os.getenv("OCR_BATCH_SIZE", "32")))
+                for _engine in self._build_ocr_engines(rec_batch_num=batch_size):
+                    self.ocr_batchers[_engine.ocr_lang] = RecognitionBatcher(_engine, name=_engine.ocr_lang, max_batch_size=batch_size)
         
         # Initialize spaCy
-        self.nlp = spacy.load('en_core_web_sm')
+        self.nlp = acquire_spacy()
         
         # Initialize LayoutLMv3 for template-free document understanding
-        layout_model_name = "microsoft/layoutlmv3-base"
         logger.info("Initializing LayoutLMv3 for template-free processing...")
         
         try:
-            self.layout_processor = LayoutLMv3Processor.from_pretrained(
-                layout_model_name,
-                apply_ocr=False  # Important: Set to False since we use PaddleOCR
-            )
-            
-            # Prefer a fine-tuned checkpoint if provided; fall back to base
-            checkpoint_path = os.getenv("LAYOUTLM_CHECKPOINT")
-            if checkpoint_path and os.path.exists(checkpoint_path):
-                logger.info(f"Loading fine-tuned LayoutLM checkpoint from: {checkpoint_path}")
-                self.layout_model = LayoutLMv3ForTokenClassification.from_pretrained(
-                    checkpoint_path,
-                    num_labels=len(self.label2id)
-                ).to(self.device)
-            else:
-                # Initialize model with proper field classification head for template-free processing
-                self.layout_model = LayoutLMv3ForTokenClassification.from_pretrained(
-                    layout_model_name,
-                    num_labels=len(self.label2id)  # Match our label2id count for proper field classification
-                ).to(self.device)
+            # A fine-tuned LAYOUTLM_CHECKPOINT is preferred over the base model when it exists;
+            # the classification head matches our label2id count
+            self.layout_processor, self.layout_model, layout_model_id = acquire_layoutlm(len(self.label2id), self.device)
+            if layout_model_id != BASE_LAYOUTLM_MODEL:
+                logger.info(f"Loaded fine-tuned LayoutLM checkpoint from: {layout_model_id}")
             
             self.use_layoutlm = True
             logger.info("LayoutLMv3 initialized successfully for template-free processing")
@@ -134,6 +152,18 @@ class DocumentProcessor:
             self.layout_processor = None
             self.layout_model = None
 
+        # LayoutLM inference backend: torch (fp32) | int8 (dynamic quantization) | onnx (ONNX Runtime)
+        self.layoutlm_backend = BackendModelCache()
+
+        # Sliding-window LayoutLM: token overlap between consecutive 512-token windows
+        self.layoutlm_window_stride = int(os.getenv("LAYOUTLM_WINDOW_STRIDE", "128"))
+        self.layoutlm_max_windows = max(1, int(os.getenv("LAYOUTLM_MAX_WINDOWS", "8")))
+
+        # Dynamic batching of LayoutLM forward passes across pages and requests
+        self.layoutlm_batcher = None
+        if os.getenv("LAYOUTLM_BATCHING", "false").lower() in ["1", "true", "yes"]:
+            self.layoutlm_batcher = LayoutLMBatcher()
+
         # Supported file extensions
         self.supported_extensions = ['.pdf', '.jpg', '.jpeg', '.png', '.tiff', '.bmp', '.txt', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx', '.rtf']
         
@@ -143,6 +173,25 @@ class DocumentProcessor:
         self.preprocess_use_adaptive = os.getenv("PREPROCESS_ADAPTIVE_THRESHOLD", "auto").lower()  # auto|on|off
         self.preprocess_denoise = os.getenv("PREPROCESS_DENOISE", "light").lower()  # none|light
         logger.info(f"Preprocess mandatory: enabled={self.preprocess_enabled}, upscale={self.preprocess_upscale}, adaptive={self.preprocess_use_adaptive}, denoise={self.preprocess_denoise}")
+        # Scale from measured text height; sized for pages preprocessed concurrently on the page workers
+        self.preprocessor = ImagePreprocessor(max_upscale=self.preprocess_upscale, adaptive=self.preprocess_use_adaptive,
+                                              denoise=self.preprocess_denoise, concurrency=self.pdf_page_workers)
+
+        # PDF rasterisation: zoom picked per page from font size / scan resolution (PDF_RENDER_*)
+        self.page_renderer = get_page_renderer()
+
+        # Per-page OCR artifacts keyed by rendered pixels + OCR settings (data/cache/ocr by default)
+        self.ocr_cache = None
+        if os.getenv("OCR_CACHE", "true").lower() in ["1", "true", "yes"]:
+            try:
+                self.ocr_cache = OCRArtifactCache()
+            except Exception as e:
+                logger.warning(f"OCR artifact cache unavailable: {e}")
+
+        # Born-digital PDF pages: use the embedded text layer instead of rendering + OCR
+        self.pdf_text_layer_mode = os.getenv("PDF_TEXT_LAYER", "auto").lower()  # auto|off
+        self.pdf_text_layer_min_chars = int(os.getenv("PDF_TEXT_LAYER_MIN_CHARS", "20"))
+        logger.info(f"PDF text layer: mode={self.pdf_text_layer_mode}, min_chars={self.pdf_text_layer_min_chars}")
 
         # Handwriting fallback (TrOCR - MIT licensed)
         self.trocr_enabled = os.getenv("USE_TROCR", "false").lower() in ["1", "true", "yes"]
@@ -176,166 +225,154 @@ class DocumentProcessor:
                 logger.warning(f"Failed to initialize Donut processor: {e}")
                 self.use_donut = False
     
+    def _build_ocr_engines(self, shared: bool = False, **overrides) -> List[Any]:
+        """One PaddleOCR instance per configured language (tagged with ``ocr_lang``).
+
+        ``shared`` takes the registry's process-wide instances; extra engine sets
+        for concurrent pages are private because predictors are not thread-safe.
+        """
+        engines = []
+        use_gpu = torch.cuda.is_available()
+        for _lang in self.configured_ocr_langs:
+            def load(_lang=_lang):
+                engine = PaddleOCR(
+                    use_angle_cls=True,
+                    lang=_lang,
+                    use_gpu=use_gpu,
+                    show_log=False,
+                    **overrides
+                )
+                engine.ocr_lang = _lang
+                return engine
+            try:
+                if shared and not overrides:
+                    engine = registry.acquire("paddleocr", _lang, load, device="cuda" if use_gpu else "cpu")
+                else:
+                    engine = load()
+                engines.append(engine)
+            except Exception as e:
+                logger.error(f"Failed to initialize PaddleOCR for lang '{_lang}': {e}")
+        return engines
+
+    def _ocr_with_batcher(self, engine, batcher: RecognitionBatcher, img_array: np.ndarray) -> List[List[Any]]:
+        """Detect on this engine, recognise through the shared batcher.
+
+        Returns the same ``[[box, (text, score)], ...]`` page structure as ``engine.ocr``.
+        """
+        dt_boxes, _ = engine.text_detector(img_array)
+        if dt_boxes is None or len(dt_boxes) == 0:
+            return [[]]
+        boxes = sort_text_boxes(dt_boxes)
+        rec_res = batcher.recognize([crop_text_box(img_array, box) for box in boxes])
+        drop_score = getattr(engine, "drop_score", 0.5)
+        return [[[box.tolist(), (text, score)] for box, (text, score) in zip(boxes, rec_res) if score >= drop_score]]
+
+    def get_ocr_batch_stats(self) -> Dict[str, Any]:
+        """Recognition batcher utilisation, one entry per language."""
+        return {
+            "enabled": self.ocr_batching,
+            "batchers": [b.get_stats() for b in self.ocr_batchers.values()]
+        }
+
+    @contextmanager
+    def _checkout_ocr_engines(self):
+        """Borrow an OCR engine set for exclusive use, growing the pool lazily."""
+        try:
+            engines = self._ocr_engine_pool.get_nowait()
+        except queue.Empty:
+            engines = None
+            with self._ocr_engine_lock:
+                if self._ocr_engines_created < self.ocr_engine_pool_size:
+                    self._ocr_engines_created += 1
+                    grow = True
+                else:
+                    grow = False
+            if grow:
+                try:
+                    engines = self._build_ocr_engines()
+                except Exception:
+                    engines = []
+                if not engines:
+                    # Could not build another set; wait for an existing one instead
+                    with self._ocr_engine_lock:
+                        self._ocr_engines_created -= 1
+                    engines = None
+                else:
+                    logger.info(f"Created OCR engine set {self._ocr_engines_created}/{self.ocr_engine_pool_size}")
+            if engines is None:
+                engines = self._ocr_engine_pool.get()
+        try:
+            yield engines
+        finally:
+            self._ocr_engine_pool.put(engines)
+
+    def _get_page_executor(self) -> ThreadPoolExecutor:
+        with self._page_executor_lock:
+            if self._page_executor is None:
+                self._page_executor = ThreadPoolExecutor(max_workers=self.pdf_page_workers, thread_name_prefix="pdf-page")
+            return self._page_executor
+
     def _get_active_model(self):
-        """Get the active model for inference, fallback to default if none active"""
+        """Get the active model for inference, fallback to default if none active.
+
+        The model is returned in the configured LAYOUTLM_BACKEND (converted once and cached).
+        Model and processor come from one active-model snapshot, so a hot swap
+        never pairs the new model with the old processor; the caller keeps
+        using that snapshot for the whole page.
+        """
         if self.active_model_manager:
-            active_model = self.active_model_manager.get_active_model_instance()
-            active_processor = self.active_model_manager.get_active_processor()
+            snapshot = self.active_model_manager.get_active_snapshot()
+            active_model, active_processor = snapshot.model, snapshot.processor
             if active_model and active_processor:
                 logger.info("Using active trained model for inference")
-                return active_model, active_processor
+                return self.layoutlm_backend.get(active_model), active_processor
         
         # Fallback to default model
         if getattr(self, 'use_layoutlm', False) and self.layout_processor and self.layout_model:
             logger.info("Using default LayoutLM model for inference")
-            return self.layout_model, self.layout_processor
+            return self.layoutlm_backend.get(self.layout_model), self.layout_processor
         
         logger.warning("No model available for inference")
         return None, None
 
-    def _preprocess_image(self, img: np.ndarray) -> np.ndarray:
+    def get_result_fingerprint(self) -> Tuple[str, Dict[str, Any]]:
+        """Model version and pipeline settings that determine a document's result (result cache key)."""
+        snapshot = self.active_model_manager.get_active_snapshot() if self.active_model_manager else None
+        if snapshot is not None and snapshot.model is not None:
+            model_version = f"active:{snapshot.registry_id}"
+        elif getattr(self, 'use_layoutlm', False) and self.layout_model is not None:
+            model_version = f"base:{getattr(self.layout_model, 'name_or_path', '')}"
+        else:
+            model_version = "patterns"
+        config = {
+            "ocr_langs": list(self.configured_ocr_langs),
+            "ocr_batching": self.ocr_batching,
+            "preprocess": self.preprocessor.settings(),
+            "pdf_render": self.page_renderer.settings(),
+            "pdf_text_layer": [self.pdf_text_layer_mode, self.pdf_text_layer_min_chars],
+            "trocr": [self.trocr_enabled, self.trocr_model_name, self.trocr_threshold, self.trocr_max_boxes],
+            "donut": [self.use_donut, self.donut_threshold, sorted(self.donut_force_types)],
+            "layoutlm": [self.layoutlm_backend.backend, self.layoutlm_window_stride, self.layoutlm_max_windows]
+        }
+        return model_version, config
+
+    def _preprocess_image(self, img: np.ndarray) -> Tuple[np.ndarray, Dict[str, Any]]:
         """Light, safe preprocessing for mixed documents.
 
-        Steps: grayscale -> CLAHE -> optional denoise -> optional adaptive threshold -> upscale.
-        Keeps 3-channel RGB output for OCR compatibility.
+        Steps: grayscale -> text-height based downscale -> CLAHE -> optional denoise
+        -> optional adaptive threshold -> capped upscale (see ImagePreprocessor).
+        Returns the 3-channel RGB array and the page's scale and per-stage timings.
         """
-        if img is None or img.size == 0:
-            return img
-        if cv2 is None:
-            return img
-
-        # To BGR for OpenCV
-        if img.ndim == 3 and img.shape[2] == 3:
-            bgr = cv2.cvtColor(img, cv2.COLOR_RGB2BGR)
-        else:
-            bgr = img if img.ndim == 2 else img[..., :3]
-
-        gray = cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY)
-
-        # CLAHE for local contrast enhancement
-        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-        gray = clahe.apply(gray)
-
-        # Light denoise
-        if self.preprocess_denoise == 'light':
-            gray = cv2.medianBlur(gray, 3)
-
-        # Adaptive threshold decision
-        use_adaptive = False
-        if self.preprocess_use_adaptive == 'on':
-            use_adaptive = True
-        elif self.preprocess_use_adaptive == 'auto':
-            # Heuristic: low mean and high variance images benefit from binarization
-            mean, std = float(gray.mean()), float(gray.std())
-            use_adaptive = mean < 170 and std > 40
-
-        if use_adaptive:
-            proc = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-                                         cv2.THRESH_BINARY, 31, 10)
-        else:
-            proc = gray
-
-        # Upscale if requested
-        scale = max(1.0, float(self.preprocess_upscale))
-        if scale > 1.01:
-            h, w = proc.shape[:2]
-            new_size = (int(w * scale), int(h * scale))
-            proc = cv2.resize(proc, new_size, interpolation=cv2.INTER_CUBIC)
-
-        # Return RGB
-        return cv2.cvtColor(proc, cv2.COLOR_GRAY2RGB)
-        
-        # Document type patterns
-        self.doc_type_patterns = {
-            'invoice': [
-                r'invoice\s*#?\s*[\w-]+',
-                r'bill\s*to',
-                r'ship\s*to',
-                r'total\s*amount',
-                r'\$\s*\d+\.?\d*',
-                r'payment\s*terms',
-                r'due\s*date'
-            ],
-            'technical_doc': [
-                r'revision\s*[A-Z0-9]+',
-                r'document\s*number',
-                r'technical\s*specification',
-                r'engineering\s*drawing',
-                r'TEC-[A-Z0-9-]+',
-                r'IBU-[A-Z0-9-]+',
-                r'TEC-MOS-\d{2}-\d{2}-\d{2}-\d{4}',
-                r'Rev-[A-Z]',
-                r'technical\s*data',
-                r'specification\s*sheet'
-            ],
-            'engineering_doc': [
-                r'drawing\s*number',
-                r'scale',
-                r'project\s*number',
-                r'engineering\s*notes',
-                r'IBU-\d{3}',
-                r'revision\s*history',
-                r'4669-IBU-\d{3}-\w{3}-\w{3}-\w{2}-\d{6}',
-                r'Rev\s*\d{2}',
-                r'engineering\s*drawing',
-                r'design\s*specification'
-            ]
-        }
-        
-        # Field patterns for different document types
-        self.field_patterns = {
-            'invoice': {
-                'invoice_number': [r'invoice\s*#?\s*([\w-]+)', r'inv[.-]?\s*#?\s*([\w-]+)'],
-                'date': [r'date:?\s*(\d{1,2}[-/]\d{1,2}[-/]\d{2,4})', r'dated:?\s*(\d{1,2}[-/]\d{1,2}[-/]\d{2,4})'],
-                'due_date': [r'due\s*date:?\s*(\d{1,2}[-/]\d{1,2}[-/]\d{2,4})', r'payment\s*due:?\s*(\d{1,2}[-/]\d{1,2}[-/]\d{2,4})'],
-                'total_amount': [r'total:?\s*[\$€£]?\s*(\d+(?:,\d{3})*(?:\.\d{2})?)', r'amount\s*due:?\s*[\$€£]?\s*(\d+(?:,\d{3})*(?:\.\d{2})?)'],
-                'subtotal': [r'subtotal:?\s*[\$€£]?\s*(\d+(?:,\d{3})*(?:\.\d{2})?)'],
-                'tax': [r'tax:?\s*[\$€£]?\s*(\d+(?:,\d{3})*(?:\.\d{2})?)', r'vat:?\s*[\$€£]?\s*(\d+(?:,\d{3})*(?:\.\d{2})?)'],
-                'vendor_name': [r'from:?\s*([^\n]+)', r'vendor:?\s*([^\n]+)', r'supplier:?\s*([^\n]+)'],
-                'customer_name': [r'to:?\s*([^\n]+)', r'bill\s*to:?\s*([^\n]+)', r'customer:?\s*([^\n]+)']
-            },
-            'accident_report': {
-                'report_number': [r'report\s*number\s*[:#]?\s*([A-Za-z0-9_-]+)'],
-                'security_code': [r'security\s*code\s*[:#]?\s*([A-Za-z0-9_-]+)'],
-                'driver_name': [r'driver\s*name\s*[:#]?\s*([^\n]+)'],
-                'mobile_number': [r'(?:mobile|phone)\s*number\s*[:#]?\s*(\+?\d[\d\s-]{6,})'],
-                'license_no': [r'license\s*no\s*[:#]?\s*([A-Za-z0-9]+)'],
-                'license_expiry_date': [r'license\s*expiry\s*date\s*[:#]?\s*(\d{1,2}[/\-]\d{1,2}[/\-]\d{2,4})'],
-                'plate_details': [r'plate\s*details\s*[:#]?\s*([^\n]+)'],
-                'accident_date': [r'accident\s*date\s*[:#]?\s*(\d{4}[-/]\d{2}[-/]\d{2}|\d{1,2}[-/]\d{1,2}[-/]\d{2,4})'],
-                'accident_time': [r'accident\s*time\s*[:#]?\s*([0-2]?\d[:\.]\d{2}(?::\d{2})?)'],
-                'location': [r'location\s*[:#]?\s*([^\n]+)'],
-                'insurance_company': [r'insurance\s*company\s*[:#]?\s*([^\n]+)'],
-                'policy_no': [r'policy\s*no\s*[:#]?\s*([A-Za-z0-9-]+)']
-            },
-            'technical_doc': {
-                'doc_number': [r'document\s*number:?\s*([A-Z0-9-]+)', r'doc[.-]?\s*#?\s*([A-Z0-9-]+)', r'TEC-MOS-\d{2}-\d{2}-\d{2}-\d{4}'],
-                'revision': [r'revision:?\s*([A-Z0-9]+)', r'rev[.-]?\s*#?\s*([A-Z0-9]+)', r'Rev-[A-Z]'],
-                'date': [r'date:?\s*(\d{1,2}[-/]\d{1,2}[-/]\d{2,4})', r'dated:?\s*(\d{1,2}[-/]\d{1,2}[-/]\d{2,4})'],
-                'title': [r'title:?\s*([^\n]+)', r'subject:?\s*([^\n]+)', r'description:?\s*([^\n]+)'],
-                'author': [r'author:?\s*([^\n]+)', r'prepared\s*by:?\s*([^\n]+)', r'created\s*by:?\s*([^\n]+)'],
-                'department': [r'department:?\s*([^\n]+)', r'division:?\s*([^\n]+)'],
-                'specification': [r'specification:?\s*([^\n]+)', r'technical\s*data:?\s*([^\n]+)'],
-                'part_number': [r'part\s*number:?\s*([A-Z0-9-]+)', r'part\s*#:?\s*([A-Z0-9-]+)']
-            },
-            'engineering_doc': {
-                'drawing_number': [r'drawing\s*number:?\s*([A-Z0-9-]+)', r'dwg[.-]?\s*#?\s*([A-Z0-9-]+)', r'4669-IBU-\d{3}-\w{3}-\w{3}-\w{2}-\d{6}'],
-                'revision': [r'revision:?\s*([A-Z0-9]+)', r'rev[.-]?\s*#?\s*([A-Z0-9]+)', r'Rev\s*\d{2}'],
-                'scale': [r'scale:?\s*([^\n]+)', r'drawn\s*scale:?\s*([^\n]+)'],
-                'project_number': [r'project\s*number:?\s*([A-Z0-9-]+)', r'proj[.-]?\s*#?\s*([A-Z0-9-]+)'],
-                'date': [r'date:?\s*(\d{1,2}[-/]\d{1,2}[-/]\d{2,4})', r'dated:?\s*(\d{1,2}[-/]\d{1,2}[-/]\d{2,4})'],
-                'engineer': [r'engineer:?\s*([^\n]+)', r'designed\s*by:?\s*([^\n]+)', r'drawn\s*by:?\s*([^\n]+)'],
-                'design_spec': [r'design\s*specification:?\s*([^\n]+)', r'engineering\s*notes:?\s*([^\n]+)'],
-                'material': [r'material:?\s*([^\n]+)', r'construction:?\s*([^\n]+)']
-            }
-        }
+        return self.preprocessor.process(img)
 
-    def process_document(self, file_path: str) -> Dict[str, Any]:
+    def process_document(self, file_path: str, max_page_parallelism: Optional[int] = None) -> Dict[str, Any]:
         """
         Process a document file and extract information.
         
         Args:
             file_path: Path to the document file
+            max_page_parallelism: Cap on concurrently processed PDF pages for this
+                request (defaults to PDF_MAX_PAGE_PARALLELISM)
             
         Returns:
             Dictionary containing extracted information
@@ -349,7 +386,7 @@ class DocumentProcessor:
             
             # Route to appropriate processor based on file type
             if file_type == "application/pdf":
-                return self._process_pdf(file_path)
+                return self._process_pdf(file_path, max_page_parallelism)
             elif file_ext in ['doc', 'docx', 'xls', 'xlsx', 'ppt', 'pptx']:
                 return self._process_office_document(file_path)
             elif file_ext in ['txt', 'rtf']:
@@ -362,29 +399,144 @@ class DocumentProcessor:
             logger.error(f"Error processing document: {str(e)}")
             raise
 
-    def _process_pdf(self, file_path: str) -> Dict[str, Any]:
-        """Process a PDF document."""
+    def _prepare_pdf_page(self, page, zoom: Optional[float],
+                          render_lock: threading.Lock) -> Tuple[Optional[PageOCR], Optional[RenderedPage], float]:
+        """Read a page's text layer or render it; must run on the thread that owns ``doc``.
+
+        ``zoom=None`` lets the page renderer pick it for this page. Returns the
+        zoom actually used, which is also the text layer's coordinate scale.
+        """
+        with render_lock:
+            try:
+                page_dict = self.page_renderer.text_dict(page)
+            except Exception as e:
+                logger.warning(f"Could not read text layer of page {page.number + 1}: {e}")
+                page_dict = None
+            if zoom is None:
+                zoom = self.page_renderer.choose_zoom(page, page_dict)
+            page_ocr = self._text_layer_page_ocr(page, zoom=zoom, render_lock=render_lock, page_dict=page_dict)
+            if page_ocr is not None:
+                return page_ocr, None, zoom
+            return None, self.page_renderer.render(page, zoom=zoom), zoom
+
+    def _process_pdf_page(self, page_ocr: Optional[PageOCR], rendered: Optional[RenderedPage],
+                          page_number: int, zoom: float) -> Tuple[PageOCR, Dict[str, Any]]:
+        """OCR (if needed) and extract one prepared page; safe to run on a page worker."""
+        if page_ocr is None:
+            page_ocr = self._run_page_ocr(rendered.image(), page_number=page_number, zoom=zoom,
+                                          pixels=rendered.array)
+        result = self.process_image(page_ocr.image, page_ocr=page_ocr)
+        return page_ocr, result
+
+    def _iter_pdf_pages(self, doc: fitz.Document, zoom: Optional[float] = None, max_page_parallelism: Optional[int] = None,
+                        render_lock: Optional[threading.Lock] = None):
+        """Yield ``(page_ocr, result)`` for every page, strictly in page order.
+
+        Pages are rendered serially (PyMuPDF documents are not thread-safe) and
+        OCR + extraction fan out to the shared page executor, with at most
+        ``max_page_parallelism`` pages of this document in flight at once.
+        ``zoom=None`` renders each page at the zoom the page renderer picks.
+        Callers touching ``doc`` between pages must hold ``render_lock``.
+        """
+        parallelism = min(
+            max(1, int(max_page_parallelism or self.pdf_max_page_parallelism)),
+            self.pdf_page_workers,
+            max(1, doc.page_count)
+        )
+        render_lock = render_lock or threading.Lock()
+
+        if parallelism <= 1:
+            for page in doc:
+                page_ocr, rendered, page_zoom = self._prepare_pdf_page(page, zoom, render_lock)
+                yield self._process_pdf_page(page_ocr, rendered, page.number + 1, page_zoom)
+            return
+
+        executor = self._get_page_executor()
+        pending = deque()
+        try:
+            for page in doc:
+                if len(pending) >= parallelism:
+                    yield pending.popleft().result()
+                page_ocr, rendered, page_zoom = self._prepare_pdf_page(page, zoom, render_lock)
+                pending.append(executor.submit(self._process_pdf_page, page_ocr, rendered, page.number + 1, page_zoom))
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def iter_document(self, file_path: str, max_page_parallelism: Optional[int] = None):
+        """Process a document incrementally.
+
+        Yields one ``{"type": "page", ...}`` record per page as soon as that page
+        is done (in page order), then a final ``{"type": "summary", "result": ...}``
+        whose result is what ``process_document`` would have returned.
+        Non-PDF inputs produce a single page record.
+        """
+        if self._get_file_type(file_path) == "application/pdf":
+            yield from self._iter_pdf(file_path, max_page_parallelism)
+            return
+
+        result = self.process_document(file_path)
+        yield {
+            "type": "page",
+            "page": 1,
+            "page_count": 1,
+            "extracted_text": result.get("extracted_text", ""),
+            "document_type": result.get("document_type", "unknown"),
+            "bounding_boxes": result.get("bounding_boxes", []),
+            "fields": result.get("fields") or result.get("extracted_fields", {}),
+            "tables": result.get("tables", [])
+        }
+        yield {"type": "summary", "result": result}
+
+    def _iter_pdf(self, file_path: str, max_page_parallelism: Optional[int] = None):
+        """Generator behind _process_pdf and streaming; see iter_document."""
         try:
             # Open PDF
             doc = fitz.open(file_path)
-            
+        except Exception as e:
+            logger.error(f"Error processing PDF: {str(e)}")
+            raise
+
+        try:
             # Extract text from all pages
             full_text = ""
             for page in doc:
                 full_text += page.get_text()
             
-            # Convert each page to image for OCR
-            images = []
-            for page in doc:
-                pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))  # 2x zoom for better quality
-                img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-                images.append(img)
-            
-            # Process each page
+            # Build each page's PageOCR exactly once; it is reused for field
+            # extraction, OCR table grouping and header/footer detection.
+            # Pages with a usable text layer skip rendering and OCR entirely.
+            render_lock = threading.Lock()
+            page_ocrs = []
             all_results = []
-            for img in images:
-                result = self.process_image(img)
+            tables = []
+            # Zoom is chosen per page from its font size / scan resolution
+            for page_ocr, result in self._iter_pdf_pages(doc, max_page_parallelism=max_page_parallelism,
+                                                         render_lock=render_lock):
+                page_ocrs.append(page_ocr)
                 all_results.append(result)
+
+                # Extract tables if present
+                with render_lock:
+                    page_tables = self._extract_page_tables(doc[page_ocr.page_number - 1], page_ocr)
+                tables.extend(page_tables)
+
+                yield {
+                    "type": "page",
+                    "page": page_ocr.page_number,
+                    "page_count": doc.page_count,
+                    "source": page_ocr.source,
+                    "extracted_text": result.get("extracted_text", ""),
+                    "document_type": result.get("document_type", "unknown"),
+                    "bounding_boxes": result.get("bounding_boxes", []),
+                    "fields": result.get("fields") or result.get("extracted_fields", {}),
+                    "tables": page_tables
+                }
+            logger.info(f"PDF pages: {sum(1 for p in page_ocrs if p.source == 'text_layer')} text layer, "
+                        f"{sum(1 for p in page_ocrs if p.source != 'text_layer')} OCR")
+            logger.info(f"Total tables extracted: {len(tables)}")
             
             # Combine results
             combined_result = self._combine_results(all_results)
@@ -407,8 +559,6 @@ class DocumentProcessor:
             combined_result["file_type"] = "application/pdf"
             combined_result["file_name"] = os.path.basename(file_path)
             
-            # Extract tables if present
-            tables = self._extract_tables(doc)
             combined_result["tables"] = tables
             
             # Extract table-specific fields
@@ -423,16 +573,25 @@ class DocumentProcessor:
             combined_result["confidence"] = confidence
             
             # Extract headers and footers
-            headers, footers = self._extract_headers_footers(doc)
+            headers, footers = self._extract_headers_footers(doc, page_ocrs)
             combined_result["headers"] = headers
             combined_result["footers"] = footers
             
-            doc.close()
-            return combined_result
+            yield {"type": "summary", "result": combined_result}
             
         except Exception as e:
             logger.error(f"Error processing PDF: {str(e)}")
             raise
+        finally:
+            doc.close()
+
+    def _process_pdf(self, file_path: str, max_page_parallelism: Optional[int] = None) -> Dict[str, Any]:
+        """Process a PDF document."""
+        combined_result = None
+        for event in self._iter_pdf(file_path, max_page_parallelism):
+            if event["type"] == "summary":
+                combined_result = event["result"]
+        return combined_result
 
     def _process_image(self, file_path: str) -> Dict[str, Any]:
         """Process a single image and extract information."""
@@ -473,10 +632,11 @@ class DocumentProcessor:
                 text_content = re.sub(r'\s+', ' ', text_content).strip()  # Normalize whitespace
                 
                 # Determine document type
+                lowered_text = prefilter_text(text_content)
                 doc_type = self._classify_document_type(text_content)
                 
                 # Extract fields using pattern-based approach
-                fields = self._extract_fields_pattern_based(text_content)
+                fields = self._extract_fields_pattern_based(text_content, lowered_text)
                 
                 # Calculate confidence
                 confidence = self._calculate_confidence(fields, doc_type)
@@ -527,10 +687,11 @@ class DocumentProcessor:
                 text_content = f.read()
             
             # Determine document type
+            lowered_text = prefilter_text(text_content)
             doc_type = self._classify_document_type(text_content)
             
             # Extract fields using pattern-based approach
-            fields = self._extract_fields_pattern_based(text_content)
+            fields = self._extract_fields_pattern_based(text_content, lowered_text)
             
             # Calculate confidence
             confidence = self._calculate_confidence(fields, doc_type)
@@ -553,110 +714,248 @@ class DocumentProcessor:
             logger.error(f"Error processing text document: {str(e)}")
             raise
 
-    def process_image(self, image: Image.Image) -> Dict[str, Any]:
-        """Process a single image and extract information."""
-        logger.info("=== Starting process_image ===")
+    def _text_layer_page_ocr(self, page, zoom: float = 2.0, render_lock: Optional[threading.Lock] = None,
+                             page_dict: Optional[Dict[str, Any]] = None) -> Optional[PageOCR]:
+        """Build a PageOCR from a PDF page's embedded text layer.
+
+        Returns None when the page has no usable text layer (scanned, image-only
+        or garbled font encoding) so the caller falls back to render + OCR.
+        Span boxes are scaled by ``zoom`` so they share the coordinate space of
+        the page image rendered on demand at the same zoom. ``render_lock``
+        serialises that deferred render with other users of the document.
+        ``page_dict`` is the page's already-read text dict, if the caller has it.
+        """
+        if self.pdf_text_layer_mode == "off":
+            return None
         try:
-            # Convert image to RGB if needed
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
-            
-            # Convert PIL Image to numpy array, optionally preprocess
-            img_array = np.array(image)
-            if self.preprocess_enabled:
-                try:
-                    img_array = self._preprocess_image(img_array)
-                except Exception as e:
-                    logger.warning(f"Preprocess failed; continuing with original image: {e}")
-            
-            # Perform OCR
-            logger.info("Starting OCR processing")
-            logger.info(f"Image array shape: {img_array.shape}, dtype: {img_array.dtype}")
-            try:
-                # Support multiple OCR engines if configured; concatenate results
-                if hasattr(self, 'ocrs') and self.ocrs:
-                    ocr_result = []
-                    for _engine in self.ocrs:
-                        try:
+            if page_dict is None:
+                page_dict = self.page_renderer.text_dict(page)
+        except Exception as e:
+            logger.warning(f"Could not read text layer of page {page.number + 1}: {e}")
+            return None
+
+        lines = []
+        bounding_boxes = []
+        char_count = 0
+        garbled = 0
+        for block in page_dict.get("blocks", []):
+            for line in block.get("lines", []):
+                line_parts = []
+                for span in line.get("spans", []):
+                    text = span.get("text", "").strip()
+                    if not text:
+                        continue
+                    char_count += len(text)
+                    garbled += text.count("\ufffd")
+                    x0, y0, x1, y1 = [c * zoom for c in span["bbox"]]
+                    # Same quad format PaddleOCR produces
+                    bounding_boxes.append({
+                        'text': text,
+                        'confidence': 1.0,
+                        'box': [[x0, y0], [x1, y0], [x1, y1], [x0, y1]]
+                    })
+                    line_parts.append(text)
+                if line_parts:
+                    lines.append(" ".join(line_parts))
+
+        # Unmapped glyphs show up as U+FFFD; such a layer is worse than OCR
+        if char_count < self.pdf_text_layer_min_chars or garbled > 0.1 * char_count:
+            return None
+
+        def render() -> Image.Image:
+            with (render_lock or threading.Lock()):
+                return self.page_renderer.render(page, zoom=zoom).image()
+
+        return PageOCR(image=None, image_array=None, text="\n".join(lines) + "\n",
+                       bounding_boxes=bounding_boxes, page_number=page.number + 1,
+                       scale=zoom, source="text_layer", image_factory=render)
+
+    def _run_page_ocr(self, image: Image.Image, page_number: int = 1, zoom: float = 1.0,
+                      pixels: Optional[np.ndarray] = None) -> PageOCR:
+        """Preprocess and OCR one page image exactly once.
+
+        The returned PageOCR is shared by field extraction, table grouping and
+        header/footer detection so no stage has to re-render or re-OCR the page.
+        ``zoom`` is the render zoom used to produce ``image`` from a PDF page;
+        ``pixels`` is the render's array (saves copying it out of ``image``).
+        """
+        # Grayscale renders go to preprocessing as they are; anything else becomes RGB
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+            pixels = None
+        if pixels is None:
+            pixels = np.asarray(image)
+
+        # Same pixels + same OCR settings -> reuse the stored boxes instead of running PaddleOCR
+        cache_key = None
+        if self.ocr_cache is not None:
+            cache_key = self.ocr_cache.make_key(pixels, self._ocr_cache_settings())
+            cached = self.ocr_cache.get(cache_key)
+            if cached is not None:
+                bounding_boxes, preprocess_ratio = cached
+                # Only the TrOCR/Donut fallbacks need the preprocessed pixels
+                img_array = self._preprocess_page_array(pixels)[0] if (self.trocr_enabled or self.use_donut) else None
+                return PageOCR(image=image, image_array=img_array,
+                               text="".join(bb['text'] + "\n" for bb in bounding_boxes),
+                               bounding_boxes=bounding_boxes, page_number=page_number,
+                               scale=zoom * preprocess_ratio)
+
+        # Convert PIL Image to numpy array, optionally preprocess
+        img_array, preprocess_info = self._preprocess_page_array(pixels)
+
+        # Pixels per PDF point in the OCR coordinate space (render zoom x preprocess upscale)
+        preprocess_ratio = (img_array.shape[1] / float(image.width)) if image.width else 1.0
+        scale = zoom * preprocess_ratio
+
+        # Perform OCR
+        logger.info("Starting OCR processing")
+        logger.info(f"Image array shape: {img_array.shape}, dtype: {img_array.dtype}")
+        try:
+            # Support multiple OCR engines if configured; concatenate results
+            engine_failed = False
+            with self._checkout_ocr_engines() as engines:
+                ocr_result = []
+                for _engine in engines:
+                    try:
+                        batcher = self.ocr_batchers.get(getattr(_engine, "ocr_lang", None))
+                        if batcher is not None:
+                            _res = self._ocr_with_batcher(_engine, batcher, img_array)
+                        else:
                             _res = _engine.ocr(img_array, cls=True)
-                            if _res:
-                                ocr_result.extend(_res)
-                        except Exception as inner_e:
-                            logger.warning(f"OCR failed for one language engine: {inner_e}")
-                else:
-                    ocr_result = self.ocr.ocr(img_array, cls=True)
-                logger.info(f"OCR result type: {type(ocr_result)}")
-                logger.info(f"OCR result length: {len(ocr_result) if isinstance(ocr_result, list) else 'not a list'}")
+                        if _res:
+                            ocr_result.extend(_res)
+                    except Exception as inner_e:
+                        logger.warning(f"OCR failed for one language engine: {inner_e}")
+                        engine_failed = True
+            logger.info(f"OCR result type: {type(ocr_result)}")
+            logger.info(f"OCR result length: {len(ocr_result) if isinstance(ocr_result, list) else 'not a list'}")
+        except Exception as e:
+            logger.error(f"OCR processing failed: {str(e)}", exc_info=True)
+            return PageOCR(image=image, image_array=img_array, text="", bounding_boxes=[],
+                           page_number=page_number, scale=scale, source="error")
+
+        # Extract text and bounding boxes
+        extracted_text = ""
+        bounding_boxes = []
+
+        # Handle different OCR result structures
+        if ocr_result is None:
+            logger.warning("OCR result is None")
+            return PageOCR(image=image, image_array=img_array, text="", bounding_boxes=[],
+                           page_number=page_number, scale=scale, source="error")
+
+        # Process OCR result based on its structure
+        if isinstance(ocr_result, list) and len(ocr_result) > 0:
+            # Handle the case where ocr_result is a list of pages
+            for page_idx, page in enumerate(ocr_result):
+                if page is None:
+                    logger.warning(f"Page {page_idx} is None")
+                    continue
+
+                if not isinstance(page, list):
+                    logger.warning(f"Page {page_idx} is not a list: {type(page)}")
+                    continue
+
+                for line_idx, line in enumerate(page):
+                    try:
+                        if line is None or not isinstance(line, list) or len(line) < 2:
+                            logger.warning(f"Line {line_idx} in page {page_idx} is invalid: {line}")
+                            continue
+
+                        # Extract text and confidence - PaddleOCR format: [bbox, (text, confidence)]
+                        if isinstance(line[1], tuple) and len(line[1]) >= 2:
+                            text = line[1][0]
+                            confidence = line[1][1]
+                        elif isinstance(line[1], list) and len(line[1]) >= 2:
+                            text = line[1][0]
+                            confidence = line[1][1]
+                        else:
+                            logger.warning(f"Invalid text format in line {line_idx}: {line[1]}")
+                            continue
+
+                        # Extract bounding box
+                        box = line[0] if isinstance(line[0], list) else []
+
+                        if text and text.strip():
+                            extracted_text += text.strip() + "\n"
+                            bounding_boxes.append({
+                                'text': text.strip(),
+                                'confidence': float(confidence),
+                                'box': box
+                            })
+                    except (IndexError, TypeError, ValueError) as e:
+                        logger.warning(f"Error processing OCR line {line_idx} in page {page_idx}: {str(e)}")
+                        continue
+
+        if cache_key is not None and not engine_failed:
+            self.ocr_cache.set(cache_key, bounding_boxes, preprocess_ratio)
+
+        return PageOCR(image=image, image_array=img_array, text=extracted_text,
+                       bounding_boxes=bounding_boxes, page_number=page_number, scale=scale,
+                       preprocess=preprocess_info)
+
+    def _preprocess_page_array(self, pixels: np.ndarray) -> Tuple[np.ndarray, Dict[str, Any]]:
+        img_array = pixels
+        preprocess_info = {}
+        if self.preprocess_enabled:
+            try:
+                img_array, preprocess_info = self._preprocess_image(img_array)
             except Exception as e:
-                logger.error(f"OCR processing failed: {str(e)}", exc_info=True)
-                return {
-                    "extracted_text": "",
-                    "document_type": "unknown",
-                    "confidence": 0.0,
-                    "bounding_boxes": []
-                }
-            
-            # Extract text and bounding boxes
-            extracted_text = ""
-            bounding_boxes = []
-            
-            # Handle different OCR result structures
-            if ocr_result is None:
-                logger.warning("OCR result is None")
+                logger.warning(f"Preprocess failed; continuing with original image: {e}")
+                self.preprocessor.record_error()
+        if img_array.ndim == 2:
+            # Detection and the recognition crops expect 3 channels
+            img_array = np.dstack([img_array] * 3)
+        elif img_array is pixels:
+            # Never hand the (read-only) render buffer itself to OCR
+            img_array = np.array(pixels)
+        return img_array, preprocess_info
+
+    def _ocr_cache_settings(self) -> Dict[str, Any]:
+        """Everything besides the pixels that changes what OCR returns for a page."""
+        return {
+            "ocr_langs": list(self.configured_ocr_langs),
+            "preprocess": [self.preprocess_enabled, self.preprocessor.settings()],
+            "paddleocr": getattr(paddleocr, "__version__", ""),
+            "batched_recognition": self.ocr_batching
+        }
+
+    def get_ocr_cache_stats(self) -> Dict[str, Any]:
+        return self.ocr_cache.get_stats() if self.ocr_cache is not None else {"enabled": False}
+
+    def get_preprocess_stats(self) -> Dict[str, Any]:
+        return self.preprocessor.get_stats()
+
+    def get_render_stats(self) -> Dict[str, Any]:
+        return self.page_renderer.get_stats()
+
+    def process_image(self, image: Optional[Image.Image], page_ocr: Optional[PageOCR] = None) -> Dict[str, Any]:
+        """Process a single image and extract information.
+
+        Pass ``page_ocr`` to reuse an OCR pass that has already been run on this image.
+        """
+        logger.info("=== Starting process_image ===")
+        try:
+            if page_ocr is None:
+                page_ocr = self._run_page_ocr(image)
+            if page_ocr.source == "error":
                 return {
                     "extracted_text": "",
                     "document_type": "unknown",
                     "confidence": 0.0,
                     "bounding_boxes": []
                 }
-            
-            # Process OCR result based on its structure
-            if isinstance(ocr_result, list) and len(ocr_result) > 0:
-                # Handle the case where ocr_result is a list of pages
-                for page_idx, page in enumerate(ocr_result):
-                    if page is None:
-                        logger.warning(f"Page {page_idx} is None")
-                        continue
-                        
-                    if not isinstance(page, list):
-                        logger.warning(f"Page {page_idx} is not a list: {type(page)}")
-                        continue
-                        
-                    for line_idx, line in enumerate(page):
-                        try:
-                            if line is None or not isinstance(line, list) or len(line) < 2:
-                                logger.warning(f"Line {line_idx} in page {page_idx} is invalid: {line}")
-                                continue
-                                
-                            # Extract text and confidence - PaddleOCR format: [bbox, (text, confidence)]
-                            if isinstance(line[1], tuple) and len(line[1]) >= 2:
-                                text = line[1][0]
-                                confidence = line[1][1]
-                            elif isinstance(line[1], list) and len(line[1]) >= 2:
-                                text = line[1][0]
-                                confidence = line[1][1]
-                            else:
-                                logger.warning(f"Invalid text format in line {line_idx}: {line[1]}")
-                                continue
-                            
-                            # Extract bounding box
-                            box = line[0] if isinstance(line[0], list) else []
-                            
-                            if text and text.strip():
-                                extracted_text += text.strip() + "\n"
-                                bounding_boxes.append({
-                                    'text': text.strip(),
-                                    'confidence': float(confidence),
-                                    'box': box
-                                })
-                        except (IndexError, TypeError, ValueError) as e:
-                            logger.warning(f"Error processing OCR line {line_idx} in page {page_idx}: {str(e)}")
-                            continue
+            img_array = page_ocr.image_array
+            extracted_text = page_ocr.text
+            # Copy so fallbacks below never mutate the shared page OCR
+            bounding_boxes = list(page_ocr.bounding_boxes)
+            # Recognition fallbacks only make sense for OCR output, not an exact text layer
+            from_ocr = page_ocr.source == "ocr"
             
             logger.info(f"Extracted {len(bounding_boxes)} text blocks")
 
             # Handwriting fallback: if average confidence is low and TrOCR is enabled, re-recognize per line
-            if self.trocr_enabled and bounding_boxes:
+            if self.trocr_enabled and from_ocr and bounding_boxes:
                 try:
                     avg_conf = sum(b['confidence'] for b in bounding_boxes) / max(1, len(bounding_boxes))
                     if avg_conf < self.trocr_threshold:
@@ -694,7 +993,9 @@ class DocumentProcessor:
                     logger.warning(f"TrOCR fallback failed: {e}")
 
             # Donut fallback: if overall OCR confidence is low, or doc type forced, and Donut is enabled, run Donut and merge/replace
-            if self.use_donut:
+            # Donut fields stay local: pages and requests share this processor
+            donut_extra_fields = {}
+            if self.use_donut and from_ocr:
                 try:
                     should_use_donut = False
                     if not bounding_boxes:
@@ -730,8 +1031,7 @@ class DocumentProcessor:
                             extracted_text = donut_text
                         if isinstance(donut_fields, dict):
                             # Map into our extracted_fields later
-                            bounding_boxes = bounding_boxes  # keep existing boxes
-                            self._donut_extra_fields = donut_fields
+                            donut_extra_fields = donut_fields
                             logger.info(f"Donut provided {len(donut_fields)} fields")
                 except Exception as e:
                     logger.info(f"Donut not applied: {e}")
@@ -748,27 +1048,28 @@ class DocumentProcessor:
             
             # Determine document type first
             doc_type = self._classify_document_type(extracted_text)
+
+            # Lower-cased once for the literal prefilter of every pattern set below
+            lowered_text = prefilter_text(extracted_text)
             
             # Track which components were used for transparency
             pipeline_used = {
-                "ocr": f"paddleocr-{'/'.join(getattr(self, 'configured_ocr_langs', ['en']))}",
+                "ocr": "pdf-text-layer" if page_ocr.source == "text_layer" else f"paddleocr-{'/'.join(getattr(self, 'configured_ocr_langs', ['en']))}",
                 "ner": "none"
             }
+            if page_ocr.preprocess:
+                # Resampling chosen for this page and where the preprocessing time went
+                pipeline_used["preprocess"] = page_ocr.preprocess
 
             # Use LayoutLM for universal document understanding if available
             extracted_fields = {}
             # If Donut provided fields, seed with them first
-            if hasattr(self, '_donut_extra_fields') and isinstance(self._donut_extra_fields, dict):
-                extracted_fields.update(self._donut_extra_fields)
-                try:
-                    del self._donut_extra_fields
-                except Exception:
-                    pass
+            extracted_fields.update(donut_extra_fields)
             model, processor = self._get_active_model()
             if model and processor:
                 logger.info("Using active model for universal field extraction")
                 try:
-                    layoutlm_fields = self._extract_fields_layoutlm_universal(image, extracted_text, bounding_boxes, model, processor)
+                    layoutlm_fields = self._extract_fields_layoutlm_universal(page_ocr.get_image(), extracted_text, bounding_boxes, model, processor)
                     extracted_fields.update(layoutlm_fields)
                     pipeline_used["ner"] = getattr(model, "name_or_path", "layoutlmv3")
                 except Exception as e:
@@ -778,14 +1079,14 @@ class DocumentProcessor:
             
             # Scoped extraction first based on detected document type
             logger.info(f"Using scoped pattern extraction for doc_type='{doc_type}'")
-            scoped_fields = self._extract_fields(extracted_text, doc_type)
+            scoped_fields = self._extract_fields(extracted_text, doc_type, lowered_text)
             extracted_fields.update(scoped_fields)
 
             # Fallback to universal patterns if we found too few fields
             min_scoped = 3 if doc_type in ["invoice", "receipt"] else 1
             if len(scoped_fields) < min_scoped:
                 logger.info("Scoped extraction sparse; applying universal patterns as fallback")
-                pattern_fields = self._extract_fields_pattern_based(extracted_text)
+                pattern_fields = self._extract_fields_pattern_based(extracted_text, lowered_text)
                 for k, v in pattern_fields.items():
                     if k not in extracted_fields:
                         extracted_fields[k] = v
@@ -1223,38 +1524,27 @@ class DocumentProcessor:
             logger.error(f"Error processing table data: {str(e)}")
             return None
 
-    def _extract_tables_from_ocr(self, page) -> List[Dict[str, Any]]:
-        """Extract tables using OCR analysis for complex layouts."""
+    def _extract_tables_from_ocr(self, page, page_ocr: Optional[PageOCR] = None) -> List[Dict[str, Any]]:
+        """Extract tables using OCR analysis for complex layouts.
+
+        Reuses ``page_ocr`` from the main OCR pass when given; only OCRs the
+        page itself when called standalone.
+        """
         tables = []
         try:
-            # Convert page to image for OCR analysis
-            pix = page.get_pixmap()
-            img_data = pix.tobytes("png")
-            
-            # Use OCR to extract text with positioning
-            ocr_result = self.ocr.ocr(img_data)
-            
-            if not ocr_result or not ocr_result[0]:
-                return tables
+            if page_ocr is None:
+                rendered = self.page_renderer.render(page)
+                page_ocr = self._run_page_ocr(rendered.image(), page_number=page.number + 1,
+                                              zoom=rendered.zoom, pixels=rendered.array)
             
             # Analyze text layout for table-like structures
-            text_blocks = []
-            for line in ocr_result[0]:
-                if len(line) >= 2:
-                    bbox = line[0]
-                    text = line[1][0] if isinstance(line[1], (list, tuple)) else str(line[1])
-                    confidence = line[1][1] if isinstance(line[1], (list, tuple)) and len(line[1]) > 1 else 1.0
-                    
-                    text_blocks.append({
-                        'text': text.strip(),
-                        'bbox': bbox,
-                        'confidence': confidence,
-                        'center_x': (bbox[0][0] + bbox[2][0]) / 2,
-                        'center_y': (bbox[0][1] + bbox[2][1]) / 2
-                    })
+            text_blocks = page_ocr.text_blocks
+            if not text_blocks:
+                return tables
             
-            # Group text blocks into potential table rows
-            table_candidates = self._group_text_into_tables(text_blocks)
+            # Group text blocks into potential table rows; the row tolerance was
+            # tuned at 72 dpi so scale it to the OCR coordinate space
+            table_candidates = self._group_text_into_tables(text_blocks, y_tolerance=10 * page_ocr.scale)
             
             # Process table candidates
             for idx, candidate in enumerate(table_candidates):
@@ -1278,7 +1568,7 @@ class DocumentProcessor:
         
         return tables
 
-    def _group_text_into_tables(self, text_blocks: List[Dict]) -> List[List[Dict]]:
+    def _group_text_into_tables(self, text_blocks: List[Dict], y_tolerance: float = 10) -> List[List[Dict]]:
         """Group text blocks into potential table structures."""
         if not text_blocks:
             return []
@@ -1289,7 +1579,6 @@ class DocumentProcessor:
         tables = []
         current_table = []
         last_y = None
-        y_tolerance = 10  # Pixels
         
         for block in sorted_blocks:
             if last_y is None or abs(block['center_y'] - last_y) <= y_tolerance:
@@ -1327,39 +1616,48 @@ class DocumentProcessor:
             logger.error(f"Error converting candidate to table: {str(e)}")
             return []
 
-    def _extract_tables(self, doc: fitz.Document) -> List[Dict[str, Any]]:
+    def _extract_page_tables(self, page, page_ocr: Optional[PageOCR] = None) -> List[Dict[str, Any]]:
+        """Extract tables from a single PDF page (PyMuPDF tables, then OCR layout)."""
+        tables = []
+        page_num = page.number
+        logger.info(f"Processing page {page_num + 1} for table extraction...")
+        
+        # Method 1: PyMuPDF table extraction
+        try:
+            table_list = page.get_tables()
+            logger.info(f"Found {len(table_list)} tables using PyMuPDF method")
+        except AttributeError:
+            try:
+                table_list = page.find_tables()
+                logger.info(f"Found {len(table_list)} tables using find_tables method")
+            except:
+                table_list = []
+        
+        # Process each table
+        for table_idx, table in enumerate(table_list):
+            try:
+                processed_table = self._process_table_data(table, page_num + 1, table_idx + 1)
+                if processed_table:
+                    tables.append(processed_table)
+            except Exception as e:
+                logger.warning(f"Error processing table {table_idx + 1} on page {page_num + 1}: {str(e)}")
+        
+        # Method 2: OCR-based table extraction for complex layouts
+        try:
+            ocr_tables = self._extract_tables_from_ocr(page, page_ocr)
+            tables.extend(ocr_tables)
+        except Exception as e:
+            logger.warning(f"Error in OCR table extraction for page {page_num + 1}: {str(e)}")
+        
+        return tables
+
+    def _extract_tables(self, doc: fitz.Document, page_ocrs: Optional[List[PageOCR]] = None) -> List[Dict[str, Any]]:
         """Extract tables from PDF document with comprehensive processing."""
         tables = []
         try:
             for page_num, page in enumerate(doc):
-                logger.info(f"Processing page {page_num + 1} for table extraction...")
-                
-                # Method 1: PyMuPDF table extraction
-                try:
-                    table_list = page.get_tables()
-                    logger.info(f"Found {len(table_list)} tables using PyMuPDF method")
-                except AttributeError:
-                    try:
-                        table_list = page.find_tables()
-                        logger.info(f"Found {len(table_list)} tables using find_tables method")
-                    except:
-                        table_list = []
-                
-                # Process each table
-                for table_idx, table in enumerate(table_list):
-                    try:
-                        processed_table = self._process_table_data(table, page_num + 1, table_idx + 1)
-                        if processed_table:
-                            tables.append(processed_table)
-                    except Exception as e:
-                        logger.warning(f"Error processing table {table_idx + 1} on page {page_num + 1}: {str(e)}")
-                
-                # Method 2: OCR-based table extraction for complex layouts
-                try:
-                    ocr_tables = self._extract_tables_from_ocr(page)
-                    tables.extend(ocr_tables)
-                except Exception as e:
-                    logger.warning(f"Error in OCR table extraction for page {page_num + 1}: {str(e)}")
+                page_ocr = page_ocrs[page_num] if page_ocrs and page_num < len(page_ocrs) else None
+                tables.extend(self._extract_page_tables(page, page_ocr))
                     
         except Exception as e:
             logger.error(f"Error extracting tables: {str(e)}")
@@ -1369,44 +1667,37 @@ class DocumentProcessor:
         
     def _detect_table_type(self, headers: List[str]) -> str:
         """Detect the type of table based on its headers."""
-        header_text = " ".join(headers).lower()
-        
-        # Technical document table types
-        if any(term in header_text for term in ["part", "component", "specification", "parameter"]):
-            return "technical_specs"
-        if any(term in header_text for term in ["revision", "history", "change", "date"]):
-            return "revision_history"
-        if any(term in header_text for term in ["material", "construction", "composition"]):
-            return "material_specs"
-            
-        # Engineering document table types
-        if any(term in header_text for term in ["dimension", "size", "measurement", "tolerance"]):
-            return "dimensions"
-        if any(term in header_text for term in ["note", "reference", "detail"]):
-            return "notes"
-        if any(term in header_text for term in ["assembly", "component", "part"]):
-            return "assembly"
-            
-        return "unknown"
-
-    def _extract_headers_footers(self, doc: fitz.Document) -> Tuple[List[str], List[str]]:
-        """Extract headers and footers from PDF document."""
+        # First table type (technical, then engineering types) whose keywords occur in the headers
+        return get_keyword_classifier().first_match(" ".join(headers), "table_types") or "unknown"
+
+    def _extract_headers_footers(self, doc: fitz.Document, page_ocrs: Optional[List[PageOCR]] = None) -> Tuple[List[str], List[str]]:
+        """Extract headers and footers from PDF document.
+
+        Scanned pages have no text blocks; for those the first/last line of the
+        page's existing OCR pass is used instead.
+        """
         headers = []
         footers = []
         try:
-            for page in doc:
+            for page_num, page in enumerate(doc):
                 # Get text blocks
                 blocks = page.get_text("blocks")
                 if blocks:
-                    # Process header (first block)
                     header_text = blocks[0][4]
-                    header_info = self._process_header_footer(header_text, "header")
-                    headers.append(header_info)
-                    
-                    # Process footer (last block)
                     footer_text = blocks[-1][4]
-                    footer_info = self._process_header_footer(footer_text, "footer")
-                    footers.append(footer_info)
+                elif page_ocrs and page_num < len(page_ocrs) and page_ocrs[page_num].lines:
+                    header_text = page_ocrs[page_num].header_text
+                    footer_text = page_ocrs[page_num].footer_text
+                else:
+                    continue
+
+                # Process header (first block)
+                header_info = self._process_header_footer(header_text, "header")
+                headers.append(header_info)
+                
+                # Process footer (last block)
+                footer_info = self._process_header_footer(footer_text, "footer")
+                footers.append(footer_info)
                     
         except Exception as e:
             logger.error(f"Error extracting headers/footers: {str(e)}")
@@ -1421,140 +1712,28 @@ class DocumentProcessor:
         }
         
         try:
-            # Common fields in headers/footers
-            patterns = {
-                "document_number": [
-                    r'doc[.-]?\s*#?\s*([A-Z0-9-]+)',
-                    r'document\s*number:?\s*([A-Z0-9-]+)',
-                    r'TEC-MOS-\d{2}-\d{2}-\d{2}-\d{4}',
-                    r'4669-IBU-\d{3}-\w{3}-\w{3}-\w{2}-\d{6}'
-                ],
-                "revision": [
-                    r'rev[.-]?\s*#?\s*([A-Z0-9]+)',
-                    r'revision:?\s*([A-Z0-9]+)',
-                    r'Rev-[A-Z]',
-                    r'Rev\s*\d{2}'
-                ],
-                "page": [
-                    r'page\s*(\d+)',
-                    r'pg[.-]?\s*(\d+)'
-                ],
-                "date": [
-                    r'date:?\s*(\d{1,2}[-/]\d{1,2}[-/]\d{2,4})',
-                    r'dated:?\s*(\d{1,2}[-/]\d{1,2}[-/]\d{2,4})'
-                ],
-                "title": [
-                    r'title:?\s*([^\n]+)',
-                    r'subject:?\s*([^\n]+)'
-                ]
-            }
-            
-            # Extract fields using patterns
-            for field, field_patterns in patterns.items():
-                for pattern in field_patterns:
-                    match = re.search(pattern, text, re.IGNORECASE)
-                    if match:
-                        result["fields"][field] = match.group(1).strip()
-                        break
-                        
+            # Common fields in headers/footers (patterns in models.field_extraction)
+            result["fields"] = HEADER_FOOTER_SET.extract(text)
         except Exception as e:
             logger.error(f"Error processing header/footer: {str(e)}")
             
         return result
 
-    def _extract_fields(self, text: str, doc_type: str) -> Dict[str, str]:
+    def _extract_fields(self, text: str, doc_type: str, lowered: Optional[str] = None) -> Dict[str, str]:
         """Extract fields from text based on document type."""
         fields = {}
         try:
-            if doc_type in self.field_patterns:
-                for field, patterns in self.field_patterns[doc_type].items():
-                    for pattern in patterns:
-                        match = re.search(pattern, text, re.IGNORECASE)
-                        if match:
-                            fields[field] = match.group(1).strip()
-                            break
+            pattern_set = CLASSIFIED_FIELD_SETS.get(doc_type)
+            if pattern_set is not None:
+                fields = pattern_set.extract(text, lowered=lowered)
         except Exception as e:
             logger.error(f"Error extracting fields: {str(e)}")
         return fields
 
     def _classify_document_type(self, text: str) -> str:
-        """Classify document type based on content."""
+        """Classify document type based on content (keyword vocabularies in config/keyword_vocabulary.json)."""
         try:
-            # Define patterns for different document types
-            patterns = {
-                'invoice': [
-                    r'invoice\s*number',
-                    r'total\s*amount',
-                    r'tax\s*amount',
-                    r'payment\s*terms',
-                    r'due\s*date'
-                ],
-                'accident_report': [
-                    r'traffic\s*accident\s*report',
-                    r'accident\s*date',
-                    r'accident\s*time',
-                    r'report\s*number',
-                    r'security\s*code',
-                    r'driver\s*name'
-                ],
-                'receipt': [
-                    r'receipt',
-                    r'payment\s*received',
-                    r'amount\s*paid',
-                    r'change',
-                    r'cashier'
-                ],
-                'id_card': [
-                    r'id\s*number',
-                    r'date\s*of\s*birth',
-                    r'address',
-                    r'nationality',
-                    r'expiry\s*date'
-                ],
-                'contract': [
-                    r'contract',
-                    r'agreement',
-                    r'party',
-                    r'effective\s*date',
-                    r'termination'
-                ],
-                'engineering_doc': [
-                    r'drawing\s*number',
-                    r'revision',
-                    r'scale',
-                    r'project\s*number',
-                    r'4669-IBU-\d{3}-\w{3}-\w{3}-\w{2}-\d{6}'
-                ]
-            }
-            
-            # Count matches for each document type
-            max_matches = 0
-            doc_type = "unknown"
-            
-            for dtype, type_patterns in patterns.items():
-                matches = 0
-                for pattern in type_patterns:
-                    if re.search(pattern, text, re.IGNORECASE):
-                        matches += 1
-                
-                if matches > max_matches:
-                    max_matches = matches
-                    doc_type = dtype
-            
-            # If no matches found, try to determine type from content
-            if doc_type == "unknown":
-                # Check for technical drawing patterns
-                if re.search(r'\d{4}-\w{3}-\d{3}-\w{3}-\w{3}-\w{2}-\d{6}', text):
-                    doc_type = "engineering_doc"
-                # Check for invoice patterns
-                elif re.search(r'\$\d+\.\d{2}|\d+\.\d{2}\s*USD', text):
-                    doc_type = "invoice"
-                # Check for ID card patterns
-                elif re.search(r'\d{2}/\d{2}/\d{4}|\d{4}-\d{2}-\d{2}', text):
-                    doc_type = "id_card"
-            
-            return doc_type
-            
+            return classify_document_type(text)
         except Exception as e:
             logger.error(f"Error classifying document type: {str(e)}")
             return "unknown"
@@ -1683,245 +1862,19 @@ class DocumentProcessor:
         
         return combined
 
-    def _extract_fields_pattern_based(self, text: str) -> Dict[str, Any]:
+    def _extract_fields_pattern_based(self, text: str, lowered: Optional[str] = None) -> Dict[str, Any]:
         """Extract fields using comprehensive pattern matching for template-free processing."""
-        fields = {}
-        
-        # Comprehensive field extraction patterns for any document type
-        patterns = {
-            # Document Numbers and Identifiers
-            'invoice_number': [
-                r'(INV-\d+)',  # Full invoice number pattern - HIGHEST PRIORITY
-                r'#\s*(INV-\d+)',  # Invoice number with # prefix
-                r'(?:invoice|inv|bill)[\s#:]*([A-Z0-9\-]+)',  # Invoice-specific patterns
-                r'([A-Z]{2,}\d{4,})',  # Pattern like INV-000038
-                r'(INV-\d+|PO-\d+|QTE-\d+|CNT-\d+)',  # Common prefixes
-            ],
-            'document_number': [
-                r'Report\s*Number[:\s]*(\d{8,15})',  # Report number pattern
-                r'(?:report|document|file)\s*(?:number|no|#)[:\s]*(\d{8,15})',  # Document number
-                r'(?:number|no|#|id|identifier)[\s:]*([A-Z0-9\-]+)',
-                r'INV-(\d+)',  # Specific invoice pattern
-                r'(\d{4,}-\d{3,})',    # Pattern like 2024-001
-                r'(\d{6,})',           # Long number sequences
-                r'([A-Z]{2,}\d{2,}[A-Z]?\d{2,})',  # Mixed alphanumeric
-                r'(?:receipt|quote|estimate|contract|agreement|order|po|purchase\s*order)[\s#:]*([A-Z0-9\-]+)',
-            ],
-            'reference_number': [
-                r'(?:ref|reference|tracking)[\s#:]*([A-Z0-9\-]+)',
-                r'(?:order\s*ref|po\s*ref)[\s:]*([A-Z0-9\-]+)',
-                r'(?:customer\s*ref|client\s*ref)[\s:]*([A-Z0-9\-]+)',
-            ],
-            
-            # Dates
-            'invoice_date': [
-                r'(?:invoice\s*date|bill\s*date|date)[\s:]*(\d{1,2}\s+(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\s+\d{4})',  # Month name format - HIGHEST PRIORITY
-                r'(?:invoice\s*date|bill\s*date|date)[\s:]*(\d{1,2}[/\-\.]\d{1,2}[/\-\.]\d{2,4})',  # Numeric format
-                r'(?:invoice\s*date|bill\s*date)[\s:]*(\d{4}-\d{2}-\d{2})',  # ISO format
-            ],
-            'date': [
-                r'(?:accident\s*date|report\s*date)[\s:]*(\d{4}[/\-]\d{1,2}[/\-]\d{1,2})',  # Accident/Report date
-                r'(?:issued|due|created|generated|effective|expires?|valid\s*until)[\s:]*(\d{1,2}[/\-\.]\d{1,2}[/\-\.]\d{2,4})',
-                r'(\d{4}-\d{2}-\d{2})',  # ISO format first
-                r'(\d{1,2}[/\-\.]\d{1,2}[/\-\.]\d{2,4})',
-                r'(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[\w\s]*\d{1,2},?\s*\d{4}',  # Month name format
-                r'(?:january|february|march|april|may|june|july|august|september|october|november|december)[\w\s]*\d{1,2},?\s*\d{4}',
-            ],
-            'due_date': [
-                r'(?:due|payment\s*due|pay\s*by)[\s:]*(\d{1,2}[/\-\.]\d{1,2}[/\-\.]\d{2,4})',
-                r'(?:due\s*date)[\s:]*(\d{1,2}[/\-\.]\d{1,2}[/\-\.]\d{2,4})',
-            ],
-            
-            # Financial Information
-            'total_amount': [
-                r'(?:balance\s*due|total\s*due)[\s:]*AED([0-9,]+\.?\d*)',  # AED currency - HIGHEST PRIORITY
-                r'(?:total|grand\s*total|final\s*total)[\s:]*AED([0-9,]+\.?\d*)',  # AED currency
-                r'(?:balance\s*due|total\s*due)[\s:]*\$?([0-9,]+\.?\d*)',  # Generic currency
-                r'(?:total|amount|sum|due|balance|grand\s*total|net\s*amount)[\s:]*\$?([0-9,]+\.?\d*)',
-                r'\$([0-9,]+\.?\d*)',
-                r'([0-9,]+\.?\d*)\s*(?:usd|dollars?|us\s*\$?|eur|euros?|gbp|pounds?)',
-                r'(?:net|subtotal)[\s:]*\$?([0-9,]+\.?\d*)',
-                r'(?:final\s*amount|total\s*cost)[\s:]*\$?([0-9,]+\.?\d*)',
-                r'Total\s*Amount[\s:]*\$?([0-9,]+\.?\d*)',
-                r'Amount\s*Due[\s:]*\$?([0-9,]+\.?\d*)',
-            ],
-            'subtotal': [
-                r'(?:subtotal|sub\s*total|before\s*tax)[\s:]*\$?([0-9,]+\.?\d*)',
-                r'(?:pre\s*tax|excluding\s*tax)[\s:]*\$?([0-9,]+\.?\d*)',
-            ],
-            'tax_amount': [
-                r'(?:tax|vat|gst|sales\s*tax|service\s*tax)[\s(]*\d*%?[)\s:]*\$?([0-9,]+\.?\d*)',
-                r'(\d+\.\d{2})\s*(?:tax|vat|gst)',
-                r'(?:tax\s*amount|tax\s*total)[\s:]*\$?([0-9,]+\.?\d*)',
-                r'Tax\s*\(\d+%\):\s*\$?([0-9,]+\.?\d*)',
-            ],
-            'discount': [
-                r'(?:discount|disc|off|reduction)[\s:]*\$?([0-9,]+\.?\d*)',
-                r'(\d+\.?\d*)\s*(?:%|percent|off)',
-            ],
-            
-            # Names and Organizations
-            'vendor_name': [
-                r'(?:from|vendor|company|bill\s*to|seller|provider|supplier|merchant)[\s:]*([A-Za-z\s&\.]+)',
-                r'^([A-Za-z\s&\.]+)',  # First line often contains company name
-                r'(?:business\s*name|company\s*name|organization)[\s:]*([A-Za-z\s&\.]+)',
-                r'(?:issued\s*by|prepared\s*by)[\s:]*([A-Za-z\s&\.]+)',
-            ],
-            'customer_name': [
-                r'(?:to|bill\s*to|customer|client|sold\s*to|buyer|purchaser)[\s:]*([A-Za-z\s&\.]+)',
-                r'(?:ship\s*to|deliver\s*to|send\s*to)[\s:]*([A-Za-z\s&\.]+)',
-                r'(?:attention|attn)[\s:]*([A-Za-z\s&\.]+)',
-            ],
-            'contact_person': [
-                r'(?:contact|person|representative|agent)[\s:]*([A-Za-z\s&\.]+)',
-                r'(?:responsible|account\s*manager)[\s:]*([A-Za-z\s&\.]+)',
-            ],
-            
-            # Contact Information
-            'email': [
-                r'([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})',
-                r'(?:email|e-mail)[\s:]*([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})',
-            ],
-            'phone': [
-                r'(?:phone|tel|mobile|contact|call)[\s:]*([\d\s\-\(\)\+]+)',
-                r'(\d{3}[-\.\s]?\d{3}[-\.\s]?\d{4})',  # US phone format
-                r'(\(\d{3}\)\s?\d{3}[-\.\s]?\d{4})',   # US phone with parentheses
-                r'(\+\d{1,3}\s?\d{1,4}[-\.\s]?\d{1,4}[-\.\s]?\d{1,4})',  # International
-            ],
-            'fax': [
-                r'(?:fax|facsimile)[\s:]*([\d\s\-\(\)\+]+)',
-            ],
-            
-            # Addresses
-            'billing_address': [
-                r'(?:billing\s*address|bill\s*to\s*address)[\s:]*([A-Za-z0-9\s,\.\-]+)',
-            ],
-            'shipping_address': [
-                r'(?:shipping\s*address|ship\s*to\s*address)[\s:]*([A-Za-z0-9\s,\.\-]+)',
-            ],
-            'address': [
-                r'(?:address|location|street)[\s:]*([A-Za-z0-9\s,\.\-]+)',
-                r'(\d+\s+[A-Za-z\s,\.\-]+(?:street|st|avenue|ave|road|rd|drive|dr|boulevard|blvd|lane|ln))',
-                r'(\d+\s+[A-Za-z\s,\.\-]+(?:street|st|avenue|ave|road|rd|drive|dr|boulevard|blvd|lane|ln)[\s,]*[A-Za-z\s,\.\-]*)',
-            ],
-            'city': [
-                r'(?:city|town)[\s:]*([A-Za-z\s]+)',
-            ],
-            'state': [
-                r'(?:state|province|region)[\s:]*([A-Za-z\s]+)',
-            ],
-            'zip_code': [
-                r'(?:zip|postal|post\s*code)[\s:]*([A-Z0-9\s\-]+)',
-                r'(\d{5}(?:-\d{4})?)',  # US ZIP format
-            ],
-            'country': [
-                r'(?:country|nation)[\s:]*([A-Za-z\s]+)',
-            ],
-            
-            # Business Information
-            'po_number': [
-                r'(?:p\.o\.#|po\s*#)[\s:]*([A-Z0-9\-\/]+)',  # PO# pattern - HIGHEST PRIORITY
-                r'(?:p\.o\.|po|purchase\s*order)[\s#:]*([A-Z0-9\-\/]+)',  # PO number pattern
-                r'(?:order\s*number|order\s*no)[\s:]*([A-Z0-9\-\/]+)',
-            ],
-            'vat_number': [
-                r'(?:vat\s*no\.?|vat\s*number)[\s:]*(\d{10,15})',  # VAT No.: pattern - HIGHEST PRIORITY
-                r'(?:vat\s*no|vat\s*number|vat\s*id)[\s:]*(\d{10,15})',  # VAT number pattern
-                r'(?:tax\s*id|tax\s*number|ein|tin|vat\s*number)[\s:]*([A-Z0-9\s\-]+)',
-                r'(?:federal\s*tax\s*id|employer\s*id)[\s:]*([A-Z0-9\s\-]+)',
-            ],
-            'tax_id': [
-                r'(?:tax\s*id|tax\s*number|ein|tin)[\s:]*([A-Z0-9\s\-]+)',
-                r'(?:federal\s*tax\s*id|employer\s*id)[\s:]*([A-Z0-9\s\-]+)',
-            ],
-            'license_number': [
-                r'License\s*No[\s:]*(\d{8,15})',  # License number pattern
-                r'(?:license|permit|registration)[\s#:]*([A-Z0-9\s\-]+)',
-                r'(?:license\s*number|permit\s*number)[\s:]*([A-Z0-9\s\-]+)',
-            ],
-            'driver_name': [
-                r'Driver\s*Name[\s:]*([A-Za-z\s]+)',  # Driver name pattern
-                r'(?:driver|name)[\s:]*([A-Za-z\s]+)',
-            ],
-            'account_number': [
-                r'(?:account|acct)[\s#:]*([A-Z0-9\s\-]+)',
-                r'(?:account\s*number|acct\s*no)[\s:]*([A-Z0-9\s\-]+)',
-            ],
-            
-            # Payment Information
-            'payment_terms': [
-                r'(?:payment\s*terms|terms)[\s:]*([A-Za-z0-9\s,\.\-]+)',
-                r'(?:net|due)[\s:]*(\d+)\s*(?:days|day)',
-            ],
-            'payment_method': [
-                r'(?:payment\s*method|pay\s*by)[\s:]*([A-Za-z\s]+)',
-                r'(?:cash|check|credit\s*card|bank\s*transfer|wire|ach)',
-            ],
-            
-            # Product/Service Information
-            'description': [
-                r'(?:description|item|product|service)[\s:]*([A-Za-z0-9\s,\.\-]+)',
-                r'(?:for|work\s*performed)[\s:]*([A-Za-z0-9\s,\.\-]+)',
-            ],
-            'quantity': [
-                r'(?:qty|quantity)[\s:]*(\d+)',
-                r'(?:units?|pieces?|items?)[\s:]*(\d+)',
-            ],
-            'unit_price': [
-                r'(?:unit\s*price|price\s*per|rate)[\s:]*\$?([0-9,]+\.?\d*)',
-                r'(?:each|per\s*unit)[\s:]*\$?([0-9,]+\.?\d*)',
-            ],
-            
-            # Status and Conditions
-            'status': [
-                r'(?:status|state|condition)[\s:]*([A-Za-z\s]+)',
-                r'(?:pending|approved|rejected|completed|in\s*progress)',
-            ],
-            'priority': [
-                r'(?:priority|urgency)[\s:]*([A-Za-z\s]+)',
-                r'(?:high|medium|low|urgent|normal)',
-            ],
-            
-            # Additional Common Fields
-            'notes': [
-                r'(?:notes?|comments?|remarks?)[\s:]*([A-Za-z0-9\s,\.\-]+)',
-                r'(?:special\s*instructions|additional\s*info)[\s:]*([A-Za-z0-9\s,\.\-]+)',
-            ],
-            'department': [
-                r'(?:department|dept|division)[\s:]*([A-Za-z\s]+)',
-            ],
-            'project_code': [
-                r'(?:project|job|work\s*order)[\s#:]*([A-Z0-9\s\-]+)',
-                r'(?:project\s*code|job\s*code)[\s:]*([A-Z0-9\s\-]+)',
-            ]
-        }
-        
-        # Extract fields using patterns
-        for field_name, pattern_list in patterns.items():
-            for pattern in pattern_list:
-                matches = re.findall(pattern, text, re.IGNORECASE | re.MULTILINE)
-                if matches:
-                    # Take the first match and clean it
-                    value = matches[0].strip()
-                    if value and len(value) > 1:  # Avoid single characters
-                        # Additional validation for specific fields
-                        if field_name == 'email' and '@' not in value:
-                            continue
-                        if field_name == 'phone' and len(re.sub(r'[\s\-\(\)\+]', '', value)) < 7:
-                            continue
-                        if field_name in ['total_amount', 'tax_amount', 'subtotal'] and not re.search(r'\d', value):
-                            continue
-                            
-                        fields[field_name] = value
-                        logger.info(f"Extracted {field_name}: '{value}'")
-                        break
+        # Comprehensive field extraction patterns for any document type (see GENERIC_FIELD_PATTERNS)
+        fields = GENERIC_FIELD_SET.extract(text, accept=accept_generic_field, lowered=lowered)
+        for field_name, value in fields.items():
+            logger.info(f"Extracted {field_name}: '{value}'")
         
         # Post-processing to clean up extracted values
         for field_name, value in fields.items():
             if field_name in ['vendor_name', 'customer_name']:
                 # Remove common prefixes/suffixes and limit length
-                value = re.sub(r'^(from|to|bill\s*to|ship\s*to):?\s*', '', value, flags=re.IGNORECASE)
-                value = re.sub(r'\s+', ' ', value).strip()
+                value = NAME_PREFIX_RE.sub('', value)
+                value = WHITESPACE_RE.sub(' ', value).strip()
                 if len(value) > 50:  # Limit length
                     value = value[:50].strip()
                 fields[field_name] = value
@@ -2016,128 +1969,15 @@ class DocumentProcessor:
         
         try:
             if document_type == 'invoice':
-                # Extract vendor information
-                vendor_patterns = [
-                    r'([A-Z][A-Z\s]+(?:TECHNOLOGY|INFORMATION|CONSULTANCY|LTD|LLC|INC|CORP))',
-                    r'([A-Z][A-Z\s]+(?:COMPANY|ENTERPRISES|SOLUTIONS))'
-                ]
-                
-                for pattern in vendor_patterns:
-                    match = re.search(pattern, text)
-                    if match:
-                        vendor_name = match.group(1).strip()
-                        if len(vendor_name) > 10:  # Ensure it's a substantial company name
-                            fields['vendor_name'] = vendor_name
-                            break
-                
-                # Extract customer information
-                customer_patterns = [
-                    r'Bill\s*To\s*([^\n]+)',
-                    r'Customer[:\s]*([^\n]+)',
-                    r'Client[:\s]*([^\n]+)'
-                ]
-                
-                for pattern in customer_patterns:
-                    match = re.search(pattern, text, re.IGNORECASE)
-                    if match:
-                        customer_name = match.group(1).strip()
-                        if len(customer_name) > 5:
-                            fields['customer_name'] = customer_name
-                            break
-                
-                # Extract subject/description
-                subject_patterns = [
-                    r'Subject[:\s]*([^\n]+)',
-                    r'Description[:\s]*([^\n]+)',
-                    r'Invoice\s*for\s*([^\n]+)'
-                ]
-                
-                for pattern in subject_patterns:
-                    match = re.search(pattern, text, re.IGNORECASE)
-                    if match:
-                        subject = match.group(1).strip()
-                        if len(subject) > 5:
-                            fields['subject'] = subject
-                            break
-                
-                # Extract terms
-                terms_patterns = [
-                    r'Terms[:\s]*([^\n]+)',
-                    r'Payment\s*Terms[:\s]*([^\n]+)'
-                ]
-                
-                for pattern in terms_patterns:
-                    match = re.search(pattern, text, re.IGNORECASE)
-                    if match:
-                        terms = match.group(1).strip()
-                        if len(terms) > 2:
-                            fields['terms'] = terms
-                            break
-                
-                # Extract bank details
-                bank_patterns = [
-                    r'Bank\s*[:\s]*([^\n]+)',
-                    r'IBAN[:\s]*([A-Z0-9]+)',
-                    r'SWIFT[:\s]*([A-Z0-9]+)',
-                    r'Account[:\s]*([A-Z0-9]+)'
-                ]
-                
-                for pattern in bank_patterns:
-                    match = re.search(pattern, text, re.IGNORECASE)
-                    if match:
-                        bank_info = match.group(1).strip()
-                        if 'bank' in pattern.lower():
-                            fields['bank_name'] = bank_info
-                        elif 'iban' in pattern.lower():
-                            fields['iban'] = bank_info
-                        elif 'swift' in pattern.lower():
-                            fields['swift_code'] = bank_info
-                        elif 'account' in pattern.lower():
-                            fields['account_number'] = bank_info
+                lowered = prefilter_text(text)
+                accept = lambda field, value: len(value) >= INVOICE_HEADER_MIN_LENGTH.get(field, 0)
+                # Vendor (case-sensitive company-name patterns), customer, subject, terms and bank details
+                fields.update(INVOICE_VENDOR_SET.extract(text, accept=accept, lowered=lowered))
+                fields.update(INVOICE_HEADER_SET.extract(text, accept=accept, lowered=lowered))
                 
             elif document_type == 'id_card':
-                # Extract license information
-                license_patterns = [
-                    r'License\s*No\.?\s*[:\s]*([A-Z0-9\-]+)',
-                    r'Registration\s*No\.?\s*[:\s]*(\d+)',
-                    r'ADFZ[-\s]?(\d+)'
-                ]
-                
-                for pattern in license_patterns:
-                    match = re.search(pattern, text, re.IGNORECASE)
-                    if match:
-                        fields['license_number'] = match.group(1).strip()
-                        break
-                
-                # Extract company information
-                company_patterns = [
-                    r'Trade\s*Name[:\s]*([^\n]+)',
-                    r'Company\s*Name[:\s]*([^\n]+)',
-                    r'Business\s*Name[:\s]*([^\n]+)'
-                ]
-                
-                for pattern in company_patterns:
-                    match = re.search(pattern, text, re.IGNORECASE)
-                    if match:
-                        fields['company_name'] = match.group(1).strip()
-                        break
-                
-                # Extract dates
-                date_patterns = [
-                    r'First\s*Issue\s*Date[:\s]*(\d{2}\s+\w+\s+\d{4})',
-                    r'Current\s*Issue\s*Date[:\s]*(\d{2}\s+\w+\s+\d{4})',
-                    r'Expiry\s*Date[:\s]*(\d{2}\s+\w+\s+\d{4})'
-                ]
-                
-                for pattern in date_patterns:
-                    match = re.search(pattern, text, re.IGNORECASE)
-                    if match:
-                        if 'first' in pattern.lower():
-                            fields['first_issue_date'] = match.group(1).strip()
-                        elif 'current' in pattern.lower():
-                            fields['current_issue_date'] = match.group(1).strip()
-                        elif 'expiry' in pattern.lower():
-                            fields['expiry_date'] = match.group(1).strip()
+                # License, company and issue/expiry dates
+                fields.update(ID_CARD_HEADER_SET.extract(text))
                 
         except Exception as e:
             logger.warning(f"Error extracting main header fields: {str(e)}")
@@ -2292,110 +2132,11 @@ class DocumentProcessor:
         fields = {}
         
         try:
-            # Invoice number - look for patterns like INV-000038
-            invoice_patterns = [
-                r'#?\s*(INV[-\s]?\d+)',
-                r'Invoice\s*#?\s*([A-Z0-9\-]+)',
-                r'#\s*([A-Z]{2,}[-\s]?\d+)',
-                r'INV[-\s]?(\d+)'
-            ]
-            
-            for pattern in invoice_patterns:
-                match = re.search(pattern, text, re.IGNORECASE)
-                if match:
-                    fields['invoice_number'] = match.group(1).strip()
-                    break
-            
-            # Invoice date
-            date_patterns = [
-                r'Invoice\s*Date\s*[:\s]*(\d{1,2}\s+\w+\s+\d{4})',
-                r'Date\s*[:\s]*(\d{1,2}\s+\w+\s+\d{4})',
-                r'(\d{1,2}\s+Feb\s+\d{4})',
-                r'(\d{1,2}\s+Jan\s+\d{4})',
-                r'(\d{1,2}\s+Mar\s+\d{4})'
-            ]
-            
-            for pattern in date_patterns:
-                match = re.search(pattern, text, re.IGNORECASE)
-                if match:
-                    fields['invoice_date'] = match.group(1).strip()
-                    break
-            
-            # Due date
-            due_patterns = [
-                r'Due\s*Date\s*[:\s]*(\d{1,2}\s+\w+\s+\d{4})',
-                r'Due\s*[:\s]*(\d{1,2}\s+\w+\s+\d{4})'
-            ]
-            
-            for pattern in due_patterns:
-                match = re.search(pattern, text, re.IGNORECASE)
-                if match:
-                    fields['due_date'] = match.group(1).strip()
-                    break
-            
-            # Total amount - look for AED amounts
-            total_patterns = [
-                r'Total\s*[:\s]*AED\s*([\d,]+\.?\d*)',
-                r'Balance\s*Due\s*[:\s]*AED\s*([\d,]+\.?\d*)',
-                r'AED\s*([\d,]+\.?\d*)\s*$'
-            ]
-            
-            for pattern in total_patterns:
-                match = re.search(pattern, text, re.IGNORECASE)
-                if match:
-                    fields['total_amount'] = f"AED {match.group(1)}"
-                    break
-            
-            # Subtotal
-            subtotal_patterns = [
-                r'Sub\s*Total\s*[:\s]*([\d,]+\.?\d*)',
-                r'Subtotal\s*[:\s]*([\d,]+\.?\d*)'
-            ]
-            
-            for pattern in subtotal_patterns:
-                match = re.search(pattern, text, re.IGNORECASE)
-                if match:
-                    fields['subtotal'] = f"AED {match.group(1)}"
-                    break
-            
-            # Tax amount
-            tax_patterns = [
-                r'Tax\s*[:\s]*AED\s*([\d,]+\.?\d*)',
-                r'VAT\s*[:\s]*AED\s*([\d,]+\.?\d*)',
-                r'(\d+\.\d{2})\s*$'  # Last amount in line
-            ]
-            
-            for pattern in tax_patterns:
-                match = re.search(pattern, text, re.IGNORECASE)
-                if match:
-                    fields['tax_amount'] = f"AED {match.group(1)}"
-                    break
-            
-            # VAT Number
-            vat_patterns = [
-                r'VAT\s*No\.?\s*[:\s]*(\d+)',
-                r'TRN\s*(\d+)',
-                r'Tax\s*Registration\s*Number\s*[:\s]*(\d+)'
-            ]
-            
-            for pattern in vat_patterns:
-                match = re.search(pattern, text, re.IGNORECASE)
-                if match:
-                    fields['vat_number'] = match.group(1).strip()
-                    break
-            
-            # PO Number
-            po_patterns = [
-                r'P\.O\.#?\s*[:\s]*([A-Z0-9\-]+)',
-                r'Purchase\s*Order\s*[:\s]*([A-Z0-9\-]+)',
-                r'PO\s*[:\s]*([A-Z0-9\-]+)'
-            ]
-            
-            for pattern in po_patterns:
-                match = re.search(pattern, text, re.IGNORECASE)
-                if match:
-                    fields['po_number'] = match.group(1).strip()
-                    break
+            fields = DOCUMENT_TYPE_FIELD_SETS['invoice'].extract(text)
+            # Amounts are reported in AED
+            for field in ('total_amount', 'subtotal', 'tax_amount'):
+                if field in fields:
+                    fields[field] = f"AED {fields[field]}"
             
             # Extract from bounding boxes for better accuracy
             for bbox in bounding_boxes:
@@ -2407,7 +2148,7 @@ class DocumentProcessor:
                 elif 'AED' in bbox_text and ',' in bbox_text:
                     if 'total' not in fields.get('total_amount', '').lower():
                         fields['total_amount'] = bbox_text
-                elif re.match(r'\d{2}\s+\w+\s+\d{4}', bbox_text):
+                elif BBOX_DATE_RE.match(bbox_text):
                     if not fields.get('invoice_date'):
                         fields['invoice_date'] = bbox_text
                         
@@ -2421,43 +2162,7 @@ class DocumentProcessor:
         fields = {}
         
         try:
-            # License number patterns
-            license_patterns = [
-                r'License\s*No\.?\s*[:\s]*([A-Z0-9\-]+)',
-                r'License\s*Number\s*[:\s]*([A-Z0-9\-]+)',
-                r'ADFZ[-\s]?(\d+)'
-            ]
-            
-            for pattern in license_patterns:
-                match = re.search(pattern, text, re.IGNORECASE)
-                if match:
-                    fields['license_number'] = match.group(1).strip()
-                    break
-            
-            # Registration number
-            reg_patterns = [
-                r'Registration\s*No\.?\s*[:\s]*(\d+)',
-                r'Reg\s*No\.?\s*[:\s]*(\d+)'
-            ]
-            
-            for pattern in reg_patterns:
-                match = re.search(pattern, text, re.IGNORECASE)
-                if match:
-                    fields['registration_number'] = match.group(1).strip()
-                    break
-            
-            # Company name
-            company_patterns = [
-                r'Trade\s*Name\s*[:\s]*([^\n]+)',
-                r'Company\s*Name\s*[:\s]*([^\n]+)'
-            ]
-            
-            for pattern in company_patterns:
-                match = re.search(pattern, text, re.IGNORECASE)
-                if match:
-                    fields['company_name'] = match.group(1).strip()
-                    break
-                    
+            fields = DOCUMENT_TYPE_FIELD_SETS['id_card'].extract(text)
         except Exception as e:
             logger.warning(f"Error extracting ID card fields: {str(e)}")
         
@@ -2468,31 +2173,7 @@ class DocumentProcessor:
         fields = {}
         
         try:
-            # Revenue patterns
-            revenue_patterns = [
-                r'Revenue\s*[:\s]*([\d,]+\.?\d*)',
-                r'Total\s*Revenue\s*[:\s]*([\d,]+\.?\d*)',
-                r'Income\s*[:\s]*([\d,]+\.?\d*)'
-            ]
-            
-            for pattern in revenue_patterns:
-                match = re.search(pattern, text, re.IGNORECASE)
-                if match:
-                    fields['revenue'] = match.group(1).strip()
-                    break
-            
-            # Profit patterns
-            profit_patterns = [
-                r'Profit\s*[:\s]*([\d,]+\.?\d*)',
-                r'Net\s*Profit\s*[:\s]*([\d,]+\.?\d*)'
-            ]
-            
-            for pattern in profit_patterns:
-                match = re.search(pattern, text, re.IGNORECASE)
-                if match:
-                    fields['profit'] = match.group(1).strip()
-                    break
-                    
+            fields = DOCUMENT_TYPE_FIELD_SETS['financial_report'].extract(text)
         except Exception as e:
             logger.warning(f"Error extracting financial report fields: {str(e)}")
         
@@ -2503,30 +2184,7 @@ class DocumentProcessor:
         fields = {}
         
         try:
-            # Contract number
-            contract_patterns = [
-                r'Contract\s*No\.?\s*[:\s]*([A-Z0-9\-]+)',
-                r'Agreement\s*No\.?\s*[:\s]*([A-Z0-9\-]+)'
-            ]
-            
-            for pattern in contract_patterns:
-                match = re.search(pattern, text, re.IGNORECASE)
-                if match:
-                    fields['contract_number'] = match.group(1).strip()
-                    break
-            
-            # Contract date
-            date_patterns = [
-                r'Contract\s*Date\s*[:\s]*(\d{1,2}[/\-]\d{1,2}[/\-]\d{2,4})',
-                r'Effective\s*Date\s*[:\s]*(\d{1,2}[/\-]\d{1,2}[/\-]\d{2,4})'
-            ]
-            
-            for pattern in date_patterns:
-                match = re.search(pattern, text, re.IGNORECASE)
-                if match:
-                    fields['contract_date'] = match.group(1).strip()
-                    break
-                    
+            fields = DOCUMENT_TYPE_FIELD_SETS['contract'].extract(text)
         except Exception as e:
             logger.warning(f"Error extracting contract fields: {str(e)}")
         
@@ -2537,30 +2195,7 @@ class DocumentProcessor:
         fields = {}
         
         try:
-            # Receipt number
-            receipt_patterns = [
-                r'Receipt\s*No\.?\s*[:\s]*([A-Z0-9\-]+)',
-                r'Receipt\s*#\s*[:\s]*([A-Z0-9\-]+)'
-            ]
-            
-            for pattern in receipt_patterns:
-                match = re.search(pattern, text, re.IGNORECASE)
-                if match:
-                    fields['receipt_number'] = match.group(1).strip()
-                    break
-            
-            # Total amount
-            total_patterns = [
-                r'Total\s*[:\s]*([\d,]+\.?\d*)',
-                r'Amount\s*[:\s]*([\d,]+\.?\d*)'
-            ]
-            
-            for pattern in total_patterns:
-                match = re.search(pattern, text, re.IGNORECASE)
-                if match:
-                    fields['total_amount'] = match.group(1).strip()
-                    break
-                    
+            fields = DOCUMENT_TYPE_FIELD_SETS['receipt'].extract(text)
         except Exception as e:
             logger.warning(f"Error extracting receipt fields: {str(e)}")
         
@@ -2572,12 +2207,12 @@ class DocumentProcessor:
         
         try:
             # Look for any dates
-            dates = re.findall(r'\d{1,2}[/\-]\d{1,2}[/\-]\d{2,4}', text)
-            if dates:
-                fields['date'] = dates[0]
+            date = GENERIC_DATE_RE.search(text)
+            if date:
+                fields['date'] = date.group(0)
             
             # Look for any amounts
-            amounts = re.findall(r'[\d,]+\.?\d*', text)
+            amounts = GENERIC_AMOUNT_RE.findall(text)
             if amounts:
                 fields['amount'] = amounts[-1]  # Take the last amount found
                 
@@ -2591,62 +2226,18 @@ class DocumentProcessor:
         fields = {}
         
         try:
-            # Create a mapping of field names to their values based on common patterns
-            field_mappings = {
-                'license_number': ['license no', 'license number', 'licence no', 'licence number'],
-                'registration_number': ['registration no', 'registration number', 'reg no'],
-                'customs_registration': ['customs registration no', 'customs registration number', 'customs reg'],
-                'company_name': ['trade name', 'company name', 'business name', 'organization name'],
-                'first_issue_date': ['first issue date', 'initial issue date', 'original issue date'],
-                'current_issue_date': ['current issue date', 'issue date', 'issued date'],
-                'expiry_date': ['expiry date', 'expiration date', 'valid until', 'expires'],
-                'legal_form': ['legal form', 'company type', 'entity type', 'business type'],
-                'manager_name': ['manager name', 'contact person', 'authorized person', 'representative'],
-                'email': ['email', 'e-mail', 'email address'],
-                'phone': ['phone', 'phone number', 'telephone', 'contact number', 'mobile'],
-                'address': ['address', 'location', 'street address', 'business address'],
-                'licensed_activities': ['licensed activities', 'activities', 'business activities', 'services']
-            }
-            
             # Convert bounding boxes to a searchable text
             all_text = " ".join([bbox.get('text', '') for bbox in bounding_boxes]).lower()
+            lowered = prefilter_text(all_text)
             
-            # Look for field-value pairs in the text
-            for field_name, field_patterns in field_mappings.items():
-                for pattern in field_patterns:
-                    # Find the pattern and extract the value that follows
-                    import re
-                    
-                    # Create a regex pattern to find the field name followed by a value
-                    regex_pattern = rf'{re.escape(pattern)}\s*:?\s*([^\n\r]+?)(?=\n|$|[A-Z][a-z]+\s*:|$)'
-                    match = re.search(regex_pattern, all_text, re.IGNORECASE)
-                    
-                    if match:
-                        value = match.group(1).strip()
-                        # Clean up the value
-                        value = re.sub(r'[^\w\s@.-]', '', value)  # Remove special characters except common ones
-                        value = value.strip()
-                        
-                        if value and len(value) > 1:
-                            fields[field_name] = value
-                            break
-            
-            # Additional pattern-based extraction for common document fields
-            additional_patterns = {
-                'license_number': [r'(?:license|licence)[\s#:]*([A-Z0-9-]+)', r'([A-Z]{2,}-\d{4,})'],
-                'registration_number': [r'(?:registration|reg)[\s#:]*(\d+)', r'reg[\s#:]*(\d+)'],
-                'email': [r'([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})'],
-                'phone': [r'(\+\d{1,3}\s?\d{1,4}[-\.\s]?\d{1,4}[-\.\s]?\d{1,4})', r'(\(\d{3}\)\s?\d{3}[-\.\s]?\d{4})'],
-                'date': [r'(\d{1,2}\s+(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\s+\d{4})', r'(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})']
-            }
+            # Look for field-value pairs in the text (label phrases in TABLE_FIELD_LABELS)
+            clean = lambda value: TABLE_VALUE_NOISE_RE.sub('', value).strip()  # Remove special characters except common ones
+            fields = TABLE_LABEL_SET.extract(all_text, accept=lambda field, value: len(clean(value)) > 1, lowered=lowered)
+            fields = {field: clean(value) for field, value in fields.items()}
             
-            for field_name, patterns in additional_patterns.items():
-                if field_name not in fields:  # Only if not already found
-                    for pattern in patterns:
-                        matches = re.findall(pattern, all_text, re.IGNORECASE)
-                        if matches:
-                            fields[field_name] = matches[0].strip()
-                            break
+            # Additional pattern-based extraction for common document fields, only if not already found
+            found = set(fields)
+            fields.update(TABLE_ADDITIONAL_SET.extract(all_text, accept=lambda field, value: field not in found, lowered=lowered))
             
             logger.info(f"Extracted {len(fields)} fields from table data: {list(fields.keys())}")
             
@@ -2788,6 +2379,46 @@ class DocumentProcessor:
         """Get all stored corrections."""
         return getattr(self, 'corrections', [])
 
+    def _layoutlm_logits(self, model, encoding) -> torch.Tensor:
+        """Token-classification logits, through the dynamic batcher when enabled."""
+        if self.layoutlm_batcher is not None:
+            return self.layoutlm_batcher.predict(model, dict(encoding))
+        with torch.no_grad():
+            return model(**encoding).logits
+
+    def _reconcile_window_labels(self, probabilities: torch.Tensor, window_word_ids: List[List[Optional[int]]],
+                                 num_words: int) -> torch.Tensor:
+        """Merge per-window token predictions into one label per word.
+
+        Each word is scored by the first sub-token of every window that covers
+        it; overlapping windows are reconciled by averaging their probabilities.
+        Words no window reached are labelled "O". Returns shape ``[1, num_words]``.
+        """
+        num_labels = probabilities.shape[-1]
+        totals = torch.zeros(num_words, num_labels)
+        counts = torch.zeros(num_words)
+        probabilities = probabilities.detach().cpu()
+        for window, word_ids in enumerate(window_word_ids):
+            seen = set()
+            for token, word_id in enumerate(word_ids):
+                if word_id is None or word_id in seen or word_id >= num_words or token >= probabilities.shape[1]:
+                    continue
+                seen.add(word_id)
+                totals[word_id] += probabilities[window, token]
+                counts[word_id] += 1
+        labels = torch.full((num_words,), self.label2id.get("O", 0), dtype=torch.long)
+        covered = counts > 0
+        if covered.any():
+            labels[covered] = torch.argmax(totals[covered] / counts[covered].unsqueeze(-1), dim=-1)
+        logger.info(f"LayoutLM windows: {len(window_word_ids)}, words covered: {int(covered.sum())}/{num_words}")
+        return labels.unsqueeze(0)
+
+    def get_layoutlm_batch_stats(self) -> Dict[str, Any]:
+        """LayoutLM batcher utilisation (``enabled`` only when batching is off)."""
+        if self.layoutlm_batcher is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.layoutlm_batcher.get_stats()}
+
     def _extract_fields_layoutlm_universal(self, image, text: str, bounding_boxes: List[Dict], model=None, processor=None) -> Dict[str, Any]:
         """Universal field extraction using LayoutLM's document understanding."""
         fields = {}
@@ -2802,6 +2433,10 @@ class DocumentProcessor:
             
             logger.info("Starting universal LayoutLM field extraction...")
             
+            # PDF pages are rendered grayscale; the LayoutLMv3 processor wants RGB
+            if image.mode != 'RGB':
+                image = image.convert('RGB')
+
             # Get image dimensions for proper normalization
             img_width, img_height = image.size
             
@@ -2869,39 +2504,29 @@ class DocumentProcessor:
                         last_box = formatted_boxes[-1] if formatted_boxes else [0, 0, 100, 100]
                         formatted_boxes.extend([last_box] * (len(words) - len(formatted_boxes)))
                 
-                # Limit input size to avoid memory issues
-                max_words = 256
-                if len(words) > max_words:
-                    words = words[:max_words]
-                    formatted_boxes = formatted_boxes[:max_words]
-                
                 logger.info(f"LayoutLM input: {len(words)} words, {len(formatted_boxes)} boxes")
                 
-                encoding = self.layout_processor(
-                    image,
-                    words,
-                    boxes=formatted_boxes,
-                    return_tensors="pt",
-                    truncation=True,
-                    padding=True,
-                    max_length=512
+                # Overlapping 512-token windows so text below the fold is classified too
+                encoding, window_word_ids = encode_windows(
+                    processor, image, words, formatted_boxes,
+                    stride=self.layoutlm_window_stride, max_windows=self.layoutlm_max_windows
                 )
                 
-                logger.info("LayoutLM encoding successful")
+                logger.info(f"LayoutLM encoding successful ({len(window_word_ids)} windows)")
                 
             except Exception as e:
                 logger.warning(f"LayoutLM encoding failed: {str(e)}")
                 return {}
             
-            # Get model predictions
-            with torch.no_grad():
-                outputs = model(**encoding)
-                predictions = torch.nn.functional.softmax(outputs.logits, dim=-1)
-                predicted_labels = torch.argmax(predictions, dim=-1)
+            # All windows of the page go through one batched forward pass
+            logits = self._layoutlm_logits(model, encoding)
+            predictions = torch.nn.functional.softmax(logits, dim=-1)
+            predicted_labels = self._reconcile_window_labels(predictions, window_word_ids, len(words))
             
             # Extract fields based on LayoutLM predictions and spatial analysis
+            # (labels are already per word, so there is no padding to strip)
             fields = self._extract_fields_from_layout_analysis(
-                words, boxes, predicted_labels, encoding, text
+                words, boxes, predicted_labels, {}, text
             )
             
             logger.info(f"LayoutLM universal extraction found {len(fields)} fields")
@@ -2993,28 +2618,19 @@ class DocumentProcessor:
     def _extract_numeric_fields(self, field_groups: List[Dict]) -> Dict[str, Any]:
         """Extract numeric fields like amounts, quantities, etc."""
         fields = {}
+        classifier = get_keyword_classifier()
         
         for group in field_groups:
             text = ' '.join(group['words']).strip()
             
             # Look for monetary amounts
             if re.search(r'[\$€£¥₹]', text) or re.search(r'\d+\.\d{2}', text):
-                # Check if this looks like a total amount
-                if any(keyword in text.lower() for keyword in ['total', 'amount', 'sum', 'due', 'balance']):
-                    fields['total_amount'] = text
-                elif any(keyword in text.lower() for keyword in ['tax', 'vat', 'gst']):
-                    fields['tax_amount'] = text
-                elif any(keyword in text.lower() for keyword in ['subtotal', 'sub total']):
-                    fields['subtotal'] = text
-                elif any(keyword in text.lower() for keyword in ['discount', 'off']):
-                    fields['discount'] = text
-                else:
-                    # Generic monetary field
-                    fields['monetary_amount'] = text
+                # Total, tax, subtotal or discount by keyword; otherwise a generic monetary field
+                fields[classifier.first_match(text, "amount_fields") or 'monetary_amount'] = text
             
             # Look for quantities
             elif re.search(r'^\d+$', text) and len(text) <= 10:
-                if any(keyword in ' '.join(group['words'][:3]).lower() for keyword in ['qty', 'quantity', 'units']):
+                if classifier.first_match(' '.join(group['words'][:3]), "quantity_fields"):
                     fields['quantity'] = text
         
         return fields
@@ -3022,6 +2638,7 @@ class DocumentProcessor:
     def _extract_date_fields(self, field_groups: List[Dict]) -> Dict[str, Any]:
         """Extract date fields."""
         fields = {}
+        classifier = get_keyword_classifier()
         
         for group in field_groups:
             text = ' '.join(group['words']).strip()
@@ -3036,13 +2653,8 @@ class DocumentProcessor:
             for pattern in date_patterns:
                 if re.search(pattern, text, re.IGNORECASE):
                     # Determine date type based on context
-                    context_words = ' '.join(group['words'][:5]).lower()
-                    if any(keyword in context_words for keyword in ['due', 'payment', 'pay by']):
-                        fields['due_date'] = text
-                    elif any(keyword in context_words for keyword in ['issue', 'create', 'generate']):
-                        fields['issue_date'] = text
-                    else:
-                        fields['date'] = text
+                    context_words = ' '.join(group['words'][:5])
+                    fields[classifier.first_match(context_words, "date_fields") or 'date'] = text
                     break
         
         return fields
@@ -3050,21 +2662,15 @@ class DocumentProcessor:
     def _extract_identifier_fields(self, field_groups: List[Dict]) -> Dict[str, Any]:
         """Extract identifier fields like document numbers, IDs, etc."""
         fields = {}
+        classifier = get_keyword_classifier()
         
         for group in field_groups:
             text = ' '.join(group['words']).strip()
             
             # Look for document numbers/IDs
             if re.search(r'[A-Z]{2,}\d{4,}', text) or re.search(r'\d{4,}-\d{3,}', text):
-                context_words = ' '.join(group['words'][:3]).lower()
-                if any(keyword in context_words for keyword in ['invoice', 'inv', 'bill', 'receipt']):
-                    fields['document_number'] = text
-                elif any(keyword in context_words for keyword in ['po', 'purchase', 'order']):
-                    fields['purchase_order'] = text
-                elif any(keyword in context_words for keyword in ['quote', 'estimate']):
-                    fields['quote_number'] = text
-                else:
-                    fields['reference_number'] = text
+                context_words = ' '.join(group['words'][:3])
+                fields[classifier.first_match(context_words, "identifier_fields") or 'reference_number'] = text
             
             # Look for email addresses
             elif re.search(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}', text):
@@ -3079,6 +2685,7 @@ class DocumentProcessor:
     def _extract_text_fields(self, field_groups: List[Dict]) -> Dict[str, Any]:
         """Extract text fields like names, addresses, descriptions."""
         fields = {}
+        classifier = get_keyword_classifier()
         
         for group in field_groups:
             text = ' '.join(group['words']).strip()
@@ -3089,17 +2696,10 @@ class DocumentProcessor:
             
             # Look for company/person names (usually longer text blocks)
             if len(text) > 5 and len(text) < 100:
-                context_words = ' '.join(group['words'][:3]).lower()
-                if any(keyword in context_words for keyword in ['from', 'vendor', 'company', 'bill to']):
-                    fields['vendor_name'] = text
-                elif any(keyword in context_words for keyword in ['to', 'customer', 'client', 'ship to']):
-                    fields['customer_name'] = text
-                elif any(keyword in context_words for keyword in ['contact', 'person', 'representative']):
-                    fields['contact_person'] = text
-                elif any(keyword in context_words for keyword in ['address', 'location', 'street']):
-                    fields['address'] = text
-                elif any(keyword in context_words for keyword in ['description', 'item', 'product', 'service']):
-                    fields['description'] = text
+                context_words = ' '.join(group['words'][:3])
+                label = classifier.first_match(context_words, "name_fields")
+                if label:
+                    fields[label] = text
         
         return fields
 
@@ -13,6 +13,8 @@ import json
 from pathlib import Path
 import io
 import fitz
+from models.page_renderer import get_page_renderer
+from models.learning_store import LearningStore
 from pdf2image import convert_from_path
 import time
 import dateutil.parser
@@ -58,15 +60,10 @@ class DonutDocumentProcessor:
             # Set supported file extensions
             self.supported_extensions = ['.pdf', '.jpg', '.jpeg', '.png', '.tiff', '.bmp']
             
-            # Initialize learning data
-            self.learning_data = {
-                "corrections": {},
-                "annotations": {},
-                "patterns": {},
-                "confidence_history": {}
-            }
+            # Learning data: batched writes to SQLite, indexed pattern lookup
+            self.learning_store = LearningStore()
             
-            # Load existing learning data if available
+            # Import learning_data.json from earlier versions once
             self._load_learning_data()
             
             logger.info("DonutDocumentProcessor initialized successfully")
@@ -76,35 +73,16 @@ class DonutDocumentProcessor:
             raise
 
     def _load_learning_data(self):
-        """Load existing learning data from file."""
+        """Import the old learning_data.json into the learning store (once)."""
         try:
-            learning_data_path = Path("learning_data.json")
-            if learning_data_path.exists():
-                with open(learning_data_path, 'r') as f:
-                    self.learning_data = json.load(f)
-                logger.info("Loaded existing learning data")
+            if self.learning_store.import_json(Path("learning_data.json")):
+                logger.info("Imported existing learning data")
         except Exception as e:
             logger.error(f"Error loading learning data: {str(e)}")
 
-    def _save_learning_data(self):
-        """Save learning data to file."""
-        try:
-            learning_data_path = Path("learning_data.json")
-            with open(learning_data_path, 'w') as f:
-                json.dump(self.learning_data, f, indent=2)
-            logger.info("Saved learning data")
-        except Exception as e:
-            logger.error(f"Error saving learning data: {str(e)}")
-
     def add_correction(self, doc_type: str, field: str, original_value: str, corrected_value: str, context: Dict[str, Any]):
         """Add a correction to the learning system."""
         try:
-            if doc_type not in self.learning_data["corrections"]:
-                self.learning_data["corrections"][doc_type] = {}
-            
-            if field not in self.learning_data["corrections"][doc_type]:
-                self.learning_data["corrections"][doc_type][field] = []
-            
             correction = {
                 "original": original_value,
                 "corrected": corrected_value,
@@ -112,8 +90,8 @@ class DonutDocumentProcessor:
                 "timestamp": time.time()
             }
             
-            self.learning_data["corrections"][doc_type][field].append(correction)
-            self._save_learning_data()
+            self.learning_store.add_correction(doc_type, field, original_value, corrected_value,
+                                               context, correction["timestamp"])
             
             # Update patterns based on the correction
             self._update_patterns(doc_type, field, correction)
@@ -126,11 +104,10 @@ class DonutDocumentProcessor:
     def add_annotation(self, doc_id: str, annotation: Dict[str, Any]):
         """Add a user annotation to the learning system."""
         try:
-            self.learning_data["annotations"][doc_id] = {
+            self.learning_store.add_annotation(doc_id, {
                 **annotation,
                 "timestamp": time.time()
-            }
-            self._save_learning_data()
+            })
             logger.info(f"Added annotation for document {doc_id}")
             
         except Exception as e:
@@ -139,12 +116,6 @@ class DonutDocumentProcessor:
     def _update_patterns(self, doc_type: str, field: str, correction: Dict[str, Any]):
         """Update learned patterns based on corrections."""
         try:
-            if doc_type not in self.learning_data["patterns"]:
-                self.learning_data["patterns"][doc_type] = {}
-            
-            if field not in self.learning_data["patterns"][doc_type]:
-                self.learning_data["patterns"][doc_type][field] = []
-            
             # Extract patterns from the correction context
             context = correction["context"]
             if "text" in context:
@@ -162,13 +133,7 @@ class DonutDocumentProcessor:
                     pattern = text[start:end]
                     
                     # Add the pattern with the correction
-                    self.learning_data["patterns"][doc_type][field].append({
-                        "pattern": pattern,
-                        "correction": corrected,
-                        "confidence": 0.8
-                    })
-            
-            self._save_learning_data()
+                    self.learning_store.add_pattern(doc_type, field, pattern, corrected, 0.8)
             
         except Exception as e:
             logger.error(f"Error updating patterns: {str(e)}")
@@ -176,18 +141,8 @@ class DonutDocumentProcessor:
     def _apply_learned_patterns(self, doc_type: str, field: str, text: str) -> Tuple[str, float]:
         """Apply learned patterns to improve extraction."""
         try:
-            if doc_type in self.learning_data["patterns"] and field in self.learning_data["patterns"][doc_type]:
-                patterns = self.learning_data["patterns"][doc_type][field]
-                
-                for pattern_data in patterns:
-                    pattern = pattern_data["pattern"]
-                    correction = pattern_data["correction"]
-                    confidence = pattern_data["confidence"]
-                    
-                    if pattern in text:
-                        return correction, confidence
-            
-            return None, 0.0
+            # Oldest stored pattern contained in the text, found through the pattern index
+            return self.learning_store.find_pattern(doc_type, field, text)
             
         except Exception as e:
             logger.error(f"Error applying learned patterns: {str(e)}")
@@ -196,23 +151,8 @@ class DonutDocumentProcessor:
     def _update_confidence_history(self, doc_type: str, field: str, confidence: float):
         """Update confidence history for a field."""
         try:
-            if doc_type not in self.learning_data["confidence_history"]:
-                self.learning_data["confidence_history"][doc_type] = {}
-            
-            if field not in self.learning_data["confidence_history"][doc_type]:
-                self.learning_data["confidence_history"][doc_type][field] = []
-            
-            self.learning_data["confidence_history"][doc_type][field].append({
-                "confidence": confidence,
-                "timestamp": time.time()
-            })
-            
-            # Keep only last 100 confidence scores
-            if len(self.learning_data["confidence_history"][doc_type][field]) > 100:
-                self.learning_data["confidence_history"][doc_type][field] = \
-                    self.learning_data["confidence_history"][doc_type][field][-100:]
-            
-            self._save_learning_data()
+            # The store keeps the last 100 confidence scores per field
+            self.learning_store.add_confidence(doc_type, field, confidence, time.time())
             
         except Exception as e:
             logger.error(f"Error updating confidence history: {str(e)}")
@@ -220,27 +160,19 @@ class DonutDocumentProcessor:
     def get_learning_stats(self) -> Dict[str, Any]:
         """Get statistics about the learning system."""
         try:
+            store_stats = self.learning_store.get_stats()
             stats = {
-                "total_corrections": sum(
-                    len(field_corrections)
-                    for doc_type in self.learning_data["corrections"].values()
-                    for field_corrections in doc_type.values()
-                ),
-                "total_annotations": len(self.learning_data["annotations"]),
-                "total_patterns": sum(
-                    len(field_patterns)
-                    for doc_type in self.learning_data["patterns"].values()
-                    for field_patterns in doc_type.values()
-                ),
+                "total_corrections": store_stats["total_corrections"],
+                "total_annotations": store_stats["total_annotations"],
+                "total_patterns": store_stats["total_patterns"],
                 "confidence_trends": {}
             }
             
             # Calculate confidence trends
-            for doc_type, fields in self.learning_data["confidence_history"].items():
+            for doc_type, fields in store_stats["recent_confidences"].items():
                 stats["confidence_trends"][doc_type] = {}
-                for field, history in fields.items():
-                    if history:
-                        recent_confidences = [h["confidence"] for h in history[-10:]]
+                for field, recent_confidences in fields.items():
+                    if recent_confidences:
                         stats["confidence_trends"][doc_type][field] = {
                             "current": recent_confidences[-1] if recent_confidences else 0.0,
                             "average": sum(recent_confidences) / len(recent_confidences) if recent_confidences else 0.0,
@@ -927,9 +859,8 @@ class DonutDocumentProcessor:
                     # Try PyMuPDF first
                     doc = fitz.open(file_path)
                     page = doc[0]
-                    pix = page.get_pixmap(matrix=fitz.Matrix(300/72, 300/72))
-                    img_data = pix.tobytes("png")
-                    image = Image.open(io.BytesIO(img_data))
+                    # 300 dpi straight from the pixmap (no PNG encode/decode round trip)
+                    image = get_page_renderer().render(page, zoom=300/72, grayscale=False).image()
                     doc.close()
                     logger.info("Successfully converted PDF using PyMuPDF")
                     return image
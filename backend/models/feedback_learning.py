@@ -11,6 +11,8 @@ import torch
 from transformers import DonutProcessor, VisionEncoderDecoderModel
 import re
 
+from .feedback_store import FeedbackStore, count_corrections
+
 logger = logging.getLogger(__name__)
 
 class FeedbackLearningSystem:
@@ -28,13 +30,14 @@ class FeedbackLearningSystem:
         self.feedback_dir = self.model_dir / "feedback"
         self.feedback_dir.mkdir(parents=True, exist_ok=True)
         
-        # Initialize feedback storage
-        self.feedback_data = {}
+        # Append-only feedback log shared by all workers (SQLite WAL)
+        self.feedback_store = FeedbackStore(os.getenv("FEEDBACK_DB_PATH", str(self.feedback_dir / "feedback.sqlite")))
         self.performance_metrics = {
             'accuracy': 0.0,
             'precision': 0.0,
             'recall': 0.0
         }
+        self.updated_patterns: Dict[str, List[Dict]] = {}
         
         # Load existing feedback if available
         self._load_feedback_data()
@@ -47,26 +50,19 @@ class FeedbackLearningSystem:
         logger.info("Feedback Learning System initialized")
     
     def _load_feedback_data(self):
-        """Load existing feedback data from disk."""
+        """Import the old feedback_data.json once, then load metrics and patterns."""
         try:
-            feedback_file = self.feedback_dir / "feedback_data.json"
-            if feedback_file.exists():
-                with open(feedback_file, 'r') as f:
-                    self.feedback_data = json.load(f)
-                logger.info(f"Loaded {len(self.feedback_data)} feedback entries")
+            self.feedback_store.import_json(self.feedback_dir / "feedback_data.json")
+            pattern_file = self.feedback_dir / "updated_patterns.json"
+            if pattern_file.exists():
+                with open(pattern_file, 'r') as f:
+                    self.updated_patterns = json.load(f)
+            totals = self.feedback_store.totals()
+            self._update_performance_metrics(totals)
+            logger.info(f"Feedback log holds {totals['entries']} entries for {totals['documents']} documents")
         except Exception as e:
             logger.error(f"Error loading feedback data: {str(e)}")
     
-    def _save_feedback_data(self):
-        """Save feedback data to disk."""
-        try:
-            feedback_file = self.feedback_dir / "feedback_data.json"
-            with open(feedback_file, 'w') as f:
-                json.dump(self.feedback_data, f, indent=2)
-            logger.info("Saved feedback data successfully")
-        except Exception as e:
-            logger.error(f"Error saving feedback data: {str(e)}")
-    
     def update_from_feedback(self, document_id: str, corrections: Dict[str, Dict[str, str]]):
         """Update the system with user corrections.
         
@@ -86,13 +82,8 @@ class FeedbackLearningSystem:
                 'corrections': corrections
             }
             
-            # Add to feedback data
-            if document_id not in self.feedback_data:
-                self.feedback_data[document_id] = []
-            self.feedback_data[document_id].append(feedback_entry)
-            
-            # Save updated feedback
-            self._save_feedback_data()
+            # Append to the feedback log
+            self.feedback_store.append(document_id, feedback_entry, count_corrections(corrections))
             
             # Update performance metrics
             self._update_performance_metrics()
@@ -102,17 +93,12 @@ class FeedbackLearningSystem:
         except Exception as e:
             logger.error(f"Error updating feedback: {str(e)}")
     
-    def _update_performance_metrics(self):
-        """Update performance metrics based on feedback data."""
+    def _update_performance_metrics(self, totals: Optional[Dict[str, int]] = None):
+        """Update performance metrics from the running totals of the feedback log."""
         try:
-            total_corrections = 0
-            total_fields = 0
-            
-            for doc_id, feedback_entries in self.feedback_data.items():
-                for entry in feedback_entries:
-                    corrections = entry.get('corrections', {})
-                    total_corrections += sum(len(corr) for corr in corrections.values())
-                    total_fields += sum(len(corr) for corr in corrections.values())
+            totals = totals or self.feedback_store.totals()
+            total_corrections = totals['corrections']
+            total_fields = totals['fields']
             
             if total_fields > 0:
                 # Simple metrics calculation
@@ -120,7 +106,7 @@ class FeedbackLearningSystem:
                 self.performance_metrics['precision'] = self.performance_metrics['accuracy']
                 self.performance_metrics['recall'] = self.performance_metrics['accuracy']
             
-            logger.info(f"Updated performance metrics: {self.performance_metrics}")
+            logger.debug(f"Updated performance metrics: {self.performance_metrics}")
             
         except Exception as e:
             logger.error(f"Error updating performance metrics: {str(e)}")
@@ -143,7 +129,7 @@ class FeedbackLearningSystem:
             # Save training configuration
             config = {
                 'iterations': iterations,
-                'feedback_entries': len(self.feedback_data),
+                'feedback_entries': self.feedback_store.totals()['entries'],
                 'timestamp': datetime.now().isoformat()
             }
             
@@ -167,16 +153,11 @@ class FeedbackLearningSystem:
     def get_feedback_summary(self) -> Dict[str, Any]:
         """Get a summary of feedback data."""
         try:
-            total_documents = len(self.feedback_data)
-            total_corrections = sum(
-                sum(len(corr) for corr in entry['corrections'].values())
-                for doc_entries in self.feedback_data.values()
-                for entry in doc_entries
-            )
+            totals = self.feedback_store.totals()
             
             return {
-                'total_documents': total_documents,
-                'total_corrections': total_corrections,
+                'total_documents': totals['documents'],
+                'total_corrections': totals['corrections'],
                 'performance_metrics': self.performance_metrics,
                 'last_update': datetime.now().isoformat()
             }
@@ -213,31 +194,23 @@ class FeedbackLearningSystem:
             "timestamp": datetime.now().isoformat()
         }
         
-        if document_id not in self.feedback_data:
-            self.feedback_data[document_id] = []
-        self.feedback_data[document_id].append(correction)
-        self._save_feedback_data()
+        similar_corrections = self.feedback_store.append(
+            document_id, correction, 1, (entity_type, str(original_value), str(corrected_value))
+        )
         
         # Update performance metrics
         self._update_performance_metrics()
         
         # Check if we should update patterns
-        self._check_pattern_updates(entity_type, original_value, corrected_value, context)
+        self._check_pattern_updates(entity_type, original_value, corrected_value, context, similar_corrections)
         
         logger.info(f"Recorded correction for {entity_type}: {original_value} -> {corrected_value}")
     
-    def _check_pattern_updates(self, entity_type: str, original_value: str, corrected_value: str, context: Optional[str]):
+    def _check_pattern_updates(self, entity_type: str, original_value: str, corrected_value: str,
+                               context: Optional[str], similar_corrections: int):
         """Check if we should update patterns based on corrections."""
-        # Count similar corrections
-        similar_corrections = [
-            c for c in self.feedback_data[document_id]
-            if c["entity_type"] == entity_type and 
-               c["original_value"] == original_value and
-               c["corrected_value"] == corrected_value
-        ]
-        
-        # If we have enough similar corrections, update patterns
-        if len(similar_corrections) >= self.pattern_update_threshold:
+        # similar_corrections: identical corrections so far, counted by the feedback log
+        if similar_corrections >= self.pattern_update_threshold:
             self._update_patterns(entity_type, original_value, corrected_value, context)
     
     def _update_patterns(self, entity_type: str, original_value: str, corrected_value: str, context: Optional[str]):
@@ -245,12 +218,12 @@ class FeedbackLearningSystem:
         # Create a new pattern based on the correction
         if context:
             # Extract a pattern from the context
-            pattern = this._extract_pattern_from_context(context, original_value, corrected_value)
+            pattern = self._extract_pattern_from_context(context, original_value, corrected_value)
             if pattern:
                 # Add the pattern to the updated patterns
-                if pattern not in this.updated_patterns[entity_type]:
-                    this.updated_patterns[entity_type].append(pattern)
-                    this.save_updated_patterns()
+                if pattern not in self.updated_patterns.setdefault(entity_type, []):
+                    self.updated_patterns[entity_type].append(pattern)
+                    self.save_updated_patterns()
                     logger.info(f"Added new pattern for {entity_type}: {pattern}")
         else:
             # If no context, create a simple pattern
@@ -258,9 +231,9 @@ class FeedbackLearningSystem:
                 "label": entity_type.upper(),
                 "pattern": [{"LOWER": original_value.lower()}]
             }
-            if pattern not in this.updated_patterns[entity_type]:
-                this.updated_patterns[entity_type].append(pattern)
-                this.save_updated_patterns()
+            if pattern not in self.updated_patterns.setdefault(entity_type, []):
+                self.updated_patterns[entity_type].append(pattern)
+                self.save_updated_patterns()
                 logger.info(f"Added new pattern for {entity_type}: {pattern}")
     
     def _extract_pattern_from_context(self, context: str, original_value: str, corrected_value: str) -> Optional[Dict]:
@@ -294,14 +267,14 @@ class FeedbackLearningSystem:
     
     def get_updated_patterns(self) -> Dict[str, List[Dict]]:
         """Get the updated patterns."""
-        return this.updated_patterns
+        return self.updated_patterns
     
     def save_updated_patterns(self):
         """Save updated patterns to file."""
         try:
             pattern_file = self.feedback_dir / "updated_patterns.json"
             with open(pattern_file, 'w') as f:
-                json.dump(this.updated_patterns, f, indent=2)
+                json.dump(self.updated_patterns, f, indent=2)
             logger.info("Updated patterns saved successfully")
         except Exception as e:
             logger.error(f"Error saving updated patterns: {str(e)}")
@@ -318,7 +291,7 @@ class FeedbackLearningSystem:
             ruler = nlp.get_pipe("entity_ruler")
             
             # Add updated patterns to the entity ruler
-            for entity_type, patterns in this.updated_patterns.items():
+            for entity_type, patterns in self.updated_patterns.items():
                 for pattern in patterns:
                     if pattern not in ruler.patterns:
                         ruler.add_patterns([pattern])
@@ -333,19 +306,18 @@ class FeedbackLearningSystem:
         """Prepare training data from feedback corrections."""
         training_data = []
         
-        for doc_id, feedback_entries in self.feedback_data.items():
-            for entry in feedback_entries:
-                corrections = entry.get('corrections', {})
-                for field, corrs in corrections.items():
-                    for start, end, corrected_value in corrs:
-                        # Create a Doc object
-                        text = entry.get("context", corrected_value)
-                        doc = this.nlp.make_doc(text)
-                        
-                        # Create entity annotations
-                        entities = [(start, end, corrected_value)]
-                        
-                        # Add to training data
-                        training_data.append((doc, {"entities": entities}))
+        for doc_id, entry in self.feedback_store.iter_entries():
+            corrections = entry.get('corrections', {})
+            for field, corrs in corrections.items():
+                for start, end, corrected_value in corrs:
+                    # Create a Doc object
+                    text = entry.get("context", corrected_value)
+                    doc = self.nlp.make_doc(text)
+                    
+                    # Create entity annotations
+                    entities = [(start, end, corrected_value)]
+                    
+                    # Add to training data
+                    training_data.append((doc, {"entities": entities}))
         
         return training_data 
\ No newline at end of file
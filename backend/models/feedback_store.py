@@ -0,0 +1,219 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS feedback_entries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    document_id TEXT NOT NULL,
+    entity_type TEXT,
+    original_value TEXT,
+    corrected_value TEXT,
+    corrections INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_feedback_entries_document ON feedback_entries(document_id);
+CREATE TABLE IF NOT EXISTS feedback_documents (
+    document_id TEXT PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS correction_counts (
+    entity_type TEXT NOT NULL,
+    original_value TEXT NOT NULL,
+    corrected_value TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (entity_type, original_value, corrected_value)
+);
+CREATE TABLE IF NOT EXISTS feedback_totals (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+TOTALS = ("entries", "documents", "corrections", "fields", "appends_since_compaction")
+
+
+class FeedbackStore:
+    """Append-only feedback log in SQLite (WAL), shared by all workers on a node.
+
+    Each append is one short ``BEGIN IMMEDIATE`` transaction that inserts the
+    entry and bumps the running totals and the per-correction counts, so a
+    correction costs the same whether the log holds ten entries or ten
+    million; readers never block writers. Every ``compact_every`` appends the
+    writer that crosses the mark prunes entries beyond ``max_entries`` (the
+    totals and correction counts keep counting them), truncates the WAL and
+    returns free pages to the file system.
+    """
+
+    def __init__(self, path: str, compact_every: int = None, max_entries: int = None,
+                 busy_timeout_ms: int = None):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.compact_every = int(compact_every if compact_every is not None else os.getenv("FEEDBACK_COMPACT_EVERY", "10000"))
+        self.max_entries = int(max_entries if max_entries is not None else os.getenv("FEEDBACK_MAX_ENTRIES", "0"))
+        self.busy_timeout_ms = int(busy_timeout_ms or os.getenv("FEEDBACK_BUSY_TIMEOUT_MS", "10000"))
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        with self._lock:
+            self._connection()
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections must not cross a fork (gunicorn --preload)
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None,
+                                   timeout=self.busy_timeout_ms / 1000.0)
+            conn.execute(f"PRAGMA busy_timeout={self.busy_timeout_ms}")
+            # Must precede the first table to take effect on a new file
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            conn.executemany("INSERT OR IGNORE INTO feedback_totals VALUES (?, 0)", [(name,) for name in TOTALS])
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def append(self, document_id: str, payload: Dict[str, Any], corrections: int = 1,
+               correction_key: Optional[Tuple[str, str, str]] = None, fields: Optional[int] = None) -> int:
+        """Log one feedback entry; returns the count of ``correction_key`` so far (0 without one).
+
+        ``corrections`` is the number of field corrections the entry carries and
+        ``fields`` the number of fields reviewed (default: the corrected ones);
+        ``correction_key`` is ``(entity_type, original_value, corrected_value)``.
+        """
+        entity_type, original, corrected = correction_key or (None, None, None)
+        record = json.dumps(payload, ensure_ascii=False, default=str)
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT INTO feedback_entries (document_id, entity_type, original_value, corrected_value, "
+                    "corrections, payload, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (document_id, entity_type, original, corrected, corrections, record,
+                     payload.get("timestamp") or datetime.now().isoformat())
+                )
+                new_document = conn.execute("INSERT OR IGNORE INTO feedback_documents VALUES (?)", (document_id,)).rowcount
+                deltas = {"entries": 1, "documents": new_document, "corrections": corrections,
+                          "fields": corrections if fields is None else fields, "appends_since_compaction": 1}
+                conn.executemany("UPDATE feedback_totals SET value = value + ? WHERE name = ?",
+                                 [(n, name) for name, n in deltas.items() if n])
+                count = 0
+                if correction_key:
+                    conn.execute(
+                        "INSERT INTO correction_counts VALUES (?, ?, ?, 1) ON CONFLICT "
+                        "(entity_type, original_value, corrected_value) DO UPDATE SET count = count + 1",
+                        (entity_type, original, corrected)
+                    )
+                    count = conn.execute(
+                        "SELECT count FROM correction_counts WHERE entity_type = ? AND original_value = ? "
+                        "AND corrected_value = ?", (entity_type, original, corrected)
+                    ).fetchone()[0]
+                due = self.compact_every > 0 and conn.execute(
+                    "SELECT value FROM feedback_totals WHERE name = 'appends_since_compaction'"
+                ).fetchone()[0] >= self.compact_every
+                if due:
+                    conn.execute("UPDATE feedback_totals SET value = 0 WHERE name = 'appends_since_compaction'")
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        if due:
+            self.compact()
+        return count
+
+    def totals(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._connection().execute("SELECT name, value FROM feedback_totals").fetchall()
+        return {name: value for name, value in rows if name != "appends_since_compaction"}
+
+    def correction_count(self, entity_type: str, original_value: str, corrected_value: str) -> int:
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT count FROM correction_counts WHERE entity_type = ? AND original_value = ? AND corrected_value = ?",
+                (entity_type, original_value, corrected_value)
+            ).fetchone()
+        return row[0] if row else 0
+
+    def iter_entries(self, batch_size: int = 1000) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """``(document_id, payload)`` of the retained entries, oldest first, read in batches."""
+        last_id = 0
+        while True:
+            with self._lock:
+                rows = self._connection().execute(
+                    "SELECT id, document_id, payload FROM feedback_entries WHERE id > ? ORDER BY id LIMIT ?",
+                    (last_id, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            for row_id, document_id, payload in rows:
+                yield document_id, json.loads(payload)
+            last_id = rows[-1][0]
+
+    def compact(self) -> Dict[str, int]:
+        """Prune entries beyond ``max_entries``, truncate the WAL and release free pages."""
+        pruned = 0
+        with self._lock:
+            conn = self._connection()
+            if self.max_entries > 0:
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    pruned = conn.execute(
+                        "DELETE FROM feedback_entries WHERE id <= "
+                        "(SELECT id FROM feedback_entries ORDER BY id DESC LIMIT 1 OFFSET ?)", (self.max_entries,)
+                    ).rowcount
+                    conn.execute("COMMIT")
+                except BaseException:
+                    conn.execute("ROLLBACK")
+                    raise
+            conn.execute("PRAGMA incremental_vacuum")
+            # Readers in other workers can keep the WAL from truncating; the next compaction retries
+            busy, wal_pages, _ = conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+        logger.info(f"Feedback log compacted: {pruned} entries pruned, wal_pages={wal_pages}, busy={busy}")
+        return {"pruned": pruned, "wal_pages": wal_pages, "checkpoint_busy": busy}
+
+    def import_json(self, json_path: Path) -> int:
+        """One-time import of the old feedback_data.json; the file is renamed afterwards."""
+        json_path = Path(json_path)
+        claimed = json_path.with_name(json_path.name + ".importing")
+        try:
+            # Only one worker wins the rename, so entries are imported once
+            json_path.rename(claimed)
+        except FileNotFoundError:
+            return 0
+        with open(claimed, "r") as f:
+            data = json.load(f)
+        imported = 0
+        for document_id, entries in data.items():
+            for entry in entries:
+                if "entity_type" in entry:
+                    self.append(document_id, entry, 1,
+                                (entry["entity_type"], str(entry.get("original_value")), str(entry.get("corrected_value"))))
+                else:
+                    self.append(document_id, entry, count_corrections(entry.get("corrections", {})))
+                imported += 1
+        claimed.rename(json_path.with_name(json_path.name + ".imported"))
+        logger.info(f"Imported {imported} feedback entries from {json_path}")
+        return imported
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = dict(self.totals())
+        with self._lock:
+            stats["retained_entries"] = self._connection().execute("SELECT COUNT(*) FROM feedback_entries").fetchone()[0]
+        wal = self.path.with_name(self.path.name + "-wal")
+        stats.update({"path": str(self.path), "size_mb": round(self.path.stat().st_size / (1024 * 1024), 2),
+                      "wal_mb": round(wal.stat().st_size / (1024 * 1024), 2) if wal.exists() else 0.0,
+                      "compact_every": self.compact_every, "max_entries": self.max_entries})
+        return stats
+
+
+def count_corrections(corrections: Dict[str, Any]) -> int:
+    """Field corrections in an ``update_from_feedback`` entry."""
+    return sum(len(corr) for corr in corrections.values())
@@ -0,0 +1,578 @@
+import logging
+import re
+from typing import Dict, Any, List, Optional, Callable, FrozenSet, Tuple
+
+try:
+    from re import _parser as sre_parse  # Python 3.11+
+except ImportError:  # pragma: no cover
+    import sre_parse  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+# Characters str.lower() does not map the way re.IGNORECASE folds them
+_PREFILTER_FOLD = str.maketrans({"\u0307": None, "\u0131": "i", "\u017f": "s"})
+
+
+def prefilter_text(text: str) -> str:
+    """Lower-cased text used to test literal anchors (shared by every pattern set run on ``text``)."""
+    lowered = text.lower()
+    return lowered if text.isascii() else lowered.translate(_PREFILTER_FOLD)
+
+
+def _sequence_anchors(items) -> Optional[FrozenSet[str]]:
+    """Best set of literals one of which every match of ``items`` must contain, or None."""
+    candidates = []
+    run = []
+
+    def flush():
+        if run:
+            candidates.append(frozenset(["".join(run)]))
+            run.clear()
+
+    for op, av in items:
+        if op is sre_parse.LITERAL:
+            run.append(chr(av))
+            continue
+        flush()
+        anchors = None
+        if op is sre_parse.SUBPATTERN:
+            anchors = _sequence_anchors(av[-1])
+        elif op is sre_parse.BRANCH:
+            branches = [_sequence_anchors(branch) for branch in av[1]]
+            if all(branches):
+                anchors = frozenset().union(*branches)
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT) and av[0] >= 1:
+            anchors = _sequence_anchors(av[2])
+        if anchors:
+            candidates.append(anchors)
+    flush()
+    if not candidates:
+        return None
+    # Longest guaranteed literal first, then the fewest alternatives
+    return max(candidates, key=lambda c: (min(len(a) for a in c), -len(c)))
+
+
+def literal_anchors(pattern: str, flags: int = 0) -> Optional[FrozenSet[str]]:
+    """Lower-case ASCII literals, at least one of which occurs in any text the pattern matches."""
+    try:
+        anchors = _sequence_anchors(sre_parse.parse(pattern, flags))
+    except Exception:
+        return None
+    if not anchors or not all(a.isascii() for a in anchors):
+        return None
+    return frozenset(a.lower() for a in anchors)
+
+
+class CompiledPattern:
+    """A compiled regex plus the literals it needs, so it is skipped on pages that cannot match."""
+    __slots__ = ("regex", "anchors", "group")
+
+    def __init__(self, pattern: str, flags: int = 0):
+        self.regex = re.compile(pattern, flags)
+        self.anchors = literal_anchors(pattern, flags)
+        # Patterns without a capture group yield the whole match
+        self.group = 1 if self.regex.groups else 0
+
+    def possible(self, lowered: str) -> bool:
+        return self.anchors is None or any(a in lowered for a in self.anchors)
+
+    def search(self, text: str, lowered: str):
+        if self.anchors is not None and not any(a in lowered for a in self.anchors):
+            return None
+        return self.regex.search(text)
+
+    def value(self, match) -> str:
+        return match.group(self.group) or ""
+
+
+class FieldPatternSet:
+    """``{field: [pattern, ...]}`` compiled once; patterns per field are tried in priority order.
+
+    ``extract`` stops at the first pattern whose value ``accept`` takes (early
+    exit per field). Literal anchors are checked against one lower-cased copy of
+    the text, so on a typical page most patterns never run at all.
+    """
+
+    def __init__(self, spec: Dict[str, List[str]], flags: int = re.IGNORECASE):
+        self.fields: List[Tuple[str, List[CompiledPattern]]] = [
+            (field, [CompiledPattern(p, flags) for p in patterns]) for field, patterns in spec.items()
+        ]
+
+    def extract(self, text: str, accept: Optional[Callable[[str, str], bool]] = None,
+                lowered: Optional[str] = None, strip: bool = True) -> Dict[str, str]:
+        lowered = prefilter_text(text) if lowered is None else lowered
+        fields = {}
+        for field, patterns in self.fields:
+            for pattern in patterns:
+                match = pattern.search(text, lowered)
+                if match is None:
+                    continue
+                value = pattern.value(match)
+                if strip:
+                    value = value.strip()
+                if accept is None or accept(field, value):
+                    fields[field] = value
+                    break
+        return fields
+
+
+# ---------------------------------------------------------------------------
+# Pattern tables
+# ---------------------------------------------------------------------------
+
+# Header/footer fields (document number, revision, page, date, title)
+HEADER_FOOTER_PATTERNS = {
+    "document_number": [
+        r'doc[.-]?\s*#?\s*([A-Z0-9-]+)',
+        r'document\s*number:?\s*([A-Z0-9-]+)',
+        r'TEC-MOS-\d{2}-\d{2}-\d{2}-\d{4}',
+        r'4669-IBU-\d{3}-\w{3}-\w{3}-\w{2}-\d{6}'
+    ],
+    "revision": [
+        r'rev[.-]?\s*#?\s*([A-Z0-9]+)',
+        r'revision:?\s*([A-Z0-9]+)',
+        r'Rev-[A-Z]',
+        r'Rev\s*\d{2}'
+    ],
+    "page": [
+        r'page\s*(\d+)',
+        r'pg[.-]?\s*(\d+)'
+    ],
+    "date": [
+        r'date:?\s*(\d{1,2}[-/]\d{1,2}[-/]\d{2,4})',
+        r'dated:?\s*(\d{1,2}[-/]\d{1,2}[-/]\d{2,4})'
+    ],
+    "title": [
+        r'title:?\s*([^\n]+)',
+        r'subject:?\s*([^\n]+)'
+    ]
+}
+
+# Template-free fields for any document type, in priority order per field
+GENERIC_FIELD_PATTERNS = {
+    # Document Numbers and Identifiers
+    'invoice_number': [
+        r'(INV-\d+)',  # Full invoice number pattern - HIGHEST PRIORITY
+        r'#\s*(INV-\d+)',  # Invoice number with # prefix
+        r'(?:invoice|inv|bill)[\s#:]*([A-Z0-9\-]+)',  # Invoice-specific patterns
+        r'([A-Z]{2,}\d{4,})',  # Pattern like INV-000038
+        r'(INV-\d+|PO-\d+|QTE-\d+|CNT-\d+)',  # Common prefixes
+    ],
+    'document_number': [
+        r'Report\s*Number[:\s]*(\d{8,15})',  # Report number pattern
+        r'(?:report|document|file)\s*(?:number|no|#)[:\s]*(\d{8,15})',  # Document number
+        r'(?:number|no|#|id|identifier)[\s:]*([A-Z0-9\-]+)',
+        r'INV-(\d+)',  # Specific invoice pattern
+        r'(\d{4,}-\d{3,})',    # Pattern like 2024-001
+        r'(\d{6,})',           # Long number sequences
+        r'([A-Z]{2,}\d{2,}[A-Z]?\d{2,})',  # Mixed alphanumeric
+        r'(?:receipt|quote|estimate|contract|agreement|order|po|purchase\s*order)[\s#:]*([A-Z0-9\-]+)',
+    ],
+    'reference_number': [
+        r'(?:ref|reference|tracking)[\s#:]*([A-Z0-9\-]+)',
+        r'(?:order\s*ref|po\s*ref)[\s:]*([A-Z0-9\-]+)',
+        r'(?:customer\s*ref|client\s*ref)[\s:]*([A-Z0-9\-]+)',
+    ],
+
+    # Dates
+    'invoice_date': [
+        r'(?:invoice\s*date|bill\s*date|date)[\s:]*(\d{1,2}\s+(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\s+\d{4})',  # Month name format - HIGHEST PRIORITY
+        r'(?:invoice\s*date|bill\s*date|date)[\s:]*(\d{1,2}[/\-\.]\d{1,2}[/\-\.]\d{2,4})',  # Numeric format
+        r'(?:invoice\s*date|bill\s*date)[\s:]*(\d{4}-\d{2}-\d{2})',  # ISO format
+    ],
+    'date': [
+        r'(?:accident\s*date|report\s*date)[\s:]*(\d{4}[/\-]\d{1,2}[/\-]\d{1,2})',  # Accident/Report date
+        r'(?:issued|due|created|generated|effective|expires?|valid\s*until)[\s:]*(\d{1,2}[/\-\.]\d{1,2}[/\-\.]\d{2,4})',
+        r'(\d{4}-\d{2}-\d{2})',  # ISO format first
+        r'(\d{1,2}[/\-\.]\d{1,2}[/\-\.]\d{2,4})',
+        r'(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[\w\s]*\d{1,2},?\s*\d{4}',  # Month name format
+        r'(?:january|february|march|april|may|june|july|august|september|october|november|december)[\w\s]*\d{1,2},?\s*\d{4}',
+    ],
+    'due_date': [
+        r'(?:due|payment\s*due|pay\s*by)[\s:]*(\d{1,2}[/\-\.]\d{1,2}[/\-\.]\d{2,4})',
+        r'(?:due\s*date)[\s:]*(\d{1,2}[/\-\.]\d{1,2}[/\-\.]\d{2,4})',
+    ],
+
+    # Financial Information
+    'total_amount': [
+        r'(?:balance\s*due|total\s*due)[\s:]*AED([0-9,]+\.?\d*)',  # AED currency - HIGHEST PRIORITY
+        r'(?:total|grand\s*total|final\s*total)[\s:]*AED([0-9,]+\.?\d*)',  # AED currency
+        r'(?:balance\s*due|total\s*due)[\s:]*\$?([0-9,]+\.?\d*)',  # Generic currency
+        r'(?:total|amount|sum|due|balance|grand\s*total|net\s*amount)[\s:]*\$?([0-9,]+\.?\d*)',
+        r'\$([0-9,]+\.?\d*)',
+        r'([0-9,]+\.?\d*)\s*(?:usd|dollars?|us\s*\$?|eur|euros?|gbp|pounds?)',
+        r'(?:net|subtotal)[\s:]*\$?([0-9,]+\.?\d*)',
+        r'(?:final\s*amount|total\s*cost)[\s:]*\$?([0-9,]+\.?\d*)',
+        r'Total\s*Amount[\s:]*\$?([0-9,]+\.?\d*)',
+        r'Amount\s*Due[\s:]*\$?([0-9,]+\.?\d*)',
+    ],
+    'subtotal': [
+        r'(?:subtotal|sub\s*total|before\s*tax)[\s:]*\$?([0-9,]+\.?\d*)',
+        r'(?:pre\s*tax|excluding\s*tax)[\s:]*\$?([0-9,]+\.?\d*)',
+    ],
+    'tax_amount': [
+        r'(?:tax|vat|gst|sales\s*tax|service\s*tax)[\s(]*\d*%?[)\s:]*\$?([0-9,]+\.?\d*)',
+        r'(\d+\.\d{2})\s*(?:tax|vat|gst)',
+        r'(?:tax\s*amount|tax\s*total)[\s:]*\$?([0-9,]+\.?\d*)',
+        r'Tax\s*\(\d+%\):\s*\$?([0-9,]+\.?\d*)',
+    ],
+    'discount': [
+        r'(?:discount|disc|off|reduction)[\s:]*\$?([0-9,]+\.?\d*)',
+        r'(\d+\.?\d*)\s*(?:%|percent|off)',
+    ],
+
+    # Names and Organizations
+    'vendor_name': [
+        r'(?:from|vendor|company|bill\s*to|seller|provider|supplier|merchant)[\s:]*([A-Za-z\s&\.]+)',
+        r'^([A-Za-z\s&\.]+)',  # First line often contains company name
+        r'(?:business\s*name|company\s*name|organization)[\s:]*([A-Za-z\s&\.]+)',
+        r'(?:issued\s*by|prepared\s*by)[\s:]*([A-Za-z\s&\.]+)',
+    ],
+    'customer_name': [
+        r'(?:to|bill\s*to|customer|client|sold\s*to|buyer|purchaser)[\s:]*([A-Za-z\s&\.]+)',
+        r'(?:ship\s*to|deliver\s*to|send\s*to)[\s:]*([A-Za-z\s&\.]+)',
+        r'(?:attention|attn)[\s:]*([A-Za-z\s&\.]+)',
+    ],
+    'contact_person': [
+        r'(?:contact|person|representative|agent)[\s:]*([A-Za-z\s&\.]+)',
+        r'(?:responsible|account\s*manager)[\s:]*([A-Za-z\s&\.]+)',
+    ],
+
+    # Contact Information
+    'email': [
+        r'([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})',
+        r'(?:email|e-mail)[\s:]*([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})',
+    ],
+    'phone': [
+        r'(?:phone|tel|mobile|contact|call)[\s:]*([\d\s\-\(\)\+]+)',
+        r'(\d{3}[-\.\s]?\d{3}[-\.\s]?\d{4})',  # US phone format
+        r'(\(\d{3}\)\s?\d{3}[-\.\s]?\d{4})',   # US phone with parentheses
+        r'(\+\d{1,3}\s?\d{1,4}[-\.\s]?\d{1,4}[-\.\s]?\d{1,4})',  # International
+    ],
+    'fax': [
+        r'(?:fax|facsimile)[\s:]*([\d\s\-\(\)\+]+)',
+    ],
+
+    # Addresses
+    'billing_address': [
+        r'(?:billing\s*address|bill\s*to\s*address)[\s:]*([A-Za-z0-9\s,\.\-]+)',
+    ],
+    'shipping_address': [
+        r'(?:shipping\s*address|ship\s*to\s*address)[\s:]*([A-Za-z0-9\s,\.\-]+)',
+    ],
+    'address': [
+        r'(?:address|location|street)[\s:]*([A-Za-z0-9\s,\.\-]+)',
+        r'(\d+\s+[A-Za-z\s,\.\-]+(?:street|st|avenue|ave|road|rd|drive|dr|boulevard|blvd|lane|ln))',
+        r'(\d+\s+[A-Za-z\s,\.\-]+(?:street|st|avenue|ave|road|rd|drive|dr|boulevard|blvd|lane|ln)[\s,]*[A-Za-z\s,\.\-]*)',
+    ],
+    'city': [
+        r'(?:city|town)[\s:]*([A-Za-z\s]+)',
+    ],
+    'state': [
+        r'(?:state|province|region)[\s:]*([A-Za-z\s]+)',
+    ],
+    'zip_code': [
+        r'(?:zip|postal|post\s*code)[\s:]*([A-Z0-9\s\-]+)',
+        r'(\d{5}(?:-\d{4})?)',  # US ZIP format
+    ],
+    'country': [
+        r'(?:country|nation)[\s:]*([A-Za-z\s]+)',
+    ],
+
+    # Business Information
+    'po_number': [
+        r'(?:p\.o\.#|po\s*#)[\s:]*([A-Z0-9\-\/]+)',  # PO# pattern - HIGHEST PRIORITY
+        r'(?:p\.o\.|po|purchase\s*order)[\s#:]*([A-Z0-9\-\/]+)',  # PO number pattern
+        r'(?:order\s*number|order\s*no)[\s:]*([A-Z0-9\-\/]+)',
+    ],
+    'vat_number': [
+        r'(?:vat\s*no\.?|vat\s*number)[\s:]*(\d{10,15})',  # VAT No.: pattern - HIGHEST PRIORITY
+        r'(?:vat\s*no|vat\s*number|vat\s*id)[\s:]*(\d{10,15})',  # VAT number pattern
+        r'(?:tax\s*id|tax\s*number|ein|tin|vat\s*number)[\s:]*([A-Z0-9\s\-]+)',
+        r'(?:federal\s*tax\s*id|employer\s*id)[\s:]*([A-Z0-9\s\-]+)',
+    ],
+    'tax_id': [
+        r'(?:tax\s*id|tax\s*number|ein|tin)[\s:]*([A-Z0-9\s\-]+)',
+        r'(?:federal\s*tax\s*id|employer\s*id)[\s:]*([A-Z0-9\s\-]+)',
+    ],
+    'license_number': [
+        r'License\s*No[\s:]*(\d{8,15})',  # License number pattern
+        r'(?:license|permit|registration)[\s#:]*([A-Z0-9\s\-]+)',
+        r'(?:license\s*number|permit\s*number)[\s:]*([A-Z0-9\s\-]+)',
+    ],
+    'driver_name': [
+        r'Driver\s*Name[\s:]*([A-Za-z\s]+)',  # Driver name pattern
+        r'(?:driver|name)[\s:]*([A-Za-z\s]+)',
+    ],
+    'account_number': [
+        r'(?:account|acct)[\s#:]*([A-Z0-9\s\-]+)',
+        r'(?:account\s*number|acct\s*no)[\s:]*([A-Z0-9\s\-]+)',
+    ],
+
+    # Payment Information
+    'payment_terms': [
+        r'(?:payment\s*terms|terms)[\s:]*([A-Za-z0-9\s,\.\-]+)',
+        r'(?:net|due)[\s:]*(\d+)\s*(?:days|day)',
+    ],
+    'payment_method': [
+        r'(?:payment\s*method|pay\s*by)[\s:]*([A-Za-z\s]+)',
+        r'(?:cash|check|credit\s*card|bank\s*transfer|wire|ach)',
+    ],
+
+    # Product/Service Information
+    'description': [
+        r'(?:description|item|product|service)[\s:]*([A-Za-z0-9\s,\.\-]+)',
+        r'(?:for|work\s*performed)[\s:]*([A-Za-z0-9\s,\.\-]+)',
+    ],
+    'quantity': [
+        r'(?:qty|quantity)[\s:]*(\d+)',
+        r'(?:units?|pieces?|items?)[\s:]*(\d+)',
+    ],
+    'unit_price': [
+        r'(?:unit\s*price|price\s*per|rate)[\s:]*\$?([0-9,]+\.?\d*)',
+        r'(?:each|per\s*unit)[\s:]*\$?([0-9,]+\.?\d*)',
+    ],
+
+    # Status and Conditions
+    'status': [
+        r'(?:status|state|condition)[\s:]*([A-Za-z\s]+)',
+        r'(?:pending|approved|rejected|completed|in\s*progress)',
+    ],
+    'priority': [
+        r'(?:priority|urgency)[\s:]*([A-Za-z\s]+)',
+        r'(?:high|medium|low|urgent|normal)',
+    ],
+
+    # Additional Common Fields
+    'notes': [
+        r'(?:notes?|comments?|remarks?)[\s:]*([A-Za-z0-9\s,\.\-]+)',
+        r'(?:special\s*instructions|additional\s*info)[\s:]*([A-Za-z0-9\s,\.\-]+)',
+    ],
+    'department': [
+        r'(?:department|dept|division)[\s:]*([A-Za-z\s]+)',
+    ],
+    'project_code': [
+        r'(?:project|job|work\s*order)[\s#:]*([A-Z0-9\s\-]+)',
+        r'(?:project\s*code|job\s*code)[\s:]*([A-Z0-9\s\-]+)',
+    ]
+}
+
+# Document-type specific fields (_extract_document_type_fields)
+INVOICE_FIELD_PATTERNS = {
+    # Invoice number - look for patterns like INV-000038
+    'invoice_number': [
+        r'#?\s*(INV[-\s]?\d+)',
+        r'Invoice\s*#?\s*([A-Z0-9\-]+)',
+        r'#\s*([A-Z]{2,}[-\s]?\d+)',
+        r'INV[-\s]?(\d+)'
+    ],
+    'invoice_date': [
+        r'Invoice\s*Date\s*[:\s]*(\d{1,2}\s+\w+\s+\d{4})',
+        r'Date\s*[:\s]*(\d{1,2}\s+\w+\s+\d{4})',
+        r'(\d{1,2}\s+Feb\s+\d{4})',
+        r'(\d{1,2}\s+Jan\s+\d{4})',
+        r'(\d{1,2}\s+Mar\s+\d{4})'
+    ],
+    'due_date': [
+        r'Due\s*Date\s*[:\s]*(\d{1,2}\s+\w+\s+\d{4})',
+        r'Due\s*[:\s]*(\d{1,2}\s+\w+\s+\d{4})'
+    ],
+    # Total amount - look for AED amounts
+    'total_amount': [
+        r'Total\s*[:\s]*AED\s*([\d,]+\.?\d*)',
+        r'Balance\s*Due\s*[:\s]*AED\s*([\d,]+\.?\d*)',
+        r'AED\s*([\d,]+\.?\d*)\s*$'
+    ],
+    'subtotal': [
+        r'Sub\s*Total\s*[:\s]*([\d,]+\.?\d*)',
+        r'Subtotal\s*[:\s]*([\d,]+\.?\d*)'
+    ],
+    'tax_amount': [
+        r'Tax\s*[:\s]*AED\s*([\d,]+\.?\d*)',
+        r'VAT\s*[:\s]*AED\s*([\d,]+\.?\d*)',
+        r'(\d+\.\d{2})\s*$'  # Last amount in line
+    ],
+    'vat_number': [
+        r'VAT\s*No\.?\s*[:\s]*(\d+)',
+        r'TRN\s*(\d+)',
+        r'Tax\s*Registration\s*Number\s*[:\s]*(\d+)'
+    ],
+    'po_number': [
+        r'P\.O\.#?\s*[:\s]*([A-Z0-9\-]+)',
+        r'Purchase\s*Order\s*[:\s]*([A-Z0-9\-]+)',
+        r'PO\s*[:\s]*([A-Z0-9\-]+)'
+    ]
+}
+
+ID_CARD_FIELD_PATTERNS = {
+    'license_number': [
+        r'License\s*No\.?\s*[:\s]*([A-Z0-9\-]+)',
+        r'License\s*Number\s*[:\s]*([A-Z0-9\-]+)',
+        r'ADFZ[-\s]?(\d+)'
+    ],
+    'registration_number': [
+        r'Registration\s*No\.?\s*[:\s]*(\d+)',
+        r'Reg\s*No\.?\s*[:\s]*(\d+)'
+    ],
+    'company_name': [
+        r'Trade\s*Name\s*[:\s]*([^\n]+)',
+        r'Company\s*Name\s*[:\s]*([^\n]+)'
+    ]
+}
+
+FINANCIAL_REPORT_FIELD_PATTERNS = {
+    'revenue': [
+        r'Revenue\s*[:\s]*([\d,]+\.?\d*)',
+        r'Total\s*Revenue\s*[:\s]*([\d,]+\.?\d*)',
+        r'Income\s*[:\s]*([\d,]+\.?\d*)'
+    ],
+    'profit': [
+        r'Profit\s*[:\s]*([\d,]+\.?\d*)',
+        r'Net\s*Profit\s*[:\s]*([\d,]+\.?\d*)'
+    ]
+}
+
+CONTRACT_FIELD_PATTERNS = {
+    'contract_number': [
+        r'Contract\s*No\.?\s*[:\s]*([A-Z0-9\-]+)',
+        r'Agreement\s*No\.?\s*[:\s]*([A-Z0-9\-]+)'
+    ],
+    'contract_date': [
+        r'Contract\s*Date\s*[:\s]*(\d{1,2}[/\-]\d{1,2}[/\-]\d{2,4})',
+        r'Effective\s*Date\s*[:\s]*(\d{1,2}[/\-]\d{1,2}[/\-]\d{2,4})'
+    ]
+}
+
+RECEIPT_FIELD_PATTERNS = {
+    'receipt_number': [
+        r'Receipt\s*No\.?\s*[:\s]*([A-Z0-9\-]+)',
+        r'Receipt\s*#\s*[:\s]*([A-Z0-9\-]+)'
+    ],
+    'total_amount': [
+        r'Total\s*[:\s]*([\d,]+\.?\d*)',
+        r'Amount\s*[:\s]*([\d,]+\.?\d*)'
+    ]
+}
+
+# Main header fields (_extract_main_header_fields); vendor names are matched case-sensitively
+INVOICE_VENDOR_PATTERNS = {
+    'vendor_name': [
+        r'([A-Z][A-Z\s]+(?:TECHNOLOGY|INFORMATION|CONSULTANCY|LTD|LLC|INC|CORP))',
+        r'([A-Z][A-Z\s]+(?:COMPANY|ENTERPRISES|SOLUTIONS))'
+    ]
+}
+
+INVOICE_HEADER_PATTERNS = {
+    'customer_name': [
+        r'Bill\s*To\s*([^\n]+)',
+        r'Customer[:\s]*([^\n]+)',
+        r'Client[:\s]*([^\n]+)'
+    ],
+    'subject': [
+        r'Subject[:\s]*([^\n]+)',
+        r'Description[:\s]*([^\n]+)',
+        r'Invoice\s*for\s*([^\n]+)'
+    ],
+    'terms': [
+        r'Terms[:\s]*([^\n]+)',
+        r'Payment\s*Terms[:\s]*([^\n]+)'
+    ],
+    # Bank details: every pattern fills its own field
+    'bank_name': [r'Bank\s*[:\s]*([^\n]+)'],
+    'iban': [r'IBAN[:\s]*([A-Z0-9]+)'],
+    'swift_code': [r'SWIFT[:\s]*([A-Z0-9]+)'],
+    'account_number': [r'Account[:\s]*([A-Z0-9]+)']
+}
+
+ID_CARD_HEADER_PATTERNS = {
+    'license_number': [
+        r'License\s*No\.?\s*[:\s]*([A-Z0-9\-]+)',
+        r'Registration\s*No\.?\s*[:\s]*(\d+)',
+        r'ADFZ[-\s]?(\d+)'
+    ],
+    'company_name': [
+        r'Trade\s*Name[:\s]*([^\n]+)',
+        r'Company\s*Name[:\s]*([^\n]+)',
+        r'Business\s*Name[:\s]*([^\n]+)'
+    ],
+    'first_issue_date': [r'First\s*Issue\s*Date[:\s]*(\d{2}\s+\w+\s+\d{4})'],
+    'current_issue_date': [r'Current\s*Issue\s*Date[:\s]*(\d{2}\s+\w+\s+\d{4})'],
+    'expiry_date': [r'Expiry\s*Date[:\s]*(\d{2}\s+\w+\s+\d{4})']
+}
+
+# Minimum value length per main-header field
+INVOICE_HEADER_MIN_LENGTH = {'vendor_name': 11, 'customer_name': 6, 'subject': 6, 'terms': 3}
+
+# Label phrases for key/value pairs in table-like OCR text (_extract_fields_from_tables)
+TABLE_FIELD_LABELS = {
+    'license_number': ['license no', 'license number', 'licence no', 'licence number'],
+    'registration_number': ['registration no', 'registration number', 'reg no'],
+    'customs_registration': ['customs registration no', 'customs registration number', 'customs reg'],
+    'company_name': ['trade name', 'company name', 'business name', 'organization name'],
+    'first_issue_date': ['first issue date', 'initial issue date', 'original issue date'],
+    'current_issue_date': ['current issue date', 'issue date', 'issued date'],
+    'expiry_date': ['expiry date', 'expiration date', 'valid until', 'expires'],
+    'legal_form': ['legal form', 'company type', 'entity type', 'business type'],
+    'manager_name': ['manager name', 'contact person', 'authorized person', 'representative'],
+    'email': ['email', 'e-mail', 'email address'],
+    'phone': ['phone', 'phone number', 'telephone', 'contact number', 'mobile'],
+    'address': ['address', 'location', 'street address', 'business address'],
+    'licensed_activities': ['licensed activities', 'activities', 'business activities', 'services']
+}
+
+TABLE_ADDITIONAL_PATTERNS = {
+    'license_number': [r'(?:license|licence)[\s#:]*([A-Z0-9-]+)', r'([A-Z]{2,}-\d{4,})'],
+    'registration_number': [r'(?:registration|reg)[\s#:]*(\d+)', r'reg[\s#:]*(\d+)'],
+    'email': [r'([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})'],
+    'phone': [r'(\+\d{1,3}\s?\d{1,4}[-\.\s]?\d{1,4}[-\.\s]?\d{1,4})', r'(\(\d{3}\)\s?\d{3}[-\.\s]?\d{4})'],
+    'date': [r'(\d{1,2}\s+(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\s+\d{4})', r'(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})']
+}
+
+
+# ---------------------------------------------------------------------------
+# Compiled once at import
+# ---------------------------------------------------------------------------
+
+HEADER_FOOTER_SET = FieldPatternSet(HEADER_FOOTER_PATTERNS)
+GENERIC_FIELD_SET = FieldPatternSet(GENERIC_FIELD_PATTERNS, re.IGNORECASE | re.MULTILINE)
+DOCUMENT_TYPE_FIELD_SETS = {
+    'invoice': FieldPatternSet(INVOICE_FIELD_PATTERNS),
+    'id_card': FieldPatternSet(ID_CARD_FIELD_PATTERNS),
+    'financial_report': FieldPatternSet(FINANCIAL_REPORT_FIELD_PATTERNS),
+    'contract': FieldPatternSet(CONTRACT_FIELD_PATTERNS),
+    'receipt': FieldPatternSet(RECEIPT_FIELD_PATTERNS),
+}
+# Fields per classified document type (_extract_fields); none are active, as before the
+# pattern precompilation, so the scoped pass adds nothing and the generic fallback always runs
+CLASSIFIED_FIELD_SETS: Dict[str, FieldPatternSet] = {}
+INVOICE_VENDOR_SET = FieldPatternSet(INVOICE_VENDOR_PATTERNS, flags=0)
+INVOICE_HEADER_SET = FieldPatternSet(INVOICE_HEADER_PATTERNS)
+ID_CARD_HEADER_SET = FieldPatternSet(ID_CARD_HEADER_PATTERNS)
+TABLE_LABEL_SET = FieldPatternSet({
+    field: [rf'{re.escape(label)}\s*:?\s*([^\n\r]+?)(?=\n|$|[A-Z][a-z]+\s*:|$)' for label in labels]
+    for field, labels in TABLE_FIELD_LABELS.items()
+})
+TABLE_ADDITIONAL_SET = FieldPatternSet(TABLE_ADDITIONAL_PATTERNS)
+
+GENERIC_DATE_RE = re.compile(r'\d{1,2}[/\-]\d{1,2}[/\-]\d{2,4}')
+GENERIC_AMOUNT_RE = re.compile(r'[\d,]+\.?\d*')
+BBOX_DATE_RE = re.compile(r'\d{2}\s+\w+\s+\d{4}')
+PHONE_NOISE_RE = re.compile(r'[\s\-\(\)\+]')
+DIGIT_RE = re.compile(r'\d')
+NAME_PREFIX_RE = re.compile(r'^(from|to|bill\s*to|ship\s*to):?\s*', re.IGNORECASE)
+WHITESPACE_RE = re.compile(r'\s+')
+TABLE_VALUE_NOISE_RE = re.compile(r'[^\w\s@.-]')
+
+
+def accept_generic_field(field: str, value: str) -> bool:
+    """Validation used by the template-free patterns (GENERIC_FIELD_PATTERNS)."""
+    if not value or len(value) <= 1:  # Avoid single characters
+        return False
+    if field == 'email' and '@' not in value:
+        return False
+    if field == 'phone' and len(PHONE_NOISE_RE.sub('', value)) < 7:
+        return False
+    if field in ['total_amount', 'tax_amount', 'subtotal'] and not DIGIT_RE.search(value):
+        return False
+    return True
+
@@ -0,0 +1,195 @@
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, Tuple
+
+import numpy as np
+
+try:
+    import cv2  # type: ignore
+except Exception:  # pragma: no cover
+    cv2 = None
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("gray", "measure", "downscale", "clahe", "denoise", "threshold", "upscale", "to_rgb")
+
+
+def estimate_text_height(gray: np.ndarray, max_side: int = 1024, min_glyphs: int = 20) -> Optional[float]:
+    """Median glyph height in pixels of a grayscale page, or None when it has too little text to tell.
+
+    Measured on a copy reduced to ``max_side``: Otsu binarisation, then the
+    heights of connected components that are glyph-shaped (not specks, rules or
+    pictures).
+    """
+    h, w = gray.shape[:2]
+    factor = min(1.0, max_side / float(max(h, w, 1)))
+    small = gray
+    if factor < 1.0:
+        small = cv2.resize(gray, (max(1, int(w * factor)), max(1, int(h * factor))), interpolation=cv2.INTER_AREA)
+    _, binary = cv2.threshold(small, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+    _, _, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+    heights = stats[1:, cv2.CC_STAT_HEIGHT]
+    widths = stats[1:, cv2.CC_STAT_WIDTH]
+    glyphs = (heights >= 3) & (heights <= small.shape[0] * 0.1) & (widths <= heights * 8) & (stats[1:, cv2.CC_STAT_AREA] >= 4)
+    if int(glyphs.sum()) < min_glyphs:
+        return None
+    return float(np.median(heights[glyphs])) / factor
+
+
+class ImagePreprocessor:
+    """OCR preprocessing: grayscale -> measure -> downscale -> CLAHE -> denoise -> threshold -> upscale.
+
+    The resampling factor comes from the measured text height (``target_text_height``
+    glyph pixels) instead of a fixed multiplier, so a 2x-rendered PDF page is
+    not blown up again. Downscaling happens first, so the remaining stages run
+    on fewer pixels; upscaling (capped at ``max_upscale``) happens last, as
+    before. With ``scale_mode="fixed"`` or an unmeasurable page the old fixed
+    ``max_upscale`` factor is used.
+
+    Jobs run inline, or on a bounded pool of ``workers`` threads when set
+    (OpenCV releases the GIL); OpenCV's own thread count is sized so that
+    concurrent jobs do not oversubscribe the cores.
+    """
+
+    def __init__(self, max_upscale: float = None, adaptive: str = None, denoise: str = None,
+                 scale_mode: str = None, target_text_height: float = None, min_scale: float = None,
+                 workers: int = None, concurrency: int = 1):
+        self.max_upscale = max(1.0, float(max_upscale if max_upscale is not None else os.getenv("PREPROCESS_UPSCALE", "1.5")))
+        self.adaptive = (adaptive or os.getenv("PREPROCESS_ADAPTIVE_THRESHOLD", "auto")).lower()  # auto|on|off
+        self.denoise = (denoise or os.getenv("PREPROCESS_DENOISE", "light")).lower()  # none|light
+        self.scale_mode = (scale_mode or os.getenv("PREPROCESS_SCALE_MODE", "auto")).lower()  # auto|fixed
+        self.target_text_height = float(target_text_height or os.getenv("PREPROCESS_TARGET_TEXT_HEIGHT", "16"))
+        self.min_scale = float(min_scale or os.getenv("PREPROCESS_MIN_SCALE", "0.5"))
+        # Resampling closer to 1.0 than this is skipped
+        self.scale_tolerance = float(os.getenv("PREPROCESS_SCALE_TOLERANCE", "0.15"))
+        self.workers = max(0, int(workers if workers is not None else os.getenv("PREPROCESS_WORKERS", "0")))
+
+        self._local = threading.local()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="preprocess") if self.workers else None
+        self._stats_lock = threading.Lock()
+        self._stats = {"pages": 0, "downscaled": 0, "upscaled": 0, "unmeasured": 0, "errors": 0}
+        self._stage_ms = dict.fromkeys(STAGES + ("total",), 0.0)
+
+        self.cv_threads = 0
+        if cv2 is not None:
+            jobs = self.workers or max(1, concurrency)
+            self.cv_threads = int(os.getenv("PREPROCESS_CV_THREADS", "0")) or max(1, multiprocessing.cpu_count() // jobs)
+            cv2.setNumThreads(self.cv_threads)
+        logger.info(f"Preprocessing: scale_mode={self.scale_mode}, target_text_height={self.target_text_height}, "
+                    f"max_upscale={self.max_upscale}, workers={self.workers or 'inline'}, cv_threads={self.cv_threads}")
+
+    def settings(self) -> Dict[str, Any]:
+        """Everything that changes the output pixels (part of OCR/result cache keys)."""
+        return {"max_upscale": self.max_upscale, "adaptive": self.adaptive, "denoise": self.denoise,
+                "scale_mode": self.scale_mode, "target_text_height": self.target_text_height,
+                "min_scale": self.min_scale, "scale_tolerance": self.scale_tolerance}
+
+    def _clahe(self):
+        # cv2.CLAHE keeps scratch buffers, so one instance per thread
+        clahe = getattr(self._local, "clahe", None)
+        if clahe is None:
+            clahe = self._local.clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+        return clahe
+
+    def choose_scale(self, text_height: Optional[float]) -> float:
+        if self.scale_mode == "fixed" or not text_height:
+            return self.max_upscale
+        scale = min(max(self.target_text_height / text_height, self.min_scale), self.max_upscale)
+        return 1.0 if abs(scale - 1.0) < self.scale_tolerance else scale
+
+    def process(self, img: np.ndarray) -> Tuple[np.ndarray, Dict[str, Any]]:
+        """Preprocessed RGB array plus ``{"scale", "text_height", "timings_ms"}`` for this page."""
+        if self._executor is not None:
+            return self._executor.submit(self._process, img).result()
+        return self._process(img)
+
+    def _process(self, img: np.ndarray) -> Tuple[np.ndarray, Dict[str, Any]]:
+        info: Dict[str, Any] = {"scale": 1.0, "text_height": None, "timings_ms": {}}
+        if img is None or img.size == 0 or cv2 is None:
+            return img, info
+        timings = info["timings_ms"]
+        started = last = time.perf_counter()
+
+        def lap(stage):
+            nonlocal last
+            now = time.perf_counter()
+            timings[stage] = round((now - last) * 1000, 2)
+            last = now
+
+        # Straight to gray (no RGB -> BGR round trip)
+        if img.ndim == 2:
+            gray = img
+        elif img.shape[2] == 4:
+            gray = cv2.cvtColor(img, cv2.COLOR_RGBA2GRAY)
+        else:
+            gray = cv2.cvtColor(img[..., :3], cv2.COLOR_RGB2GRAY)
+        lap("gray")
+
+        text_height = estimate_text_height(gray) if self.scale_mode != "fixed" else None
+        scale = self.choose_scale(text_height)
+        info["text_height"] = round(text_height, 1) if text_height else None
+        info["scale"] = round(scale, 3)
+        lap("measure")
+
+        h, w = gray.shape[:2]
+        if scale < 1.0:
+            gray = cv2.resize(gray, (max(1, int(w * scale)), max(1, int(h * scale))), interpolation=cv2.INTER_AREA)
+            lap("downscale")
+
+        # CLAHE for local contrast enhancement
+        gray = self._clahe().apply(gray)
+        lap("clahe")
+
+        # Light denoise
+        if self.denoise == 'light':
+            gray = cv2.medianBlur(gray, 3)
+            lap("denoise")
+
+        # Adaptive threshold decision: low mean and high variance images benefit from binarization
+        use_adaptive = self.adaptive == 'on'
+        if self.adaptive == 'auto':
+            mean, std = cv2.meanStdDev(gray)
+            use_adaptive = float(mean[0][0]) < 170 and float(std[0][0]) > 40
+        if use_adaptive:
+            gray = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 31, 10)
+        lap("threshold")
+
+        if scale > 1.0:
+            gray = cv2.resize(gray, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_CUBIC)
+            lap("upscale")
+
+        # OCR engines and the TrOCR/Donut crops expect 3-channel RGB
+        out = cv2.cvtColor(gray, cv2.COLOR_GRAY2RGB)
+        lap("to_rgb")
+        timings["total"] = round((last - started) * 1000, 2)
+        self._record(info)
+        return out, info
+
+    def _record(self, info: Dict[str, Any]) -> None:
+        with self._stats_lock:
+            self._stats["pages"] += 1
+            if info["scale"] < 1.0:
+                self._stats["downscaled"] += 1
+            elif info["scale"] > 1.0:
+                self._stats["upscaled"] += 1
+            if info["text_height"] is None:
+                self._stats["unmeasured"] += 1
+            for stage, ms in info["timings_ms"].items():
+                self._stage_ms[stage] += ms
+
+    def record_error(self) -> None:
+        with self._stats_lock:
+            self._stats["errors"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+            stage_ms = dict(self._stage_ms)
+        pages = stats["pages"]
+        stats["avg_stage_ms"] = {stage: round(ms / pages, 2) for stage, ms in stage_ms.items()} if pages else {}
+        stats.update({"workers": self.workers, "cv_threads": self.cv_threads, **self.settings()})
+        return stats
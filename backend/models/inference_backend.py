@@ -0,0 +1,291 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+import torch
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_BACKENDS = ("torch", "int8", "onnx")
+
+# Inputs LayoutLMv3 token classification accepts, in ONNX graph order
+_ONNX_INPUTS = ["input_ids", "attention_mask", "bbox", "pixel_values"]
+
+
+def get_backend_name() -> str:
+    backend = os.getenv("LAYOUTLM_BACKEND", "torch").lower()
+    if backend not in SUPPORTED_BACKENDS:
+        logger.warning(f"Unknown LAYOUTLM_BACKEND '{backend}', using torch")
+        return "torch"
+    return backend
+
+
+def quantize_int8(model: torch.nn.Module) -> torch.nn.Module:
+    """Dynamic INT8 quantization of the Linear layers (weights int8, activations quantized on the fly)."""
+    quantized = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    quantized.eval()
+    return quantized
+
+
+class OnnxTokenClassifier:
+    """ONNX Runtime stand-in for LayoutLMv3ForTokenClassification.
+
+    Called like the torch model (``model(**encoding).logits``) so the rest of
+    the pipeline, including the dynamic batcher, does not care which backend runs.
+    """
+
+    def __init__(self, model: torch.nn.Module, onnx_path: Path):
+        import onnxruntime as ort  # optional dependency
+
+        self.config = model.config
+        self.name_or_path = f"{getattr(model, 'name_or_path', 'layoutlmv3')}+onnx"
+        self.onnx_path = Path(onnx_path)
+        if not self.onnx_path.exists():
+            export_onnx(model, self.onnx_path)
+            _remove_stale_exports(self.onnx_path)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        threads = int(os.getenv("ONNX_INTRA_OP_THREADS", "0"))
+        if threads > 0:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(str(self.onnx_path), options, providers=["CPUExecutionProvider"])
+        self._input_names = {i.name for i in self.session.get_inputs()}
+
+    def __call__(self, **encoding) -> SimpleNamespace:
+        feeds = {}
+        for name in _ONNX_INPUTS:
+            if name in encoding and name in self._input_names:
+                value = encoding[name]
+                feeds[name] = value.cpu().numpy() if isinstance(value, torch.Tensor) else np.asarray(value)
+        logits = self.session.run(["logits"], feeds)[0]
+        return SimpleNamespace(logits=torch.from_numpy(logits))
+
+    def eval(self):
+        return self
+
+
+def export_onnx(model: torch.nn.Module, onnx_path: Path, opset: int = 17) -> Path:
+    """Export a LayoutLMv3 token classifier with dynamic batch and sequence axes."""
+    onnx_path = Path(onnx_path)
+    onnx_path.parent.mkdir(parents=True, exist_ok=True)
+    seq_len = 16
+    dummy = {
+        "input_ids": torch.ones((1, seq_len), dtype=torch.long),
+        "attention_mask": torch.ones((1, seq_len), dtype=torch.long),
+        "bbox": torch.zeros((1, seq_len, 4), dtype=torch.long),
+        "pixel_values": torch.zeros((1, 3, 224, 224), dtype=torch.float32),
+    }
+    dynamic_axes = {
+        "input_ids": {0: "batch", 1: "sequence"},
+        "attention_mask": {0: "batch", 1: "sequence"},
+        "bbox": {0: "batch", 1: "sequence"},
+        "pixel_values": {0: "batch"},
+        "logits": {0: "batch", 1: "sequence"},
+    }
+    model = model.to("cpu").eval()
+    # Export beside the target and rename, so a concurrent worker never loads a partial graph
+    tmp_path = onnx_path.with_name(f"{onnx_path.stem}.{os.getpid()}.tmp")
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            args=(),
+            kwargs=dummy,
+            f=str(tmp_path),
+            input_names=_ONNX_INPUTS,
+            output_names=["logits"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+        )
+    os.replace(tmp_path, onnx_path)
+    logger.info(f"Exported ONNX model to {onnx_path}")
+    return onnx_path
+
+
+_WEIGHT_FILES = ("config.json", "model.safetensors", "pytorch_model.bin")
+
+
+def _weights_fingerprint(model: torch.nn.Module, source: Path) -> str:
+    """Changes whenever the weights do: retraining saves over the same directory."""
+    parts = []
+    if source.is_dir():
+        for path in sorted(source.iterdir()):
+            if path.name in _WEIGHT_FILES or path.name.endswith((".safetensors", ".bin")):
+                stat = path.stat()
+                parts.append(f"{path.name}:{stat.st_size}:{stat.st_mtime_ns}")
+    else:
+        # Hub checkpoints are immutable per revision
+        parts.append(f"{source.name}:{getattr(model.config, '_commit_hash', None)}")
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+def _onnx_path_for(model: torch.nn.Module) -> Path:
+    """Cache exports next to the model weights (or under models/onnx for hub models), keyed by the weights."""
+    source = Path(str(getattr(model, "name_or_path", "") or "layoutlmv3"))
+    filename = f"model-{_weights_fingerprint(model, source)}.onnx"
+    if source.is_dir():
+        return source / "onnx" / filename
+    return Path(os.getenv("ONNX_CACHE_DIR", "models/onnx")) / source.name / filename
+
+
+def _remove_stale_exports(current: Path) -> None:
+    """Drop graphs exported from earlier weights of the same model."""
+    for path in current.parent.glob("model*.onnx"):
+        if path != current:
+            try:
+                path.unlink()
+                logger.info(f"Removed stale ONNX export {path}")
+            except OSError as e:
+                logger.warning(f"Could not remove stale ONNX export {path}: {e}")
+
+
+def build_inference_model(model: torch.nn.Module, backend: str) -> Tuple[Any, str]:
+    """Wrap an fp32 model for ``backend``; falls back to the fp32 model if that fails."""
+    if backend == "torch" or model is None:
+        return model, "torch"
+    try:
+        if backend == "int8":
+            return quantize_int8(model), "int8"
+        if backend == "onnx":
+            return OnnxTokenClassifier(model, _onnx_path_for(model)), "onnx"
+    except Exception as e:
+        logger.warning(f"LayoutLM backend '{backend}' unavailable, using fp32 torch: {str(e)}")
+    return model, "torch"
+
+
+class BackendModelCache:
+    """Remembers the converted model per fp32 model so conversion happens once.
+
+    Only the ``max_entries`` most recent models are kept, so a hot-swapped-out
+    model is not pinned in memory by its converted copy.
+    """
+
+    def __init__(self, backend: str = None, max_entries: int = 2):
+        self.backend = backend or get_backend_name()
+        self.max_entries = max(1, max_entries)
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[int, Tuple[Any, Any, str]]" = OrderedDict()
+
+    def get(self, model) -> Any:
+        if self.backend == "torch" or model is None:
+            return model
+        with self._lock:
+            entry = self._entries.get(id(model))
+            if entry is not None and entry[0] is model:
+                self._entries.move_to_end(id(model))
+                return entry[1]
+            converted, used = build_inference_model(model, self.backend)
+            self._entries[id(model)] = (model, converted, used)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            logger.info(f"LayoutLM inference backend: {used}")
+            return converted
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": self.backend,
+                "converted_models": [
+                    {"model": str(getattr(entry[0], "name_or_path", "")), "backend": entry[2]}
+                    for entry in self._entries.values()
+                ]
+            }
+
+
+# ---------------------------------------------------------------------------
+# Accuracy parity against the fp32 model
+# ---------------------------------------------------------------------------
+
+def load_annotation_set(annotation_dir: str = "data/annotations", limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Read saved annotation documents (``annotations`` with text, [x, y, w, h] bbox and label_id)."""
+    samples = []
+    for path in sorted(Path(annotation_dir).glob("*.json")):
+        try:
+            with path.open("r") as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.warning(f"Skipping unreadable annotation file {path}: {e}")
+            continue
+        items = [a for a in data.get("annotations", []) if str(a.get("text", "")).strip()]
+        if items:
+            samples.append({"document_id": data.get("document_id", path.stem), "annotations": items,
+                            "image_path": data.get("image_path")})
+        if limit and len(samples) >= limit:
+            break
+    return samples
+
+
+def _encode_sample(processor, sample: Dict[str, Any]):
+    annotations = sample["annotations"]
+    xs = [float(a["bbox"][0]) + float(a["bbox"][2]) for a in annotations]
+    ys = [float(a["bbox"][1]) + float(a["bbox"][3]) for a in annotations]
+    if sample.get("image_path") and Path(sample["image_path"]).exists():
+        image = Image.open(sample["image_path"]).convert("RGB")
+    else:
+        # Annotation files do not keep the page image; both backends see the same blank page
+        image = Image.new("RGB", (int(max(xs + [1])) + 1, int(max(ys + [1])) + 1), "white")
+    width, height = image.size
+
+    words, boxes, labels = [], [], []
+    for a in annotations:
+        x, y, w, h = [float(v) for v in a["bbox"][:4]]
+        box = [int(max(0, min(1000, 1000 * v / d))) for v, d in ((x, width), (y, height), (x + w, width), (y + h, height))]
+        box[2], box[3] = max(box[2], box[0] + 1), max(box[3], box[1] + 1)
+        for word in str(a["text"]).split():
+            words.append(word)
+            boxes.append(box)
+            labels.append(int(a.get("label_id", 0)))
+    return processor(image, words, boxes=boxes, word_labels=labels, return_tensors="pt",
+                     truncation=True, padding=True, max_length=512)
+
+
+def check_parity(reference_model, candidate_model, processor, samples: List[Dict[str, Any]],
+                 min_agreement: float = None, max_accuracy_drop: float = None) -> Dict[str, Any]:
+    """Compare a converted backend with the fp32 model on held-out annotations.
+
+    Reports label agreement between the two models, each model's accuracy
+    against the annotated labels, and the largest absolute logit difference.
+    """
+    min_agreement = float(min_agreement if min_agreement is not None else os.getenv("LAYOUTLM_PARITY_MIN_AGREEMENT", "0.98"))
+    max_accuracy_drop = float(max_accuracy_drop if max_accuracy_drop is not None else os.getenv("LAYOUTLM_PARITY_MAX_ACCURACY_DROP", "0.01"))
+
+    tokens = agree = ref_correct = cand_correct = 0
+    max_logit_diff = 0.0
+    for sample in samples:
+        encoding = _encode_sample(processor, sample)
+        labels = encoding.pop("labels")[0]
+        with torch.no_grad():
+            ref_logits = reference_model(**encoding).logits[0].float()
+            cand_logits = candidate_model(**encoding).logits[0].float()
+        mask = labels != -100
+        if not mask.any():
+            continue
+        ref_pred, cand_pred = ref_logits.argmax(-1)[mask], cand_logits.argmax(-1)[mask]
+        gold = labels[mask]
+        tokens += int(mask.sum())
+        agree += int((ref_pred == cand_pred).sum())
+        ref_correct += int((ref_pred == gold).sum())
+        cand_correct += int((cand_pred == gold).sum())
+        max_logit_diff = max(max_logit_diff, float((ref_logits - cand_logits).abs().max()))
+
+    agreement = agree / tokens if tokens else 0.0
+    ref_accuracy = ref_correct / tokens if tokens else 0.0
+    cand_accuracy = cand_correct / tokens if tokens else 0.0
+    return {
+        "documents": len(samples),
+        "labelled_tokens": tokens,
+        "label_agreement": round(agreement, 4),
+        "reference_accuracy": round(ref_accuracy, 4),
+        "candidate_accuracy": round(cand_accuracy, 4),
+        "accuracy_drop": round(ref_accuracy - cand_accuracy, 4),
+        "max_abs_logit_diff": round(max_logit_diff, 4),
+        "passed": bool(tokens) and agreement >= min_agreement and (ref_accuracy - cand_accuracy) <= max_accuracy_drop
+    }
@@ -0,0 +1,271 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Dict, Any, Callable, AsyncIterator, List
+
+logger = logging.getLogger(__name__)
+
+
+class PoolSaturatedError(Exception):
+    """Raised when the inference pool cannot admit another job."""
+
+    def __init__(self, message: str, status_code: int = 429, retry_after: int = 1):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+# Per-process processors used when the pool runs in process mode
+_worker_processor = None
+_worker_simple_processor = None
+
+
+def _init_process_worker():
+    """Build one DocumentProcessor per worker process (process mode only)."""
+    global _worker_processor
+    from models.model_registry import get_shared_document_processor
+    _worker_processor = get_shared_document_processor()
+
+
+def _process_document_in_worker(file_path: str, **options) -> Dict[str, Any]:
+    if _worker_processor is None:
+        _init_process_worker()
+    return _worker_processor.process_document(file_path, **options)
+
+
+def _simple_process_document_in_worker(file_path: str) -> Dict[str, Any]:
+    """OCR-only processing for bbox extraction, with the worker's own SimpleDocumentProcessor."""
+    global _worker_simple_processor
+    if _worker_simple_processor is None:
+        from models.simple_processor import SimpleDocumentProcessor
+        _worker_simple_processor = SimpleDocumentProcessor()
+    return _worker_simple_processor.process_document(file_path)
+
+
+def _stream_document_in_worker(file_path: str, **options) -> List[Dict[str, Any]]:
+    """Process mode cannot stream across processes; collect the events instead."""
+    if _worker_processor is None:
+        _init_process_worker()
+    return list(_worker_processor.iter_document(file_path, **options))
+
+
+def _timed_call(fn: Callable, *args, **kwargs):
+    """Run fn and report when it actually started, so queue wait can be measured."""
+    started_at = time.time()
+    result = fn(*args, **kwargs)
+    return started_at, time.time(), result
+
+
+class InferencePool:
+    """Bounded worker pool that keeps document inference off the event loop.
+
+    Jobs beyond ``max_workers + max_queue`` are rejected up front with a
+    PoolSaturatedError instead of piling up behind long-running documents.
+    """
+
+    def __init__(self, max_workers: int = None, max_queue: int = None, mode: str = None):
+        self.max_workers = max(1, int(max_workers or os.getenv("INFERENCE_MAX_WORKERS", "4")))
+        self.max_queue = max(0, int(max_queue if max_queue is not None else os.getenv("INFERENCE_MAX_QUEUE", "16")))
+        self.mode = (mode or os.getenv("INFERENCE_POOL_MODE", "thread")).lower()  # thread|process
+
+        if self.mode == "process":
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_process_worker)
+        else:
+            self.mode = "thread"
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="inference")
+
+        self._lock = threading.Lock()
+        self._pending = 0  # queued + running
+        self._accepting = True
+
+        # Rolling statistics
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._total_service = 0.0
+        self._last_wait = 0.0
+
+        logger.info(f"Inference pool ready: mode={self.mode}, workers={self.max_workers}, max_queue={self.max_queue}")
+
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.max_queue
+
+    def _estimate_retry_after(self) -> int:
+        """Rough seconds until a slot frees up, based on mean service time."""
+        with self._lock:
+            avg_service = (self._total_service / self._completed) if self._completed else 5.0
+            backlog = max(1, self._pending - self.max_workers + 1)
+        return max(1, int(round(avg_service * backlog / self.max_workers)))
+
+    def _admit(self) -> None:
+        with self._lock:
+            if not self._accepting:
+                self._rejected += 1
+                raise PoolSaturatedError("Inference pool is shutting down", status_code=503, retry_after=30)
+            if self._pending >= self.capacity:
+                self._rejected += 1
+                full = True
+            else:
+                self._pending += 1
+                full = False
+        if full:
+            raise PoolSaturatedError(
+                f"Inference queue is full ({self.capacity} jobs in flight)",
+                status_code=429,
+                retry_after=self._estimate_retry_after()
+            )
+
+    def _release(self, submitted_at: float, future) -> None:
+        """Done-callback: frees the slot even if the awaiting request was cancelled."""
+        started_at = finished_at = None
+        failed = future.cancelled() or future.exception() is not None
+        if not failed:
+            started_at, finished_at, _ = future.result()
+        with self._lock:
+            self._pending -= 1
+            if failed:
+                self._failed += 1
+                return
+            self._completed += 1
+            wait = max(0.0, started_at - submitted_at)
+            self._total_wait += wait
+            self._last_wait = wait
+            self._max_wait = max(self._max_wait, wait)
+            self._total_service += max(0.0, finished_at - started_at)
+
+    def _submit(self, fn: Callable, *args, **kwargs) -> asyncio.Future:
+        """Admit and submit synchronously, so saturation is raised before any await."""
+        self._admit()
+        submitted_at = time.time()
+        try:
+            future = self._executor.submit(_timed_call, fn, *args, **kwargs)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+                self._failed += 1
+            raise
+        future.add_done_callback(lambda f: self._release(submitted_at, f))
+        return asyncio.wrap_future(future)
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run ``fn(*args, **kwargs)`` on the pool and await its result.
+
+        In process mode ``fn`` must be picklable (a module-level function).
+        """
+        _, _, result = await self._submit(fn, *args, **kwargs)
+        return result
+
+    async def process_document(self, processor, file_path: str, **options) -> Dict[str, Any]:
+        """Process a document with the shared processor (thread) or the worker's own (process).
+
+        ``options`` are forwarded to ``process_document`` (e.g. max_page_parallelism).
+        """
+        if self.mode == "process":
+            return await self.run(_process_document_in_worker, file_path, **options)
+        return await self.run(processor.process_document, file_path, **options)
+
+    async def simple_process_document(self, processor, file_path: str) -> Dict[str, Any]:
+        """OCR-only processing with ``processor`` (thread) or the worker's own SimpleDocumentProcessor (process)."""
+        if self.mode == "process":
+            return await self.run(_simple_process_document_in_worker, file_path)
+        return await self.run(processor.process_document, file_path)
+
+    def stream_document(self, processor, file_path: str, **options) -> AsyncIterator[Dict[str, Any]]:
+        """Start ``processor.iter_document`` on the pool and return its events as an async iterator.
+
+        Admission happens immediately, so PoolSaturatedError is raised by this
+        call rather than mid-stream. In process mode events arrive all at once
+        when the worker finishes. Closing the iterator early stops the worker
+        after the page it is currently on.
+        """
+        if self.mode == "process":
+            future = self._submit(_stream_document_in_worker, file_path, **options)
+
+            async def drain_batch():
+                _, _, events = await future
+                for event in events:
+                    yield event
+            return drain_batch()
+
+        loop = asyncio.get_running_loop()
+        # Bounded: a slow client holds back OCR instead of piling finished pages up in memory
+        events: asyncio.Queue = asyncio.Queue(maxsize=2)
+        done = object()
+        stop = threading.Event()
+
+        def publish(item) -> bool:
+            """Block until the consumer has room for ``item``; False once nobody is listening."""
+            try:
+                pending = asyncio.run_coroutine_threadsafe(events.put(item), loop)
+            except RuntimeError:
+                stop.set()  # event loop closed
+                return False
+            while True:
+                try:
+                    pending.result(timeout=0.5)
+                    return True
+                except FutureTimeoutError:
+                    if stop.is_set():
+                        pending.cancel()
+                        return False
+                except Exception:
+                    stop.set()
+                    return False
+
+        def produce() -> None:
+            generator = processor.iter_document(file_path, **options)
+            try:
+                for event in generator:
+                    if not publish(event) or stop.is_set():
+                        break
+            finally:
+                generator.close()
+                if not stop.is_set():
+                    publish(done)
+
+        future = self._submit(produce)
+
+        async def drain():
+            try:
+                while True:
+                    event = await events.get()
+                    if event is done:
+                        break
+                    yield event
+                await future  # surface producer errors
+            finally:
+                stop.set()
+        return drain()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue depth and wait-time statistics for health/metrics endpoints."""
+        with self._lock:
+            running = min(self._pending, self.max_workers)
+            return {
+                "mode": self.mode,
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "in_flight": self._pending,
+                "running": running,
+                "queue_depth": max(0, self._pending - self.max_workers),
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "avg_wait_seconds": round(self._total_wait / self._completed, 4) if self._completed else 0.0,
+                "max_wait_seconds": round(self._max_wait, 4),
+                "last_wait_seconds": round(self._last_wait, 4),
+                "avg_service_seconds": round(self._total_service / self._completed, 4) if self._completed else 0.0,
+                "accepting": self._accepting
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            self._accepting = False
+        self._executor.shutdown(wait=wait)
+        logger.info("Inference pool shut down")
@@ -0,0 +1,480 @@
+"""
+Durable document-processing job queue backed by the processing_jobs table.
+
+Claims use ``SELECT ... FOR UPDATE SKIP LOCKED`` on PostgreSQL so several
+worker processes/pods can drain the same table. SQLite (the local stand-in,
+``JOBS_DATABASE_URL=sqlite:///./processing_jobs.db``) has no row locks, so
+the claim there is an optimistic compare-and-set UPDATE on ``status``.
+
+A claimed job is leased to its worker: ``run_after`` (the retry time while a
+job is pending) holds the lease expiry while it is processing, and the worker
+extends it with ``heartbeat`` as long as it runs. ``requeue_stale`` only
+takes back jobs whose lease ran out, and ``complete``/``fail`` only apply
+while the caller still holds the lease (``locked_by``).
+"""
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+from sqlalchemy import func, update
+
+from models.database import ProcessingJob, init_database, get_session_factory
+from models.usage_stats import apply_deltas, month_start
+
+logger = logging.getLogger(__name__)
+
+
+def _json_safe(value: Any) -> Any:
+    """Round-trip through json so numpy scalars/arrays in OCR output are storable."""
+    def _default(obj):
+        if hasattr(obj, "tolist"):
+            return obj.tolist()
+        if hasattr(obj, "item"):
+            return obj.item()
+        return str(obj)
+    return json.loads(json.dumps(value, default=_default))
+
+
+def _retries_exhausted(attempts, max_retries):
+    """True once ``attempts`` used up the budget of 1 + ``max_retries`` runs (ints or SQL expressions)."""
+    return attempts > max_retries
+
+
+class JobQueue:
+    """Submit, claim, complete and retry ProcessingJob rows."""
+
+    def __init__(self, database_url: str = None, upload_dir: str = None):
+        self.database_url = database_url or os.getenv("JOBS_DATABASE_URL") or os.getenv("DATABASE_URL") \
+            or "sqlite:///./processing_jobs.db"
+        # Uploaded files must live on storage shared by API and worker pods
+        self.upload_dir = Path(upload_dir or os.getenv("JOB_UPLOAD_DIR", "uploads/jobs"))
+        self.upload_dir.mkdir(parents=True, exist_ok=True)
+
+        self.max_retries = int(os.getenv("JOB_MAX_RETRIES", "3"))
+        self.backoff_base = float(os.getenv("JOB_RETRY_BACKOFF_SECONDS", "5"))
+        self.backoff_max = float(os.getenv("JOB_RETRY_BACKOFF_MAX_SECONDS", "300"))
+        # Lease length; workers renew it every heartbeat_interval while a job runs
+        self.visibility_timeout = float(os.getenv("JOB_VISIBILITY_TIMEOUT_SECONDS", "900"))
+        self.heartbeat_interval = float(os.getenv("JOB_HEARTBEAT_SECONDS", str(min(60.0, self.visibility_timeout / 3))))
+
+        self.is_sqlite = self.database_url.startswith("sqlite")
+        # Shares the process-wide pooled engine (and schema bootstrap) with get_db
+        self.engine = init_database(self.database_url)
+        self.SessionLocal = get_session_factory(self.database_url)
+        logger.info(f"Job queue ready ({'sqlite' if self.is_sqlite else self.engine.dialect.name})")
+
+    # ------------------------------------------------------------------
+    # Producer side
+    # ------------------------------------------------------------------
+    def submit(self, content: bytes, filename: str, priority: int = 0,
+               organization_id: str = None, document_id: str = None) -> Dict[str, Any]:
+        """Persist the upload and enqueue a pending job."""
+        job_id = uuid.uuid4()
+        ext = os.path.splitext(filename or "")[1].lower()
+        file_path = self.upload_dir / f"{job_id}{ext}"
+        with open(file_path, "wb") as f:
+            f.write(content)
+
+        db = self.SessionLocal()
+        try:
+            job = ProcessingJob(
+                id=job_id,
+                organization_id=uuid.UUID(organization_id) if organization_id else None,
+                document_id=uuid.UUID(document_id) if document_id else None,
+                status="pending",
+                priority=priority,
+                retry_count=0,
+                max_retries=self.max_retries,
+                file_path=str(file_path),
+                file_name=filename,
+                run_after=datetime.utcnow(),
+                created_at=datetime.utcnow()
+            )
+            db.add(job)
+            db.commit()
+            return self._to_dict(job)
+        except Exception:
+            db.rollback()
+            file_path.unlink(missing_ok=True)
+            raise
+        finally:
+            db.close()
+
+    def get(self, job_id: str, include_result: bool = True) -> Optional[Dict[str, Any]]:
+        try:
+            key = uuid.UUID(str(job_id))
+        except ValueError:
+            return None
+        db = self.SessionLocal()
+        try:
+            job = db.get(ProcessingJob, key)
+            return self._to_dict(job, include_result) if job else None
+        finally:
+            db.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Job counts per status, for health/metrics endpoints."""
+        db = self.SessionLocal()
+        try:
+            rows = db.query(ProcessingJob.status, func.count(ProcessingJob.id)).group_by(ProcessingJob.status).all()
+            return {status: count for status, count in rows}
+        finally:
+            db.close()
+
+    # ------------------------------------------------------------------
+    # Worker side
+    # ------------------------------------------------------------------
+    def claim_next(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        """Claim the highest-priority runnable job, or return None if the queue is empty."""
+        now = datetime.utcnow()
+        lease_until = now + timedelta(seconds=self.visibility_timeout)
+        db = self.SessionLocal()
+        try:
+            query = db.query(ProcessingJob).filter(
+                ProcessingJob.status == "pending",
+                ProcessingJob.run_after <= now
+            ).order_by(ProcessingJob.priority.desc(), ProcessingJob.created_at.asc())
+
+            if not self.is_sqlite:
+                job = query.with_for_update(skip_locked=True).first()
+                if job is None:
+                    db.rollback()
+                    return None
+                job.status = "processing"
+                job.locked_by = worker_id
+                job.started_at = now
+                job.run_after = lease_until
+                db.commit()
+                return self._to_dict(job, include_result=False)
+
+            # SQLite: optimistic claim, retry a few times if another worker won the race
+            for _ in range(5):
+                candidate = query.with_entities(ProcessingJob.id).first()
+                if candidate is None:
+                    return None
+                claimed = db.execute(
+                    update(ProcessingJob)
+                    .where(ProcessingJob.id == candidate.id, ProcessingJob.status == "pending")
+                    .values(status="processing", locked_by=worker_id, started_at=now, run_after=lease_until)
+                ).rowcount
+                db.commit()
+                if claimed == 1:
+                    job = db.get(ProcessingJob, candidate.id)
+                    return self._to_dict(job, include_result=False)
+            return None
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _claimed_job(self, db, job_id: str, worker_id: Optional[str]) -> Optional[ProcessingJob]:
+        """The job, if ``worker_id`` still holds its lease (any job when ``worker_id`` is None).
+
+        The no-op compare-and-set UPDATE takes the row lock (the database write
+        lock on SQLite) before the ORM update, so a concurrent re-queue or
+        re-claim cannot slip in between the check and the write.
+        """
+        key = uuid.UUID(str(job_id))
+        if worker_id is not None:
+            held = db.execute(
+                update(ProcessingJob)
+                .where(ProcessingJob.id == key, ProcessingJob.status == "processing",
+                       ProcessingJob.locked_by == worker_id)
+                .values(locked_by=worker_id)
+            ).rowcount
+            if held != 1:
+                db.rollback()
+                logger.warning(f"Job {job_id} is no longer leased to {worker_id}; result discarded")
+                return None
+        return db.get(ProcessingJob, key)
+
+    def complete(self, job_id: str, result: Dict[str, Any], worker_id: str = None) -> bool:
+        """Store the result; False if ``worker_id`` lost the lease (the job was re-queued)."""
+        db = self.SessionLocal()
+        try:
+            job = self._claimed_job(db, job_id, worker_id)
+            if job is None:
+                return False
+            job.status = "completed"
+            job.result = _json_safe(result)
+            job.error_message = None
+            job.locked_by = None
+            job.completed_at = datetime.utcnow()
+            db.commit()
+            self._discard_file(job.file_path)
+            return True
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def fail(self, job_id: str, error: str, worker_id: str = None) -> Dict[str, Any]:
+        """Record a failed attempt; re-queue with exponential backoff until max_retries."""
+        db = self.SessionLocal()
+        try:
+            job = self._claimed_job(db, job_id, worker_id)
+            if job is None:
+                return {}
+            job.retry_count = (job.retry_count or 0) + 1
+            job.error_message = error
+            job.locked_by = None
+            limit = job.max_retries if job.max_retries is not None else self.max_retries
+            if not _retries_exhausted(job.retry_count, limit):
+                delay = min(self.backoff_max, self.backoff_base * (2 ** (job.retry_count - 1)))
+                job.status = "pending"
+                job.run_after = datetime.utcnow() + timedelta(seconds=delay)
+                logger.warning(f"Job {job_id} failed (attempt {job.retry_count}/{limit + 1}); retrying in {delay:.0f}s: {error}")
+            else:
+                job.status = "failed"
+                job.completed_at = datetime.utcnow()
+                logger.error(f"Job {job_id} failed permanently after {job.retry_count} attempts: {error}")
+            db.commit()
+            if job.status == "failed":
+                self._discard_file(job.file_path)
+            return self._to_dict(job, include_result=False)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def release(self, job_id: str, delay: float = 1.0, worker_id: str = None) -> None:
+        """Hand a claimed job back without counting an attempt (e.g. local pool saturated)."""
+        db = self.SessionLocal()
+        try:
+            query = update(ProcessingJob).where(ProcessingJob.id == uuid.UUID(str(job_id)))
+            if worker_id is not None:
+                query = query.where(ProcessingJob.status == "processing", ProcessingJob.locked_by == worker_id)
+            db.execute(
+                query.values(status="pending", locked_by=None, started_at=None,
+                             run_after=datetime.utcnow() + timedelta(seconds=delay))
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        """Extend the lease on a running job; False if ``worker_id`` no longer holds it."""
+        db = self.SessionLocal()
+        try:
+            renewed = db.execute(
+                update(ProcessingJob)
+                .where(ProcessingJob.id == uuid.UUID(str(job_id)), ProcessingJob.status == "processing",
+                       ProcessingJob.locked_by == worker_id)
+                .values(run_after=datetime.utcnow() + timedelta(seconds=self.visibility_timeout))
+            ).rowcount
+            db.commit()
+            return renewed == 1
+        finally:
+            db.close()
+
+    @contextmanager
+    def lease(self, job_id: str, worker_id: str):
+        """Keep renewing the lease on ``job_id`` from a background thread while the block runs."""
+        stop = threading.Event()
+
+        def renew():
+            while not stop.wait(self.heartbeat_interval):
+                try:
+                    if not self.heartbeat(job_id, worker_id):
+                        logger.warning(f"Lost the lease on job {job_id}")
+                        return
+                except Exception as e:
+                    logger.warning(f"Heartbeat for job {job_id} failed: {e}")
+
+        thread = threading.Thread(target=renew, name=f"job-lease-{job_id}", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join(timeout=5)
+
+    def requeue_stale(self) -> Dict[str, int]:
+        """Take back jobs whose lease expired (crashed worker).
+
+        Each one counts as an attempt against the same budget as ``fail``: once
+        it is used up the job is marked failed instead of being handed out again.
+        """
+        now = datetime.utcnow()
+        # Rows claimed before leases existed carry no lease, so they also need the old started_at cutoff
+        cutoff = now - timedelta(seconds=self.visibility_timeout)
+        expired = (ProcessingJob.status == "processing", ProcessingJob.run_after < now,
+                   ProcessingJob.started_at < cutoff)
+        limit = func.coalesce(ProcessingJob.max_retries, self.max_retries)
+        exhausted = _retries_exhausted(func.coalesce(ProcessingJob.retry_count, 0) + 1, limit)
+        db = self.SessionLocal()
+        try:
+            dead = db.query(ProcessingJob.id, ProcessingJob.organization_id, ProcessingJob.file_path) \
+                .filter(*expired, exhausted).all()
+            failed = 0
+            for job_id, organization_id, file_path in dead:
+                marked = db.execute(
+                    update(ProcessingJob)
+                    .where(ProcessingJob.id == job_id, *expired)
+                    .values(status="failed", locked_by=None, completed_at=now,
+                            retry_count=func.coalesce(ProcessingJob.retry_count, 0) + 1,
+                            error_message="Worker lost: lease expired too many times")
+                ).rowcount
+                if marked:
+                    # Core updates skip the usage mapper events; count the failure in the same transaction
+                    apply_deltas(db.connection(), organization_id, {"jobs_failed": 1},
+                                 {month_start(now): {"jobs_failed": 1}})
+                failed += marked
+            requeued = db.execute(
+                update(ProcessingJob)
+                .where(*expired)
+                .values(status="pending", locked_by=None, run_after=now,
+                        retry_count=func.coalesce(ProcessingJob.retry_count, 0) + 1)
+            ).rowcount
+            db.commit()
+            for _, _, file_path in dead:
+                self._discard_file(file_path)
+            if requeued or failed:
+                logger.warning(f"Stale jobs: {requeued} re-queued, {failed} failed after repeated worker loss")
+            return {"requeued": requeued, "failed": failed}
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+    def _discard_file(self, file_path: Optional[str]) -> None:
+        if not file_path:
+            return
+        try:
+            Path(file_path).unlink(missing_ok=True)
+        except Exception as e:
+            logger.warning(f"Could not remove job upload {file_path}: {e}")
+
+    def _to_dict(self, job: ProcessingJob, include_result: bool = True) -> Dict[str, Any]:
+        data = {
+            "job_id": str(job.id),
+            "status": job.status,
+            "priority": job.priority,
+            "retry_count": job.retry_count,
+            "max_retries": job.max_retries,
+            "file_name": job.file_name,
+            "file_path": job.file_path,
+            "error": job.error_message,
+            "organization_id": str(job.organization_id) if job.organization_id else None,
+            "document_id": str(job.document_id) if job.document_id else None,
+            "created_at": job.created_at.isoformat() if job.created_at else None,
+            "started_at": job.started_at.isoformat() if job.started_at else None,
+            "completed_at": job.completed_at.isoformat() if job.completed_at else None,
+            "run_after": job.run_after.isoformat() if job.run_after else None
+        }
+        if include_result:
+            data["result"] = job.result
+        return data
+
+
+class JobWorker:
+    """Claims jobs from a JobQueue and runs them through the DocumentProcessor.
+
+    Inside the API process the worker runs as asyncio tasks and dispatches to the
+    shared InferencePool; ``run_forever`` is the blocking loop used by the
+    standalone ``run_job_worker.py`` entrypoint so workers scale apart from API pods.
+    """
+
+    def __init__(self, queue: JobQueue, processor, inference_pool=None, concurrency: int = None,
+                 poll_interval: float = None, worker_id: str = None):
+        self.queue = queue
+        self.processor = processor
+        self.inference_pool = inference_pool
+        self.concurrency = max(1, int(concurrency or os.getenv("JOB_WORKER_CONCURRENCY", "1")))
+        self.poll_interval = float(poll_interval or os.getenv("JOB_POLL_INTERVAL_SECONDS", "1.0"))
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self._tasks = []
+        self._stop = threading.Event()
+        self._last_stale_check = 0.0
+
+    def _maybe_requeue_stale(self) -> None:
+        if time.time() - self._last_stale_check > 60:
+            self._last_stale_check = time.time()
+            try:
+                self.queue.requeue_stale()
+            except Exception as e:
+                logger.warning(f"Stale job check failed: {e}")
+
+    # Async (in-process) mode
+    async def _loop(self, slot: int) -> None:
+        from models.inference_pool import PoolSaturatedError
+        worker_id = f"{self.worker_id}:{slot}"
+        while not self._stop.is_set():
+            try:
+                await asyncio.to_thread(self._maybe_requeue_stale)
+                job = await asyncio.to_thread(self.queue.claim_next, worker_id)
+                if job is None:
+                    await asyncio.sleep(self.poll_interval)
+                    continue
+                try:
+                    with self.queue.lease(job["job_id"], worker_id):
+                        if self.inference_pool is not None:
+                            result = await self.inference_pool.process_document(self.processor, job["file_path"])
+                        else:
+                            result = await asyncio.to_thread(self.processor.process_document, job["file_path"])
+                    result["processing_method"] = "job_queue"
+                    await asyncio.to_thread(self.queue.complete, job["job_id"], result, worker_id)
+                except PoolSaturatedError as e:
+                    # Interactive traffic has the pool; try again later without burning a retry
+                    await asyncio.to_thread(self.queue.release, job["job_id"], e.retry_after, worker_id)
+                except Exception as e:
+                    await asyncio.to_thread(self.queue.fail, job["job_id"], str(e), worker_id)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Job worker loop error: {e}", exc_info=True)
+                await asyncio.sleep(self.poll_interval)
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._tasks = [asyncio.create_task(self._loop(i)) for i in range(self.concurrency)]
+        logger.info(f"Job worker {self.worker_id} started with concurrency={self.concurrency}")
+
+    async def stop(self) -> None:
+        self._stop.set()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    # Blocking (standalone) mode
+    def run_once(self) -> bool:
+        """Process a single job; returns False if nothing was claimable."""
+        self._maybe_requeue_stale()
+        job = self.queue.claim_next(self.worker_id)
+        if job is None:
+            return False
+        try:
+            with self.queue.lease(job["job_id"], self.worker_id):
+                result = self.processor.process_document(job["file_path"])
+            result["processing_method"] = "job_queue"
+            self.queue.complete(job["job_id"], result, self.worker_id)
+        except Exception as e:
+            self.queue.fail(job["job_id"], str(e), self.worker_id)
+        return True
+
+    def run_forever(self) -> None:
+        logger.info(f"Job worker {self.worker_id} polling {self.queue.database_url.split('@')[-1]}")
+        while not self._stop.is_set():
+            if not self.run_once():
+                self._stop.wait(self.poll_interval)
+
+    def request_stop(self) -> None:
+        self._stop.set()
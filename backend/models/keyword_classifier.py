@@ -0,0 +1,186 @@
+import json
+import logging
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Dict, Any, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_VOCABULARY_PATH = Path(__file__).resolve().parent.parent / "config" / "keyword_vocabulary.json"
+
+# Fallback evidence for _classify_document_type when no keyword matches
+ENGINEERING_NUMBER_RE = re.compile(r'\d{4}-\w{3}-\d{3}-\w{3}-\w{3}-\w{2}-\d{6}')
+CURRENCY_AMOUNT_RE = re.compile(r'\$\d+\.\d{2}|\d+\.\d{2}\s*USD')
+NUMERIC_DATE_RE = re.compile(r'\d{2}/\d{2}/\d{4}|\d{4}-\d{2}-\d{2}')
+
+
+def normalize_text(text: str) -> str:
+    """Lower-case with every whitespace run collapsed to one space (what the automaton scans)."""
+    return " ".join(text.lower().split())
+
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton: reports every keyword occurring in a text in one pass over it."""
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords: List[str] = []
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[int, ...]] = [()]
+
+        for keyword_id, keyword in enumerate(keywords):
+            self.keywords.append(keyword)
+            state = 0
+            for ch in keyword:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                state = nxt
+            self._out[state] += (keyword_id,)
+
+        # Breadth-first failure links; outputs are merged along them so a scan never walks the chain
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[nxt] = self._goto[fallback].get(ch, 0)
+                self._out[nxt] += self._out[self._fail[nxt]]
+
+    def __len__(self) -> int:
+        return len(self.keywords)
+
+    def find(self, text: str) -> Set[int]:
+        """Ids of the keywords that occur in ``text`` (already normalised)."""
+        goto, fail, out = self._goto, self._fail, self._out
+        found: Set[int] = set()
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found.update(out[state])
+        return found
+
+
+class KeywordClassifier:
+    """Scores texts against keyword vocabularies loaded from config.
+
+    The vocabulary file maps a vocabulary name (``document_types``,
+    ``table_types``, ``amount_fields``, ...) to ``{label: keywords}``, where
+    keywords are a list (weight 1 each) or a ``{keyword: weight}`` object. All
+    keywords of all vocabularies go into one ``KeywordAutomaton``, so a text is
+    scanned once however many classes there are. A space inside a keyword
+    matches one whitespace run or none, like ``\\s*`` did in the old patterns.
+    """
+
+    def __init__(self, vocabulary: Dict[str, Dict[str, Any]], source: str = ""):
+        self.source = source
+        self.vocabularies: Dict[str, List[str]] = {}
+        # keyword id -> [(vocabulary, label, weight)]
+        self._targets: List[List[Tuple[str, str, float]]] = []
+        keyword_ids: Dict[str, int] = {}
+
+        for vocab_name, labels in vocabulary.items():
+            if vocab_name.startswith("_"):
+                continue
+            self.vocabularies[vocab_name] = list(labels)
+            for label, keywords in labels.items():
+                weighted = keywords.items() if isinstance(keywords, dict) else ((k, 1.0) for k in keywords)
+                for keyword, weight in weighted:
+                    canonical = normalize_text(keyword)
+                    if not canonical:
+                        continue
+                    for variant in {canonical, canonical.replace(" ", "")}:
+                        if variant not in keyword_ids:
+                            keyword_ids[variant] = len(self._targets)
+                            self._targets.append([])
+                        target = (vocab_name, label, float(weight))
+                        # Both spellings of one keyword count once per label
+                        if target not in self._targets[keyword_ids[variant]]:
+                            self._targets[keyword_ids[variant]].append(target)
+        self._canonical = {i: kw for kw, i in keyword_ids.items()}
+        self.automaton = KeywordAutomaton(sorted(keyword_ids, key=keyword_ids.get))
+        logger.info(f"Keyword classifier: {len(self.vocabularies)} vocabularies, {len(keyword_ids)} keywords"
+                    + (f" from {source}" if source else ""))
+
+    @classmethod
+    def from_file(cls, path: str) -> "KeywordClassifier":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f), source=str(path))
+
+    def score_all(self, text: str) -> Dict[str, Dict[str, float]]:
+        """Score vector of every vocabulary: summed weight of the distinct keywords found per label."""
+        scores = {name: dict.fromkeys(labels, 0.0) for name, labels in self.vocabularies.items()}
+        seen: Set[Tuple[str, str, str]] = set()
+        for keyword_id in self.automaton.find(normalize_text(text)):
+            keyword = self._canonical[keyword_id]
+            for vocab_name, label, weight in self._targets[keyword_id]:
+                # "due date" and "duedate" are the same keyword
+                key = (vocab_name, label, keyword.replace(" ", ""))
+                if key not in seen:
+                    seen.add(key)
+                    scores[vocab_name][label] += weight
+        return scores
+
+    def scores(self, text: str, vocabulary: str) -> Dict[str, float]:
+        """Score vector of one vocabulary, labels in config order."""
+        return self.score_all(text).get(vocabulary, {})
+
+    def first_match(self, text: str, vocabulary: str) -> Optional[str]:
+        """First label (in config order) with any keyword in ``text``: the old if/elif keyword chains."""
+        for label, score in self.scores(text, vocabulary).items():
+            if score > 0:
+                return label
+        return None
+
+    def best_label(self, text: str, vocabulary: str) -> Optional[str]:
+        """Highest scoring label; ties go to the label listed first. None when nothing matches."""
+        best, best_score = None, 0.0
+        for label, score in self.scores(text, vocabulary).items():
+            if score > best_score:
+                best, best_score = label, score
+        return best
+
+
+_classifier: Optional[KeywordClassifier] = None
+_classifier_lock = threading.Lock()
+
+
+def get_keyword_classifier() -> KeywordClassifier:
+    """Process-wide classifier built from KEYWORD_VOCABULARY_PATH (default config/keyword_vocabulary.json)."""
+    global _classifier
+    if _classifier is None:
+        with _classifier_lock:
+            if _classifier is None:
+                path = os.getenv("KEYWORD_VOCABULARY_PATH", str(DEFAULT_VOCABULARY_PATH))
+                try:
+                    _classifier = KeywordClassifier.from_file(path)
+                except Exception as e:
+                    logger.error(f"Could not load keyword vocabulary from {path}: {e}")
+                    _classifier = KeywordClassifier({})
+    return _classifier
+
+
+def classify_document_type(text: str) -> str:
+    """Document type with the highest keyword score, falling back to number/date formats."""
+    doc_type = get_keyword_classifier().best_label(text, "document_types") or "unknown"
+
+    # If no matches found, try to determine type from content
+    if doc_type == "unknown":
+        if ENGINEERING_NUMBER_RE.search(text):
+            doc_type = "engineering_doc"
+        elif CURRENCY_AMOUNT_RE.search(text):
+            doc_type = "invoice"
+        elif NUMERIC_DATE_RE.search(text):
+            doc_type = "id_card"
+    return doc_type
@@ -0,0 +1,200 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Dict, Any, List, Optional, Tuple
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+# Keys that are not padded along the sequence dimension
+_NON_SEQUENCE_KEYS = {"pixel_values"}
+
+
+def collate_encodings(encodings: List[Dict[str, torch.Tensor]], pad_token_id: int = 1) -> Dict[str, torch.Tensor]:
+    """Concatenate processor encodings row-wise, padding sequences to the longest one in the batch."""
+    batched = {}
+    for key in encodings[0].keys():
+        tensors = [enc[key] for enc in encodings]
+        if key in _NON_SEQUENCE_KEYS or tensors[0].dim() < 2:
+            batched[key] = torch.cat(tensors, dim=0)
+            continue
+        max_len = max(t.shape[1] for t in tensors)
+        pad_value = pad_token_id if key == "input_ids" else 0
+        padded = []
+        for t in tensors:
+            if t.shape[1] < max_len:
+                filler = torch.full((t.shape[0], max_len - t.shape[1]) + tuple(t.shape[2:]), pad_value, dtype=t.dtype, device=t.device)
+                t = torch.cat([t, filler], dim=1)
+            padded.append(t)
+        batched[key] = torch.cat(padded, dim=0)
+    return batched
+
+
+def encode_windows(processor, image, words: List[str], boxes: List[List[int]], stride: int,
+                   max_windows: int) -> Tuple[Dict[str, torch.Tensor], List[List[Optional[int]]]]:
+    """Overlapping 512-token windows of one page, ready for ``model(**encoding)``.
+
+    Returns the encoding (one row per window, at most ``max_windows``) and the
+    word id of every token of each window.
+    """
+    encoding = processor(
+        image,
+        words,
+        boxes=boxes,
+        return_tensors="pt",
+        truncation=True,
+        padding=True,
+        max_length=512,
+        stride=stride,
+        return_overflowing_tokens=True
+    )
+    encoding.pop("overflow_to_sample_mapping", None)
+    # With overflowing tokens the image processor returns one [3, H, W] tensor per window as a list
+    if isinstance(encoding["pixel_values"], (list, tuple)):
+        encoding["pixel_values"] = torch.stack(encoding["pixel_values"])
+    window_word_ids = [encoding.word_ids(i) for i in range(encoding["input_ids"].shape[0])]
+    if len(window_word_ids) > max_windows:
+        logger.warning(f"Page needs {len(window_word_ids)} LayoutLM windows; keeping the first {max_windows}")
+        window_word_ids = window_word_ids[:max_windows]
+        for key in list(encoding.keys()):
+            encoding[key] = encoding[key][:max_windows]
+    return encoding, window_word_ids
+
+
+class _Request:
+    __slots__ = ("model", "encoding", "rows", "seq_len", "future", "enqueued_at")
+
+    def __init__(self, model, encoding: Dict[str, torch.Tensor]):
+        self.model = model
+        self.encoding = encoding
+        self.rows = int(encoding["input_ids"].shape[0])
+        self.seq_len = int(encoding["input_ids"].shape[1])
+        self.future: Future = Future()
+        self.enqueued_at = time.time()
+
+
+class LayoutLMBatcher:
+    """Dynamic batcher in front of LayoutLMv3 token classification.
+
+    Pages submitted from any thread (pages of one PDF or concurrent requests)
+    are grouped per model into batches of up to ``max_batch_size`` rows, padded
+    per batch, run once under ``torch.no_grad`` and split back per request. A
+    request never waits more than ``max_latency_ms`` for companions.
+    """
+
+    def __init__(self, max_batch_size: int = None, max_latency_ms: float = None):
+        self.max_batch_size = max(1, int(max_batch_size or os.getenv("LAYOUTLM_BATCH_SIZE", "8")))
+        self.max_latency = max(0.0, float(max_latency_ms if max_latency_ms is not None else os.getenv("LAYOUTLM_BATCH_MAX_LATENCY_MS", "10"))) / 1000.0
+
+        self._pending: "deque[_Request]" = deque()
+        self._cond = threading.Condition()
+        self._running = True
+
+        # Rolling statistics
+        self._batches = 0
+        self._rows = 0
+        self._requests = 0
+        self._total_wait = 0.0
+        self._total_batch_seconds = 0.0
+        self._total_padding = 0
+        self._total_tokens = 0
+
+        self._thread = threading.Thread(target=self._run, name="layoutlm-batcher", daemon=True)
+        self._thread.start()
+        logger.info(f"LayoutLM batcher ready: batch_size={self.max_batch_size}, max_latency_ms={self.max_latency * 1000:.0f}")
+
+    def predict(self, model, encoding: Dict[str, torch.Tensor]) -> torch.Tensor:
+        """Return logits for ``encoding``'s rows, shaped as if ``model(**encoding)`` ran alone."""
+        if not self._running:
+            raise RuntimeError("LayoutLM batcher is shut down")
+        request = _Request(model, encoding)
+        with self._cond:
+            self._pending.append(request)
+            self._cond.notify()
+        return request.future.result()
+
+    def _take_batch(self) -> List[_Request]:
+        with self._cond:
+            while self._running and not self._pending:
+                self._cond.wait(timeout=0.5)
+            if not self._pending:
+                return []
+            first = self._pending[0]
+            deadline = first.enqueued_at + self.max_latency
+            while True:
+                rows = sum(r.rows for r in self._pending if r.model is first.model)
+                remaining = deadline - time.time()
+                if rows >= self.max_batch_size or remaining <= 0 or not self._running:
+                    break
+                self._cond.wait(timeout=remaining)
+
+            batch, rows, keep = [], 0, deque()
+            for request in self._pending:
+                if request.model is first.model and (not batch or rows + request.rows <= self.max_batch_size):
+                    batch.append(request)
+                    rows += request.rows
+                else:
+                    keep.append(request)
+            self._pending = keep
+            return batch
+
+    def _run(self) -> None:
+        while self._running or self._pending:
+            batch = self._take_batch()
+            if not batch:
+                continue
+            started = time.time()
+            model = batch[0].model
+            try:
+                pad_token_id = getattr(getattr(model, "config", None), "pad_token_id", None)
+                encoding = collate_encodings([r.encoding for r in batch], 1 if pad_token_id is None else pad_token_id)
+                with torch.no_grad():
+                    logits = model(**encoding).logits
+                offset = 0
+                for request in batch:
+                    request.future.set_result(logits[offset:offset + request.rows, :request.seq_len])
+                    offset += request.rows
+            except Exception as e:
+                logger.error(f"LayoutLM batch failed: {str(e)}")
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+            finished = time.time()
+            rows = sum(r.rows for r in batch)
+            max_len = max(r.seq_len for r in batch)
+            with self._cond:
+                self._batches += 1
+                self._rows += rows
+                self._requests += len(batch)
+                self._total_wait += sum(started - r.enqueued_at for r in batch)
+                self._total_batch_seconds += finished - started
+                self._total_tokens += rows * max_len
+                self._total_padding += sum(r.rows * (max_len - r.seq_len) for r in batch)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Batch utilisation, padding overhead and queueing delay."""
+        with self._cond:
+            avg_rows = (self._rows / self._batches) if self._batches else 0.0
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_latency_ms": round(self.max_latency * 1000, 1),
+                "batches": self._batches,
+                "requests": self._requests,
+                "rows": self._rows,
+                "avg_batch_rows": round(avg_rows, 2),
+                "avg_utilisation": round(avg_rows / self.max_batch_size, 4) if self._batches else 0.0,
+                "padding_ratio": round(self._total_padding / self._total_tokens, 4) if self._total_tokens else 0.0,
+                "avg_wait_ms": round(1000 * self._total_wait / self._requests, 2) if self._requests else 0.0,
+                "avg_batch_ms": round(1000 * self._total_batch_seconds / self._batches, 2) if self._batches else 0.0,
+                "queue_depth": len(self._pending)
+            }
+
+    def shutdown(self) -> None:
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        self._thread.join(timeout=5)
@@ -0,0 +1,304 @@
+import atexit
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS corrections (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    doc_type TEXT NOT NULL,
+    field TEXT NOT NULL,
+    original TEXT,
+    corrected TEXT,
+    context TEXT,
+    timestamp REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_corrections_field ON corrections(doc_type, field);
+CREATE TABLE IF NOT EXISTS annotations (
+    doc_id TEXT PRIMARY KEY,
+    payload TEXT NOT NULL,
+    timestamp REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS patterns (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    doc_type TEXT NOT NULL,
+    field TEXT NOT NULL,
+    pattern TEXT NOT NULL,
+    correction TEXT,
+    confidence REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS confidence_history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    doc_type TEXT NOT NULL,
+    field TEXT NOT NULL,
+    confidence REAL NOT NULL,
+    timestamp REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_confidence_history_field ON confidence_history(doc_type, field, id);
+"""
+
+
+class PatternIndex:
+    """Finds the first learned pattern that occurs in a text without trying every pattern.
+
+    Each pattern is filed under one of its ``anchor``-character substrings,
+    the one with the fewest patterns filed under it so far (boilerplate like
+    "Invoice " would collect thousands). A pattern can only occur in a text
+    that contains its anchor, so a lookup walks the text's ``anchor``-grams
+    once, checks the few patterns filed under them and keeps the oldest one
+    that matches: the same answer as scanning the patterns in insertion
+    order, at a cost set by the text length instead of the pattern count.
+    Patterns shorter than the anchor are scanned directly.
+    """
+
+    def __init__(self, anchor: int = 8):
+        self.anchor = anchor
+        self._by_anchor: Dict[Tuple[str, str], Dict[str, List[Tuple[int, str, Any, float]]]] = defaultdict(dict)
+        self._short: Dict[Tuple[str, str], List[Tuple[int, str, Any, float]]] = defaultdict(list)
+        self.size = 0
+
+    def add(self, pattern_id: int, doc_type: str, field: str, pattern: str, correction: Any, confidence: float) -> None:
+        entry = (pattern_id, pattern, correction, confidence)
+        if len(pattern) < self.anchor:
+            self._short[(doc_type, field)].append(entry)
+        else:
+            anchors = self._by_anchor[(doc_type, field)]
+            grams = {pattern[i:i + self.anchor] for i in range(len(pattern) - self.anchor + 1)}
+            gram = min(grams, key=lambda g: (len(anchors.get(g, ())), g))
+            anchors.setdefault(gram, []).append(entry)
+        self.size += 1
+
+    def find(self, doc_type: str, field: str, text: str) -> Optional[Tuple[int, str, Any, float]]:
+        key = (doc_type, field)
+        best = None
+        for entry in self._short.get(key, ()):
+            if entry[1] in text:
+                best = entry
+                break
+        anchors = self._by_anchor.get(key)
+        if anchors:
+            seen = set()
+            for i in range(len(text) - self.anchor + 1):
+                gram = text[i:i + self.anchor]
+                if gram in seen:
+                    continue
+                seen.add(gram)
+                for entry in anchors.get(gram, ()):
+                    if best is not None and entry[0] > best[0]:
+                        break  # lists are in id order
+                    if entry[1] in text:
+                        best = entry
+                        break
+        return best
+
+
+class LearningStore:
+    """Learning data of the Donut processor in SQLite (WAL), replacing learning_data.json.
+
+    Writes are buffered and committed together: when ``flush_batch`` are
+    pending, after ``flush_seconds``, on ``flush()`` and at exit. Learned
+    patterns are served from a ``PatternIndex`` that picks up rows written by
+    other workers on the next lookup.
+    """
+
+    def __init__(self, path: str = None, flush_batch: int = None, flush_seconds: float = None,
+                 history_limit: int = 100):
+        self.path = Path(path or os.getenv("LEARNING_DB_PATH", "data/learning_data.sqlite"))
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.flush_batch = max(1, int(flush_batch or os.getenv("LEARNING_FLUSH_BATCH", "64")))
+        self.flush_seconds = float(flush_seconds if flush_seconds is not None else os.getenv("LEARNING_FLUSH_SECONDS", "1.0"))
+        self.history_limit = history_limit
+
+        self._lock = threading.RLock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._pending: List[Tuple[str, tuple]] = []
+        self._timer: Optional[threading.Timer] = None
+        self._index = PatternIndex(int(os.getenv("LEARNING_PATTERN_ANCHOR", "8")))
+        self._last_pattern_id = 0
+        self._stats = {"flushes": 0, "rows_written": 0, "lookups": 0, "pattern_hits": 0}
+        with self._lock:
+            self._connection()
+        atexit.register(self.flush)
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections must not cross a fork (gunicorn --preload)
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None, timeout=10.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    # -- buffered writes -------------------------------------------------------
+
+    def _queue(self, kind: str, row: tuple) -> None:
+        with self._lock:
+            self._pending.append((kind, row))
+            if len(self._pending) >= self.flush_batch or self.flush_seconds <= 0:
+                self.flush()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.flush_seconds, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def add_correction(self, doc_type: str, field: str, original: Any, corrected: Any,
+                       context: Dict[str, Any], timestamp: float) -> None:
+        self._queue("correction", (doc_type, field, _text(original), _text(corrected),
+                                   json.dumps(context, default=str), timestamp))
+
+    def add_pattern(self, doc_type: str, field: str, pattern: str, correction: Any, confidence: float) -> None:
+        self._queue("pattern", (doc_type, field, pattern, _text(correction), confidence))
+
+    def add_annotation(self, doc_id: str, annotation: Dict[str, Any]) -> None:
+        self._queue("annotation", (doc_id, json.dumps(annotation, default=str), annotation.get("timestamp", time.time())))
+
+    def add_confidence(self, doc_type: str, field: str, confidence: float, timestamp: float) -> None:
+        self._queue("confidence", (doc_type, field, confidence, timestamp))
+
+    _INSERTS = {
+        "correction": "INSERT INTO corrections (doc_type, field, original, corrected, context, timestamp) VALUES (?, ?, ?, ?, ?, ?)",
+        "pattern": "INSERT INTO patterns (doc_type, field, pattern, correction, confidence) VALUES (?, ?, ?, ?, ?)",
+        "annotation": "INSERT OR REPLACE INTO annotations (doc_id, payload, timestamp) VALUES (?, ?, ?)",
+        "confidence": "INSERT INTO confidence_history (doc_type, field, confidence, timestamp) VALUES (?, ?, ?, ?)",
+    }
+
+    def flush(self) -> int:
+        """Commit pending writes in one transaction; returns the number of rows written."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            pending, self._pending = self._pending, []
+            if not pending:
+                return 0
+            by_kind: Dict[str, List[tuple]] = defaultdict(list)
+            for kind, row in pending:
+                by_kind[kind].append(row)
+            conn = self._connection()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                # Kinds are independent, so insertion order within a kind is all that matters
+                for kind, rows in by_kind.items():
+                    conn.executemany(self._INSERTS[kind], rows)
+                for doc_type, field in {(row[0], row[1]) for row in by_kind.get("confidence", ())}:
+                    conn.execute(
+                        "DELETE FROM confidence_history WHERE doc_type = ? AND field = ? AND id <= "
+                        "(SELECT id FROM confidence_history WHERE doc_type = ? AND field = ? ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                        (doc_type, field, doc_type, field, self.history_limit)
+                    )
+                conn.execute("COMMIT")
+            except Exception as e:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                # Keep the rows for the next flush rather than losing feedback
+                self._pending = pending + self._pending
+                logger.error(f"Error writing learning data: {str(e)}")
+                return 0
+            self._stats["flushes"] += 1
+            self._stats["rows_written"] += len(pending)
+            return len(pending)
+
+    # -- reads -----------------------------------------------------------------
+
+    def _refresh_patterns(self) -> None:
+        rows = self._connection().execute(
+            "SELECT id, doc_type, field, pattern, correction, confidence FROM patterns WHERE id > ? ORDER BY id",
+            (self._last_pattern_id,)
+        ).fetchall()
+        for row in rows:
+            self._index.add(*row)
+        if rows:
+            self._last_pattern_id = rows[-1][0]
+
+    def find_pattern(self, doc_type: str, field: str, text: str) -> Tuple[Optional[str], float]:
+        """Correction and confidence of the oldest learned pattern found in ``text``."""
+        with self._lock:
+            if any(kind == "pattern" for kind, _ in self._pending):
+                self.flush()
+            self._refresh_patterns()
+            self._stats["lookups"] += 1
+            match = self._index.find(doc_type, field, text)
+            if match is None:
+                return None, 0.0
+            self._stats["pattern_hits"] += 1
+            return match[2], match[3]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Totals and the last 10 confidence scores per (doc_type, field)."""
+        with self._lock:
+            self.flush()
+            conn = self._connection()
+            stats = {
+                "total_corrections": conn.execute("SELECT COUNT(*) FROM corrections").fetchone()[0],
+                "total_annotations": conn.execute("SELECT COUNT(*) FROM annotations").fetchone()[0],
+                "total_patterns": conn.execute("SELECT COUNT(*) FROM patterns").fetchone()[0],
+            }
+            recent = conn.execute(
+                "SELECT doc_type, field, confidence FROM ("
+                " SELECT doc_type, field, confidence, id,"
+                " ROW_NUMBER() OVER (PARTITION BY doc_type, field ORDER BY id DESC) AS rn FROM confidence_history"
+                ") WHERE rn <= 10 ORDER BY doc_type, field, id"
+            ).fetchall()
+        history: Dict[str, Dict[str, List[float]]] = defaultdict(lambda: defaultdict(list))
+        for doc_type, field, confidence in recent:
+            history[doc_type][field].append(confidence)
+        stats["recent_confidences"] = {doc_type: dict(fields) for doc_type, fields in history.items()}
+        return stats
+
+    def get_store_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, "pending": len(self._pending), "indexed_patterns": self._index.size,
+                    "path": str(self.path), "flush_batch": self.flush_batch, "flush_seconds": self.flush_seconds}
+
+    # -- migration -------------------------------------------------------------
+
+    def import_json(self, json_path: Path) -> int:
+        """One-time import of learning_data.json; the file is renamed afterwards."""
+        json_path = Path(json_path)
+        claimed = json_path.with_name(json_path.name + ".importing")
+        try:
+            # Only one worker wins the rename, so the data is imported once
+            json_path.rename(claimed)
+        except FileNotFoundError:
+            return 0
+        with open(claimed, "r") as f:
+            data = json.load(f)
+        rows = 0
+        with self._lock:
+            for doc_type, fields in data.get("corrections", {}).items():
+                for field, corrections in fields.items():
+                    for c in corrections:
+                        self.add_correction(doc_type, field, c.get("original"), c.get("corrected"),
+                                            c.get("context", {}), c.get("timestamp", 0.0))
+                        rows += 1
+            for doc_type, fields in data.get("patterns", {}).items():
+                for field, patterns in fields.items():
+                    for p in patterns:
+                        self.add_pattern(doc_type, field, p["pattern"], p.get("correction"), p.get("confidence", 0.8))
+                        rows += 1
+            for doc_id, annotation in data.get("annotations", {}).items():
+                self.add_annotation(doc_id, annotation)
+                rows += 1
+            for doc_type, fields in data.get("confidence_history", {}).items():
+                for field, history in fields.items():
+                    for h in history:
+                        self.add_confidence(doc_type, field, h["confidence"], h.get("timestamp", 0.0))
+                        rows += 1
+            self.flush()
+        claimed.rename(json_path.with_name(json_path.name + ".imported"))
+        logger.info(f"Imported {rows} learning records from {json_path}")
+        return rows
+
+
+def _text(value: Any) -> Optional[str]:
+    return value if value is None or isinstance(value, str) else json.dumps(value, default=str)
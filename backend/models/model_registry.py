@@ -0,0 +1,218 @@
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, Callable, Optional, Tuple
+
+try:
+    import psutil  # type: ignore
+except Exception:  # pragma: no cover
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+RegistryKey = Tuple[str, str, str, str]  # (kind, model_id, device, precision)
+
+
+def _estimate_bytes(obj: Any) -> Optional[int]:
+    """Best-effort resident size: torch parameters/buffers, or on-disk size of Paddle inference dirs."""
+    try:
+        import torch
+        module = obj if isinstance(obj, torch.nn.Module) else getattr(obj, "model", None)
+        if isinstance(module, torch.nn.Module):
+            tensors = list(module.parameters()) + list(module.buffers())
+            return int(sum(t.numel() * t.element_size() for t in tensors))
+    except Exception:
+        pass
+    args = getattr(obj, "args", None)
+    if args is not None:
+        total = 0
+        for attr in ("det_model_dir", "rec_model_dir", "cls_model_dir"):
+            model_dir = getattr(args, attr, None)
+            if model_dir and os.path.isdir(model_dir):
+                total += sum(f.stat().st_size for f in Path(model_dir).rglob("*") if f.is_file())
+        return total or None
+    return None
+
+
+class _Entry:
+    __slots__ = ("key", "value", "refcount", "loaded_at", "load_seconds", "last_used", "size_bytes", "lock")
+
+    def __init__(self, key: RegistryKey):
+        self.key = key
+        self.value = None
+        self.refcount = 0
+        self.loaded_at = None
+        self.load_seconds = 0.0
+        self.last_used = None
+        self.size_bytes = None
+        self.lock = threading.Lock()
+
+
+class ModelRegistry:
+    """Process-wide registry so each heavy model is resident once per process.
+
+    Models are loaded lazily on first ``acquire`` and keyed by
+    ``(kind, model_id, device, precision)``. Every ``acquire`` must be paired
+    with a ``release``; the entry is unloaded when its refcount drops to zero.
+    ``shared`` holds process-wide singletons (DocumentProcessor,
+    ActiveModelManager, ...) that own registry models themselves.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[RegistryKey, _Entry] = {}
+        self._shared: Dict[str, Any] = {}
+        self._shared_locks: Dict[str, threading.Lock] = {}
+        self._loads = 0
+        self._hits = 0
+
+    @staticmethod
+    def make_key(kind: str, model_id: str, device: str = "cpu", precision: str = "fp32") -> RegistryKey:
+        return (kind, str(model_id), device, precision)
+
+    def acquire(self, kind: str, model_id: str, loader: Callable[[], Any],
+                device: str = "cpu", precision: str = "fp32") -> Any:
+        """Return the shared instance for the key, loading it with ``loader`` on first use."""
+        key = self.make_key(kind, model_id, device, precision)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = _Entry(key)
+                self._entries[key] = entry
+        with entry.lock:
+            if entry.value is None:
+                started = time.time()
+                value = loader()
+                entry.load_seconds = time.time() - started
+                entry.loaded_at = time.time()
+                entry.size_bytes = _estimate_bytes(value)
+                entry.value = value
+                with self._lock:
+                    self._loads += 1
+                logger.info(f"Model registry loaded {kind}:{model_id} ({device}/{precision}) in {entry.load_seconds:.2f}s")
+            else:
+                with self._lock:
+                    self._hits += 1
+            entry.refcount += 1
+            entry.last_used = time.time()
+            return entry.value
+
+    def release(self, kind: str, model_id: str, device: str = "cpu", precision: str = "fp32") -> None:
+        """Drop one reference; unload the model when nobody holds it any more."""
+        key = self.make_key(kind, model_id, device, precision)
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return
+        with entry.lock:
+            entry.refcount = max(0, entry.refcount - 1)
+            if entry.refcount == 0 and entry.value is not None:
+                entry.value = None
+                with self._lock:
+                    if self._entries.get(key) is entry:
+                        del self._entries[key]
+                logger.info(f"Model registry unloaded {kind}:{model_id} ({device}/{precision})")
+
+    def shared(self, name: str, factory: Callable[[], Any]) -> Any:
+        """Process-wide singleton built once by ``factory``."""
+        with self._lock:
+            if name in self._shared:
+                return self._shared[name]
+            lock = self._shared_locks.setdefault(name, threading.Lock())
+        with lock:
+            with self._lock:
+                if name in self._shared:
+                    return self._shared[name]
+            value = factory()
+            with self._lock:
+                self._shared[name] = value
+            return value
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Resident models, refcounts and approximate memory for the /metrics view."""
+        with self._lock:
+            entries = list(self._entries.values())
+            shared = sorted(self._shared.keys())
+            loads, hits = self._loads, self._hits
+        models = []
+        for entry in entries:
+            if entry.value is None:
+                continue
+            kind, model_id, device, precision = entry.key
+            models.append({
+                "kind": kind,
+                "model_id": model_id,
+                "device": device,
+                "precision": precision,
+                "refcount": entry.refcount,
+                "size_mb": round(entry.size_bytes / (1024 * 1024), 1) if entry.size_bytes else None,
+                "load_seconds": round(entry.load_seconds, 2),
+                "loaded_at": entry.loaded_at,
+                "last_used": entry.last_used
+            })
+        stats = {
+            "models": models,
+            "resident_models": len(models),
+            "estimated_model_mb": round(sum(m["size_mb"] or 0 for m in models), 1),
+            "shared_instances": shared,
+            "loads": loads,
+            "cache_hits": hits
+        }
+        if psutil is not None:
+            try:
+                stats["process_rss_mb"] = round(psutil.Process().memory_info().rss / (1024 * 1024), 1)
+            except Exception:
+                pass
+        return stats
+
+
+# Process-wide registry
+registry = ModelRegistry()
+
+
+BASE_LAYOUTLM_MODEL = "microsoft/layoutlmv3-base"
+
+
+def acquire_spacy(name: str = "en_core_web_sm"):
+    import spacy
+    return registry.acquire("spacy", name, lambda: spacy.load(name))
+
+
+def acquire_layoutlm(num_labels: int, device: str = "cpu"):
+    """Base LayoutLMv3 processor and token classifier (or LAYOUTLM_CHECKPOINT when it exists).
+
+    Returns ``(processor, model, model_id)``; both are registry references.
+    """
+    from transformers import LayoutLMv3Processor, LayoutLMv3ForTokenClassification
+    from models.model_sharing import load_pretrained
+
+    processor = registry.acquire(
+        "layoutlmv3-processor", BASE_LAYOUTLM_MODEL,
+        lambda: LayoutLMv3Processor.from_pretrained(
+            BASE_LAYOUTLM_MODEL,
+            apply_ocr=False  # Important: Set to False since we use PaddleOCR
+        ),
+        precision="-"
+    )
+    checkpoint_path = os.getenv("LAYOUTLM_CHECKPOINT")
+    model_id = checkpoint_path if checkpoint_path and os.path.exists(checkpoint_path) else BASE_LAYOUTLM_MODEL
+    model = registry.acquire(
+        "layoutlmv3", model_id,
+        lambda: load_pretrained(LayoutLMv3ForTokenClassification, model_id, num_labels=num_labels).to(device).eval(),
+        device=device
+    )
+    return processor, model, model_id
+
+
+def get_shared_document_processor():
+    """The one DocumentProcessor of this process."""
+    from models.document_processor import DocumentProcessor
+    return registry.shared("document_processor", DocumentProcessor)
+
+
+def get_shared_active_model_manager():
+    """The one ActiveModelManager of this process (training router, inference and /health)."""
+    from models.active_model_manager import ActiveModelManager
+    return registry.shared("active_model_manager", ActiveModelManager)
@@ -0,0 +1,249 @@
+import gc
+import json
+import logging
+import multiprocessing
+import os
+import struct
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple
+
+try:
+    import psutil  # type: ignore
+except Exception:  # pragma: no cover
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+# safetensors dtype tags -> torch dtype names
+_SAFETENSORS_DTYPES = {
+    "F64": "float64", "F32": "float32", "F16": "float16", "BF16": "bfloat16",
+    "I64": "int64", "I32": "int32", "I16": "int16", "I8": "int8", "U8": "uint8", "BOOL": "bool",
+}
+
+# Models loaded in the gunicorn master before forking (kept referenced for the master's lifetime)
+_preloaded: Dict[str, Any] = {}
+
+
+def _enabled(name: str, default: str = "false") -> bool:
+    return os.getenv(name, default).lower() in ["1", "true", "yes"]
+
+
+def mmap_enabled() -> bool:
+    return _enabled("MODEL_MMAP_WEIGHTS")
+
+
+def preload_enabled() -> bool:
+    return _enabled("PRELOAD_MODELS")
+
+
+# ---------------------------------------------------------------------------
+# Memory-mapped weights
+# ---------------------------------------------------------------------------
+
+def load_state_dict_mmap(weights_path: str) -> Dict[str, Any]:
+    """State dict whose tensors point into a read-only mapping of the weights file.
+
+    Pages come from the OS page cache, so every process that maps the same file
+    shares them instead of holding a private copy.
+    """
+    import torch
+
+    path = Path(weights_path)
+    if path.suffix != ".safetensors":
+        return torch.load(str(path), map_location="cpu", mmap=True, weights_only=True)
+
+    with path.open("rb") as f:
+        header_len = struct.unpack("<Q", f.read(8))[0]
+        header = json.loads(f.read(header_len))
+    header.pop("__metadata__", None)
+    data_start = 8 + header_len
+    storage = torch.UntypedStorage.from_file(str(path), shared=False, nbytes=path.stat().st_size)
+
+    state = {}
+    for name, info in header.items():
+        dtype = getattr(torch, _SAFETENSORS_DTYPES[info["dtype"]])
+        begin, end = info["data_offsets"]
+        element_size = torch.empty(0, dtype=dtype).element_size()
+        if (data_start + begin) % element_size:
+            # Misaligned tensor cannot be viewed in place; fall back to a copying load
+            from safetensors.torch import load_file
+            logger.warning(f"{path} has unaligned tensors; loading without mmap")
+            return load_file(str(path))
+        tensor = torch.empty(0, dtype=dtype)
+        tensor.set_(storage, (data_start + begin) // element_size, info["shape"])
+        state[name] = tensor
+    return state
+
+
+def _find_weights(model_id: str) -> Optional[str]:
+    """Single-file weights for a local model dir or a cached hub model (sharded checkpoints are not mapped)."""
+    names = ("model.safetensors", "pytorch_model.bin")
+    if os.path.isdir(model_id):
+        for name in names:
+            candidate = os.path.join(model_id, name)
+            if os.path.exists(candidate):
+                return candidate
+        return None
+    try:
+        from transformers.utils import cached_file
+        for name in names:
+            candidate = cached_file(model_id, name, _raise_exceptions_for_missing_entries=False)
+            if candidate:
+                return candidate
+    except Exception as e:
+        logger.debug(f"Could not resolve weights for {model_id}: {e}")
+    return None
+
+
+def load_pretrained(model_cls, model_id: str, **config_kwargs):
+    """``model_cls.from_pretrained`` with memory-mapped weights when MODEL_MMAP_WEIGHTS is on.
+
+    Parameters are assigned straight from the mapping (no copy), so N workers on
+    one node share one copy of the weights. Tensors that are missing or differ in
+    shape (e.g. a fresh classification head) keep their random initialisation,
+    like ``from_pretrained`` does.
+    """
+    weights = _find_weights(model_id) if mmap_enabled() else None
+    if weights is None:
+        return model_cls.from_pretrained(model_id, **config_kwargs)
+
+    from transformers import AutoConfig
+
+    config = AutoConfig.from_pretrained(model_id, **config_kwargs)
+    model = model_cls(config)
+    state = load_state_dict_mmap(weights)
+
+    # Checkpoints saved from the bare encoder have no "<prefix>." on their keys
+    prefix = getattr(model, "base_model_prefix", "")
+    own = model.state_dict()
+    if prefix and not any(k.startswith(prefix + ".") for k in state) and any(k.startswith(prefix + ".") for k in own):
+        state = {f"{prefix}.{k}": v for k, v in state.items()}
+    mismatched = [k for k, v in state.items() if k in own and tuple(own[k].shape) != tuple(v.shape)]
+    for k in mismatched:
+        state.pop(k)
+
+    missing, unexpected = model.load_state_dict(state, strict=False, assign=True)
+    model.tie_weights()
+    if missing or mismatched:
+        logger.info(f"{model_id}: newly initialised {sorted(set(missing) | set(mismatched))}")
+    if unexpected:
+        logger.debug(f"{model_id}: unused checkpoint tensors {unexpected}")
+    logger.info(f"Loaded {model_id} with memory-mapped weights from {weights}")
+    return model.eval()
+
+
+# ---------------------------------------------------------------------------
+# gunicorn preload / copy-on-write
+# ---------------------------------------------------------------------------
+
+def _rss_mb() -> float:
+    if psutil is None:
+        return 0.0
+    return psutil.Process().memory_info().rss / (1024 * 1024)
+
+
+def preload_models() -> Dict[str, Any]:
+    """Load the heavy models into the registry of the gunicorn master before it forks.
+
+    Workers inherit the registry, so their ``registry.acquire`` calls find the
+    models already resident and the weight pages stay shared copy-on-write.
+    PaddleOCR is left to the workers: its predictors are not fork-safe.
+    """
+    import torch
+    from models.model_registry import acquire_spacy, acquire_layoutlm
+
+    # No intra-op thread pool in the master, so forked workers never inherit a busy one
+    torch.set_num_threads(1)
+    rss_before = _rss_mb()
+    loaded = []
+    try:
+        _preloaded["spacy"] = acquire_spacy()
+        loaded.append("spacy")
+    except Exception as e:
+        logger.warning(f"Preload of spaCy failed: {e}")
+    try:
+        _preloaded["layoutlm"] = acquire_layoutlm(num_labels=11)
+        loaded.append("layoutlm")
+    except Exception as e:
+        logger.warning(f"Preload of LayoutLMv3 failed: {e}")
+    try:
+        from models.active_model_manager import ActiveModelManager
+        manager = ActiveModelManager(watch_interval=0)
+        _preloaded["active_model"] = manager
+        if manager.get_active_snapshot().model is not None:
+            loaded.append("active_model")
+    except Exception as e:
+        logger.warning(f"Preload of the active model failed: {e}")
+
+    # Keep the collector from touching (and thus un-sharing) the preloaded objects
+    gc.collect()
+    gc.freeze()
+
+    shared_mb = max(0.0, _rss_mb() - rss_before)
+    logger.info(f"Preloaded {loaded} in the master, ~{shared_mb:.0f} MB shared with workers")
+    return {"models": loaded, "shared_mb": round(shared_mb, 1)}
+
+
+def after_fork(workers: int) -> None:
+    """Per-worker setup after fork: size torch's thread pool to this worker's share of the cores."""
+    threads = int(os.getenv("TORCH_THREADS_PER_WORKER", "0")) or max(1, multiprocessing.cpu_count() // max(1, workers))
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except Exception:
+        pass
+
+
+# ---------------------------------------------------------------------------
+# Worker-count recommendation
+# ---------------------------------------------------------------------------
+
+def recommend_worker_count(shared_mb: float = None, private_mb: float = None, total_mb: float = None,
+                           memory_fraction: float = None, cpu_count: int = None) -> Dict[str, Any]:
+    """Workers that fit in memory given the model footprint, capped by the usual 2*cores+1.
+
+    ``shared_mb`` is the model memory; with preload or mmap'd weights it is paid
+    once per node, otherwise once per worker. ``private_mb`` is what each worker
+    holds on its own (OCR predictors, request buffers, Python heap).
+    """
+    shared = preload_enabled() or mmap_enabled()
+    shared_mb = float(shared_mb if shared_mb is not None else os.getenv("MODEL_FOOTPRINT_MB", "1500"))
+    private_mb = float(private_mb if private_mb is not None else os.getenv("WORKER_PRIVATE_MB", "768"))
+    memory_fraction = float(memory_fraction if memory_fraction is not None else os.getenv("WORKER_MEMORY_FRACTION", "0.8"))
+    cpu_count = cpu_count or multiprocessing.cpu_count()
+    if total_mb is None:
+        total_mb = psutil.virtual_memory().total / (1024 * 1024) if psutil is not None else 0.0
+
+    cpu_bound = cpu_count * 2 + 1
+    budget_mb = total_mb * memory_fraction
+    if not total_mb:
+        memory_bound = cpu_bound
+    elif shared:
+        memory_bound = int((budget_mb - shared_mb) // max(1.0, private_mb))
+    else:
+        memory_bound = int(budget_mb // max(1.0, shared_mb + private_mb))
+    return {
+        "workers": max(1, min(cpu_bound, memory_bound)),
+        "cpu_bound": cpu_bound,
+        "memory_bound": memory_bound,
+        "shared_weights": shared,
+        "model_footprint_mb": round(shared_mb, 1),
+        "per_worker_private_mb": round(private_mb, 1),
+        "memory_budget_mb": round(budget_mb, 1)
+    }
+
+
+def process_memory() -> Dict[str, Any]:
+    """RSS vs. private (USS) and proportional (PSS) memory of this worker; USS << RSS means sharing works."""
+    if psutil is None:
+        return {}
+    try:
+        info = psutil.Process().memory_full_info()
+    except Exception:
+        info = psutil.Process().memory_info()
+    to_mb = lambda v: round(v / (1024 * 1024), 1)
+    stats = {"rss_mb": to_mb(info.rss)}
+    for field in ("uss", "pss", "shared"):
+        if hasattr(info, field):
+            stats[f"{field}_mb"] = to_mb(getattr(info, field))
+    return stats
@@ -0,0 +1,154 @@
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import List, Dict, Any, Tuple
+
+import numpy as np
+
+try:
+    import cv2  # type: ignore
+except Exception:  # pragma: no cover
+    cv2 = None
+
+logger = logging.getLogger(__name__)
+
+
+def sort_text_boxes(dt_boxes) -> List[np.ndarray]:
+    """Order detected quads top-to-bottom, then left-to-right within a line."""
+    boxes = sorted([np.asarray(b, dtype=np.float32) for b in dt_boxes], key=lambda b: (b[0][1], b[0][0]))
+    for i in range(len(boxes) - 1):
+        for j in range(i, -1, -1):
+            if abs(boxes[j + 1][0][1] - boxes[j][0][1]) < 10 and boxes[j + 1][0][0] < boxes[j][0][0]:
+                boxes[j], boxes[j + 1] = boxes[j + 1], boxes[j]
+            else:
+                break
+    return boxes
+
+
+def crop_text_box(img: np.ndarray, box: np.ndarray) -> np.ndarray:
+    """Perspective-crop one text quad, rotating tall crops upright (PaddleOCR convention)."""
+    pts = box.astype(np.float32)
+    width = int(max(np.linalg.norm(pts[0] - pts[1]), np.linalg.norm(pts[2] - pts[3])))
+    height = int(max(np.linalg.norm(pts[0] - pts[3]), np.linalg.norm(pts[1] - pts[2])))
+    width, height = max(width, 1), max(height, 1)
+    target = np.float32([[0, 0], [width, 0], [width, height], [0, height]])
+    matrix = cv2.getPerspectiveTransform(pts, target)
+    crop = cv2.warpPerspective(img, matrix, (width, height), borderMode=cv2.BORDER_REPLICATE,
+                               flags=cv2.INTER_CUBIC)
+    if crop.shape[0] * 1.0 / crop.shape[1] >= 1.5:
+        crop = np.rot90(crop)
+    return crop
+
+
+class RecognitionBatcher:
+    """Micro-batches text-line recognition across pages and concurrent requests.
+
+    Callers detect text boxes on their own engine and hand the line crops to
+    ``recognize``; a single worker thread gathers crops from every caller for
+    up to ``max_wait_ms`` (or until ``max_batch_size`` crops are queued) and runs
+    angle classification + recognition on them as one batch.
+    """
+
+    def __init__(self, engine, name: str = "ocr", max_batch_size: int = None, max_wait_ms: float = None):
+        self.engine = engine
+        self.name = name
+        self.max_batch_size = max(1, int(max_batch_size or os.getenv("OCR_BATCH_SIZE", "32")))
+        self.max_wait = max(0.0, float(max_wait_ms if max_wait_ms is not None else os.getenv("OCR_BATCH_MAX_WAIT_MS", "20"))) / 1000.0
+
+        self._queue: "queue.Queue[Tuple[np.ndarray, Future, float]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._running = True
+
+        # Rolling statistics
+        self._batches = 0
+        self._items = 0
+        self._total_queue_wait = 0.0
+        self._total_batch_seconds = 0.0
+        self._last_batch_size = 0
+        self._max_batch_seen = 0
+
+        self._thread = threading.Thread(target=self._run, name=f"ocr-rec-batcher-{name}", daemon=True)
+        self._thread.start()
+        logger.info(f"OCR recognition batcher '{name}' ready: batch_size={self.max_batch_size}, max_wait_ms={self.max_wait * 1000:.0f}")
+
+    def recognize(self, crops: List[np.ndarray], cls: bool = True) -> List[Tuple[str, float]]:
+        """Recognise text-line crops; blocks until all of them have been batched and run."""
+        if not crops:
+            return []
+        if not self._running:
+            raise RuntimeError(f"OCR batcher '{self.name}' is shut down")
+        futures = []
+        now = time.time()
+        for crop in crops:
+            future: Future = Future()
+            self._queue.put((crop, future, now))
+            futures.append(future)
+        return [f.result() for f in futures]
+
+    def _collect(self) -> List[Tuple[np.ndarray, Future, float]]:
+        try:
+            first = self._queue.get(timeout=0.5)
+        except queue.Empty:
+            return []
+        batch = [first]
+        deadline = time.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.time()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while self._running or not self._queue.empty():
+            batch = self._collect()
+            if not batch:
+                continue
+            started = time.time()
+            crops = [item[0] for item in batch]
+            try:
+                if getattr(self.engine, "use_angle_cls", False) and getattr(self.engine, "text_classifier", None) is not None:
+                    crops, _, _ = self.engine.text_classifier(crops)
+                rec_res, _ = self.engine.text_recognizer(crops)
+                for (_, future, _), res in zip(batch, rec_res):
+                    future.set_result((res[0], float(res[1])))
+            except Exception as e:
+                logger.error(f"OCR recognition batch failed: {str(e)}")
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            finished = time.time()
+            with self._lock:
+                self._batches += 1
+                self._items += len(batch)
+                self._total_queue_wait += sum(started - item[2] for item in batch)
+                self._total_batch_seconds += finished - started
+                self._last_batch_size = len(batch)
+                self._max_batch_seen = max(self._max_batch_seen, len(batch))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-batch utilisation for health/metrics endpoints."""
+        with self._lock:
+            avg_batch = (self._items / self._batches) if self._batches else 0.0
+            return {
+                "name": self.name,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": round(self.max_wait * 1000, 1),
+                "batches": self._batches,
+                "items": self._items,
+                "avg_batch_size": round(avg_batch, 2),
+                "avg_utilisation": round(avg_batch / self.max_batch_size, 4) if self._batches else 0.0,
+                "last_batch_size": self._last_batch_size,
+                "max_batch_size_seen": self._max_batch_seen,
+                "avg_queue_wait_ms": round(1000 * self._total_queue_wait / self._items, 2) if self._items else 0.0,
+                "avg_batch_ms": round(1000 * self._total_batch_seconds / self._batches, 2) if self._batches else 0.0,
+                "queue_depth": self._queue.qsize()
+            }
+
+    def shutdown(self) -> None:
+        self._running = False
+        self._thread.join(timeout=5)
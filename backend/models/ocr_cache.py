@@ -0,0 +1,163 @@
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def encode_page_ocr(bounding_boxes: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """Pack ``[{'text', 'confidence', 'box'}]`` into flat arrays.
+
+    quads (n, 4, 2) float32, confidences (n,) float32, and all texts as one
+    UTF-8 buffer with (n + 1,) int32 offsets.
+    """
+    encoded_texts = [bb.get('text', '').encode('utf-8') for bb in bounding_boxes]
+    offsets = np.zeros(len(encoded_texts) + 1, dtype=np.int32)
+    if encoded_texts:
+        offsets[1:] = np.cumsum([len(t) for t in encoded_texts])
+    quads = np.zeros((len(bounding_boxes), 4, 2), dtype=np.float32)
+    for i, bb in enumerate(bounding_boxes):
+        box = bb.get('box') or []
+        if len(box) == 4:
+            quads[i] = np.asarray(box, dtype=np.float32).reshape(4, 2)
+    return {
+        "quads": quads,
+        "confidences": np.asarray([bb.get('confidence', 0.0) for bb in bounding_boxes], dtype=np.float32),
+        "text_offsets": offsets,
+        "text_data": np.frombuffer(b"".join(encoded_texts), dtype=np.uint8),
+    }
+
+
+def decode_page_ocr(arrays: Dict[str, np.ndarray]) -> List[Dict[str, Any]]:
+    """Inverse of ``encode_page_ocr``; boxes come back as the usual lists of [x, y] points."""
+    data = arrays["text_data"].tobytes()
+    offsets = arrays["text_offsets"].tolist()
+    quads = arrays["quads"].tolist()
+    # float32 on disk; round so values don't show float32 noise (0.93 -> 0.9300000071)
+    confidences = [round(c, 6) for c in arrays["confidences"].tolist()]
+    return [
+        {
+            'text': data[offsets[i]:offsets[i + 1]].decode('utf-8'),
+            'confidence': confidences[i],
+            'box': quads[i]
+        }
+        for i in range(len(confidences))
+    ]
+
+
+class OCRArtifactCache:
+    """On-disk cache of per-page OCR output keyed by the rendered image and the OCR settings.
+
+    Entries are ``.npz`` files (see ``encode_page_ocr``) sharded by key prefix
+    under ``OCR_CACHE_DIR``. A hit touches the file's mtime; when the directory
+    grows past ``OCR_CACHE_MAX_MB`` the least recently used files are removed.
+    """
+
+    def __init__(self, directory: str = None, max_mb: float = None):
+        self.directory = Path(directory or os.getenv("OCR_CACHE_DIR", "data/cache/ocr"))
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = int(float(max_mb if max_mb is not None else os.getenv("OCR_CACHE_MAX_MB", "1024")) * 1024 * 1024)
+        self._lock = threading.Lock()
+        self._bytes_since_prune = 0
+        self._stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0, "errors": 0, "hash_ms": 0.0}
+
+    def make_key(self, pixels: np.ndarray, settings: Dict[str, Any]) -> str:
+        """Hash of a rendered page's pixel array (shape, dtype, bytes) and the OCR settings."""
+        started = time.time()
+        digest = hashlib.sha256()
+        digest.update(json.dumps([list(pixels.shape), str(pixels.dtype), settings], sort_keys=True, default=str).encode("utf-8"))
+        digest.update(np.ascontiguousarray(pixels).data)
+        with self._lock:
+            self._stats["hash_ms"] += (time.time() - started) * 1000
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.npz"
+
+    def get(self, key: str) -> Optional[Tuple[List[Dict[str, Any]], float]]:
+        """``(bounding_boxes, preprocess_ratio)`` for a cached page, else None."""
+        path = self._path(key)
+        try:
+            with np.load(path) as npz:
+                arrays = {name: npz[name] for name in npz.files}
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self._stats["misses"] += 1
+            return None
+        except Exception as e:
+            logger.warning(f"Unreadable OCR cache entry {path}: {e}")
+            with self._lock:
+                self._stats["errors"] += 1
+                self._stats["misses"] += 1
+            return None
+        with self._lock:
+            self._stats["hits"] += 1
+        return decode_page_ocr(arrays), float(arrays["preprocess_ratio"])
+
+    def set(self, key: str, bounding_boxes: List[Dict[str, Any]], preprocess_ratio: float) -> None:
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            buffer = io.BytesIO()
+            np.savez(buffer, preprocess_ratio=np.float32(preprocess_ratio), **encode_page_ocr(bounding_boxes))
+            # Write-then-rename so concurrent readers never see a partial file
+            tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp_path.write_bytes(buffer.getvalue())
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"Could not write OCR cache entry: {e}")
+            with self._lock:
+                self._stats["errors"] += 1
+            return
+        with self._lock:
+            self._stats["writes"] += 1
+            self._bytes_since_prune += buffer.tell()
+            prune = self._bytes_since_prune > self.max_bytes // 20
+            if prune:
+                self._bytes_since_prune = 0
+        if prune:
+            self.prune()
+
+    def prune(self) -> int:
+        """Remove least recently used entries until the cache fits in ``max_bytes``."""
+        files = []
+        for path in self.directory.glob("*/*.npz"):
+            try:
+                stat = path.stat()
+                files.append((stat.st_mtime, stat.st_size, path))
+            except FileNotFoundError:
+                continue
+        total = sum(size for _, size, _ in files)
+        removed = 0
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+                total -= size
+                removed += 1
+            except FileNotFoundError:
+                continue
+        if removed:
+            with self._lock:
+                self._stats["evictions"] += removed
+        return removed
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        stats["avg_hash_ms"] = round(stats.pop("hash_ms") / lookups, 2) if lookups else 0.0
+        stats["directory"] = str(self.directory)
+        stats["max_mb"] = round(self.max_bytes / (1024 * 1024), 1)
+        return stats
@@ -16,6 +16,7 @@ from transformers import DonutProcessor, VisionEncoderDecoderModel
 import torch
 import json
 from .feedback_learning import FeedbackLearningSystem
+from .page_renderer import get_page_renderer
 import uuid
 import random
 
@@ -234,13 +235,8 @@ class OCRDocumentProcessor:
             # Get the first page
             page = pdf_document[0]
             
-            # Convert page to image
-            pix = page.get_pixmap()
-            
-            # Convert to numpy array
-            img = np.frombuffer(pix.samples, dtype=np.uint8).reshape(
-                pix.height, pix.width, pix.n
-            )
+            # Render at the zoom picked for this page, as a view of the pixmap
+            img = get_page_renderer().render(page, grayscale=False).array
             
             self.logger.info("Successfully converted PDF using PyMuPDF")
             return img
@@ -1059,8 +1055,7 @@ class OCRDocumentProcessor:
                     # Handle PDF files
                     pdf_document = fitz.open(image)
                     page = pdf_document[0]
-                    pix = page.get_pixmap(matrix=fitz.Matrix(2.0, 2.0))  # 2x resolution
-                    image = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+                    image = get_page_renderer().render(page, grayscale=False).image()
                 else:
                     # Handle image files
                     image = Image.open(image)
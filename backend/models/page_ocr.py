@@ -0,0 +1,73 @@
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional, Callable
+
+import numpy as np
+from PIL import Image
+
+
+@dataclass
+class PageOCR:
+    """OCR output for one page, computed once and shared by every downstream stage.
+
+    ``bounding_boxes`` use the same ``{'text', 'confidence', 'box'}`` dicts that
+    process_image returns; ``box`` is a quad in ``image_array`` pixel space.
+    ``scale`` is pixels per PDF point (1.0 for plain images), so spatial
+    tolerances tuned at 72 dpi can be scaled to this page.
+
+    ``source`` is "ocr", "text_layer" (spans from a born-digital PDF page) or
+    "error". Text-layer pages are never rasterised up front; ``image_factory``
+    renders them on demand for stages that genuinely need pixels. ``preprocess``
+    holds the scale and per-stage timings of the page's image preprocessing.
+    """
+    image: Optional[Image.Image]
+    image_array: Optional[np.ndarray]
+    text: str
+    bounding_boxes: List[Dict[str, Any]]
+    page_number: int = 1
+    scale: float = 1.0
+    source: str = "ocr"
+    image_factory: Optional[Callable[[], Image.Image]] = field(default=None, repr=False)
+    preprocess: Dict[str, Any] = field(default_factory=dict)
+    _text_blocks: Optional[List[Dict[str, Any]]] = field(default=None, init=False, repr=False)
+
+    def get_image(self) -> Optional[Image.Image]:
+        """Page image, rendering it lazily for text-layer pages."""
+        if self.image is None and self.image_factory is not None:
+            self.image = self.image_factory()
+            self.image_factory = None
+        return self.image
+
+    @property
+    def text_blocks(self) -> List[Dict[str, Any]]:
+        """Bounding boxes with centers, in the shape used by table grouping."""
+        if self._text_blocks is None:
+            blocks = []
+            for bb in self.bounding_boxes:
+                box = bb.get('box')
+                if not box or len(box) < 3:
+                    continue
+                blocks.append({
+                    'text': bb.get('text', '').strip(),
+                    'bbox': box,
+                    'confidence': bb.get('confidence', 1.0),
+                    'center_x': (box[0][0] + box[2][0]) / 2,
+                    'center_y': (box[0][1] + box[2][1]) / 2
+                })
+            self._text_blocks = blocks
+        return self._text_blocks
+
+    @property
+    def lines(self) -> List[str]:
+        return [line for line in self.text.split("\n") if line.strip()]
+
+    @property
+    def header_text(self) -> str:
+        """First recognised line, used when the page has no native text blocks."""
+        lines = self.lines
+        return lines[0] if lines else ""
+
+    @property
+    def footer_text(self) -> str:
+        """Last recognised line, used when the page has no native text blocks."""
+        lines = self.lines
+        return lines[-1] if lines else ""
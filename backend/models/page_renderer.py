@@ -0,0 +1,234 @@
+import logging
+import math
+import os
+import statistics
+import threading
+from dataclasses import dataclass
+from typing import Dict, Any, Optional, Sequence, Union
+
+import fitz  # PyMuPDF
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# get_text("dict") without TEXT_PRESERVE_IMAGES: span sizes only, no copies of embedded image bytes
+TEXT_DICT_FLAGS = fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES
+
+ClipRect = Union[fitz.Rect, Sequence[float]]
+
+
+class _PixmapArray:
+    """Exposes a pixmap's sample buffer through the numpy array interface.
+
+    The resulting array is a view of MuPDF's memory and holds a reference to
+    the pixmap, so the buffer lives exactly as long as the array does.
+    """
+
+    def __init__(self, pix: fitz.Pixmap):
+        self.pixmap = pix
+        shape = (pix.height, pix.width) if pix.n == 1 else (pix.height, pix.width, pix.n)
+        strides = (pix.stride, 1) if pix.n == 1 else (pix.stride, pix.n, 1)
+        self.__array_interface__ = {
+            "version": 3,
+            "shape": shape,
+            "strides": strides,
+            "typestr": "|u1",
+            "data": (pix.samples_ptr, True),
+        }
+
+
+def pixmap_to_array(pix: fitz.Pixmap) -> np.ndarray:
+    """Read-only ``(h, w)`` or ``(h, w, n)`` uint8 view of a pixmap's samples, without copying."""
+    if getattr(pix, "samples_ptr", None):
+        return np.asarray(_PixmapArray(pix))
+    # Older PyMuPDF: one copy into ``samples`` bytes, viewed as-is
+    array = np.frombuffer(pix.samples, dtype=np.uint8)
+    array = np.lib.stride_tricks.as_strided(array, shape=(pix.height, pix.width, pix.n),
+                                            strides=(pix.stride, pix.n, 1))
+    return array[..., 0] if pix.n == 1 else array
+
+
+@dataclass
+class RenderedPage:
+    """One rendered page (or clipped region of a page).
+
+    ``array`` is a read-only view of the pixmap samples: ``(h, w)`` for
+    grayscale, ``(h, w, 3)`` for RGB. ``zoom`` is pixels per PDF point and
+    ``clip`` the rendered region in page coordinates (None for the full page).
+    """
+    array: np.ndarray
+    zoom: float
+    clip: Optional[fitz.Rect] = None
+
+    @property
+    def grayscale(self) -> bool:
+        return self.array.ndim == 2
+
+    @property
+    def width(self) -> int:
+        return self.array.shape[1]
+
+    @property
+    def height(self) -> int:
+        return self.array.shape[0]
+
+    def image(self, mode: Optional[str] = None) -> Image.Image:
+        """PIL image of the render ('L' or 'RGB'), converted to ``mode`` if given."""
+        image = Image.fromarray(self.array, "L" if self.grayscale else "RGB")
+        return image.convert(mode) if mode and image.mode != mode else image
+
+
+class PageRenderer:
+    """Rasterises PDF pages for OCR at a zoom chosen per page.
+
+    With ``zoom="auto"`` the zoom comes from the page itself:
+
+    - pages with a text layer: ``target_font_px`` pixels per em of the median
+      span font size, so small print gets more pixels and large print fewer;
+    - scanned pages: the resolution of the embedded scan, never above
+      ``default_zoom`` (upsampling a scan adds no detail);
+    - anything else: ``default_zoom``.
+
+    The result is clamped to ``[min_zoom, max_zoom]`` and to a ``max_pixels``
+    budget for the rendered area. Pages are rendered grayscale unless colour is
+    asked for; OCR preprocessing starts from gray anyway.
+    """
+
+    def __init__(self, zoom: Union[str, float, None] = None, default_zoom: float = None,
+                 min_zoom: float = None, max_zoom: float = None, target_font_px: float = None,
+                 max_pixels: int = None, grayscale: Optional[bool] = None):
+        zoom = str(zoom if zoom is not None else os.getenv("PDF_RENDER_ZOOM", "auto")).lower()
+        self.fixed_zoom: Optional[float] = None if zoom == "auto" else float(zoom)
+        self.default_zoom = float(default_zoom or os.getenv("PDF_RENDER_DEFAULT_ZOOM", "2"))
+        self.min_zoom = float(min_zoom or os.getenv("PDF_RENDER_MIN_ZOOM", "1"))
+        self.max_zoom = float(max_zoom or os.getenv("PDF_RENDER_MAX_ZOOM", "4"))
+        self.target_font_px = float(target_font_px or os.getenv("PDF_RENDER_TARGET_FONT_PX", "24"))
+        self.max_pixels = int(max_pixels or os.getenv("PDF_RENDER_MAX_PIXELS", "16000000"))
+        if grayscale is None:
+            grayscale = os.getenv("PDF_RENDER_GRAYSCALE", "true").lower() in ["1", "true", "yes"]
+        self.grayscale = grayscale
+
+        self._stats_lock = threading.Lock()
+        self._stats = {"pages": 0, "grayscale_pages": 0, "clipped_pages": 0, "pixels": 0, "zoom_sum": 0.0}
+        self._zoom_sources: Dict[str, int] = {}
+
+    def settings(self) -> Dict[str, Any]:
+        return {"zoom": self.fixed_zoom or "auto", "default_zoom": self.default_zoom, "min_zoom": self.min_zoom,
+                "max_zoom": self.max_zoom, "target_font_px": self.target_font_px,
+                "max_pixels": self.max_pixels, "grayscale": self.grayscale}
+
+    @staticmethod
+    def text_dict(page) -> Dict[str, Any]:
+        """``page.get_text("dict")`` without embedded image data."""
+        return page.get_text("dict", flags=TEXT_DICT_FLAGS)
+
+    @staticmethod
+    def median_font_size(page_dict: Dict[str, Any]) -> Optional[float]:
+        """Median font size (points) over the characters of a text dict, or None without text."""
+        sizes = []
+        for block in page_dict.get("blocks", []):
+            for line in block.get("lines", []):
+                for span in line.get("spans", []):
+                    chars = len(span.get("text", "").strip())
+                    if chars and span.get("size", 0) > 0:
+                        sizes.extend([span["size"]] * min(chars, 64))
+        return statistics.median(sizes) if sizes else None
+
+    @staticmethod
+    def native_image_zoom(page) -> Optional[float]:
+        """Pixels per point of the largest image drawn on the page (a scan's own resolution)."""
+        try:
+            infos = page.get_image_info()
+        except Exception:
+            return None
+        best, best_area = None, 0.0
+        for info in infos:
+            x0, y0, x1, y1 = info.get("bbox", (0, 0, 0, 0))
+            area = abs(x1 - x0) * abs(y1 - y0)
+            if area > best_area and info.get("width") and info.get("height"):
+                # Area ratio, so rotated placements measure the same
+                best = math.sqrt(info["width"] * info["height"] / area)
+                best_area = area
+        # Small logos do not tell the resolution of the page
+        if best is None or best_area < 0.25 * abs(page.rect):
+            return None
+        return best
+
+    def choose_zoom(self, page, page_dict: Optional[Dict[str, Any]] = None,
+                    clip: Optional[fitz.Rect] = None) -> float:
+        """Zoom for rendering ``page`` (or ``clip`` of it); ``page_dict`` saves re-reading the text layer."""
+        return self._choose_zoom(page, page_dict, clip)[0]
+
+    def _choose_zoom(self, page, page_dict, clip):
+        if self.fixed_zoom is not None:
+            return self.fixed_zoom, "fixed"
+        zoom, source = self.default_zoom, "default"
+        try:
+            if page_dict is None:
+                page_dict = self.text_dict(page)
+            font_size = self.median_font_size(page_dict)
+            if font_size:
+                zoom, source = self.target_font_px / font_size, "font"
+            else:
+                native = self.native_image_zoom(page)
+                if native:
+                    zoom, source = min(self.default_zoom, native), "image"
+        except Exception as e:
+            logger.debug(f"Zoom detection failed for page {page.number + 1}: {e}")
+        zoom = min(max(zoom, self.min_zoom), self.max_zoom)
+
+        area = abs(clip if clip is not None else page.rect)
+        if area > 0:
+            zoom = min(zoom, math.sqrt(self.max_pixels / area))
+        return zoom, source
+
+    def render(self, page, zoom: Optional[float] = None, clip: Optional[ClipRect] = None,
+               grayscale: Optional[bool] = None, page_dict: Optional[Dict[str, Any]] = None) -> RenderedPage:
+        """Render ``page``, or just ``clip`` (page coordinates) of it, e.g. to re-OCR a region.
+
+        ``zoom`` defaults to ``choose_zoom``; the caller must hold whatever lock
+        guards the document.
+        """
+        clip = fitz.Rect(clip) & page.rect if clip is not None else None
+        source = "explicit"
+        if zoom is None:
+            zoom, source = self._choose_zoom(page, page_dict, clip)
+        grayscale = self.grayscale if grayscale is None else grayscale
+        pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), clip=clip,
+                              colorspace=fitz.csGRAY if grayscale else fitz.csRGB, alpha=False)
+        rendered = RenderedPage(array=pixmap_to_array(pix), zoom=zoom, clip=clip)
+
+        with self._stats_lock:
+            self._stats["pages"] += 1
+            self._stats["grayscale_pages"] += int(grayscale)
+            self._stats["clipped_pages"] += int(clip is not None)
+            self._stats["pixels"] += pix.width * pix.height
+            self._stats["zoom_sum"] += zoom
+            self._zoom_sources[source] = self._zoom_sources.get(source, 0) + 1
+        return rendered
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+            stats["zoom_sources"] = dict(self._zoom_sources)
+        zoom_sum, pages = stats.pop("zoom_sum"), stats["pages"]
+        stats["avg_zoom"] = round(zoom_sum / pages, 3) if pages else None
+        stats["avg_megapixels"] = round(stats["pixels"] / pages / 1e6, 2) if pages else None
+        stats.update(self.settings())
+        return stats
+
+
+_renderer: Optional[PageRenderer] = None
+_renderer_lock = threading.Lock()
+
+
+def get_page_renderer() -> PageRenderer:
+    """Process-wide renderer configured from the PDF_RENDER_* environment."""
+    global _renderer
+    if _renderer is None:
+        with _renderer_lock:
+            if _renderer is None:
+                _renderer = PageRenderer()
+                logger.info(f"PDF page renderer: {_renderer.settings()}")
+    return _renderer
@@ -0,0 +1,276 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def _json_default(value: Any):
+    """Keep numbers numbers when results carry numpy scalars/arrays."""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return str(value)
+
+
+def make_cache_key(content: bytes, model_version: str, config: Dict[str, Any]) -> str:
+    """SHA-256 of the document bytes, the model version and the pipeline config."""
+    digest = hashlib.sha256(content).hexdigest()
+    config_digest = hashlib.sha256(json.dumps(config, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+    model_digest = hashlib.sha256(model_version.encode("utf-8")).hexdigest()[:16]
+    return f"{digest}:{model_digest}:{config_digest}"
+
+
+class _SQLiteTier:
+    """On-disk tier: one row per result, evicted by TTL and by total size (least recently used first)."""
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS result_cache (
+                cache_key TEXT PRIMARY KEY,
+                model_version TEXT NOT NULL,
+                payload BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_result_cache_access ON result_cache(last_access)")
+
+    def get(self, key: str, now: float) -> Tuple[Optional[bytes], bool]:
+        """Payload (or None) and whether an expired row was dropped."""
+        with self._lock:
+            row = self._conn.execute("SELECT payload, expires_at FROM result_cache WHERE cache_key = ?", (key,)).fetchone()
+            if row is None:
+                return None, False
+            if row[1] <= now:
+                self._conn.execute("DELETE FROM result_cache WHERE cache_key = ?", (key,))
+                return None, True
+            self._conn.execute("UPDATE result_cache SET last_access = ? WHERE cache_key = ?", (now, key))
+            return bytes(row[0]), False
+
+    def set(self, key: str, model_version: str, payload: bytes, expires_at: float, now: float) -> int:
+        """Store a payload; returns the number of rows evicted to stay under ``max_bytes``."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO result_cache VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model_version, payload, len(payload), expires_at, now)
+            )
+            evicted = self._conn.execute("DELETE FROM result_cache WHERE expires_at <= ?", (now,)).rowcount
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM result_cache").fetchone()[0]
+            while total > self.max_bytes:
+                row = self._conn.execute("SELECT cache_key, size FROM result_cache ORDER BY last_access LIMIT 1").fetchone()
+                if row is None or row[0] == key:
+                    break
+                self._conn.execute("DELETE FROM result_cache WHERE cache_key = ?", (row[0],))
+                total -= row[1]
+                evicted += 1
+            return evicted
+
+    def invalidate(self, keep_model_version: Optional[str]) -> int:
+        with self._lock:
+            if keep_model_version is None:
+                return self._conn.execute("DELETE FROM result_cache").rowcount
+            return self._conn.execute("DELETE FROM result_cache WHERE model_version != ?", (keep_model_version,)).rowcount
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            count, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM result_cache").fetchone()
+        return {"backend": "sqlite", "path": str(self.path), "entries": count,
+                "size_mb": round(size / (1024 * 1024), 2), "max_mb": round(self.max_bytes / (1024 * 1024), 1)}
+
+
+class _RedisTier:
+    """Redis tier: TTL via EX, size bounded by the server's maxmemory policy."""
+
+    def __init__(self, url: str, prefix: str = "neovision:result:"):
+        import redis  # optional dependency
+
+        self._client = redis.Redis.from_url(url)
+        self._prefix = prefix
+
+    def get(self, key: str, now: float) -> Tuple[Optional[bytes], bool]:
+        return self._client.get(self._prefix + key), False
+
+    def set(self, key: str, model_version: str, payload: bytes, expires_at: float, now: float) -> int:
+        self._client.set(self._prefix + key, payload, ex=max(1, int(expires_at - now)))
+        return 0
+
+    def invalidate(self, keep_model_version: Optional[str]) -> int:
+        # Keys embed a model digest, so entries of other versions are unreachable anyway;
+        # only a full clear has to touch Redis
+        if keep_model_version is not None:
+            return 0
+        removed = 0
+        for redis_key in self._client.scan_iter(match=self._prefix + "*", count=500):
+            removed += self._client.delete(redis_key)
+        return removed
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"backend": "redis"}
+
+
+class ResultCache:
+    """Two-tier cache of full document results keyed by content, model version and config.
+
+    Tier 1 is an in-process LRU of serialized results; tier 2 is SQLite (default)
+    or Redis, shared by all workers on the node. Entries expire after
+    ``RESULT_CACHE_TTL_SECONDS``; a change of model version drops the entries of
+    older versions.
+    """
+
+    def __init__(self, memory_entries: int = None, ttl_seconds: float = None, backend: str = None):
+        self.memory_entries = max(0, int(memory_entries if memory_entries is not None else os.getenv("RESULT_CACHE_MEMORY_ENTRIES", "128")))
+        self.ttl = float(ttl_seconds if ttl_seconds is not None else os.getenv("RESULT_CACHE_TTL_SECONDS", "86400"))
+        backend = (backend or os.getenv("RESULT_CACHE_BACKEND", "sqlite")).lower()
+
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, Tuple[bytes, float]]" = OrderedDict()
+        self._model_version: Optional[str] = None
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "sets": 0,
+                          "evictions": 0, "expirations": 0, "invalidations": 0, "errors": 0}
+
+        self._disk = None
+        try:
+            if backend == "redis":
+                self._disk = _RedisTier(os.getenv("REDIS_URL", "redis://localhost:6379"))
+            elif backend == "sqlite":
+                self._disk = _SQLiteTier(
+                    os.getenv("RESULT_CACHE_PATH", "data/cache/results.sqlite"),
+                    int(float(os.getenv("RESULT_CACHE_DISK_MAX_MB", "512")) * 1024 * 1024)
+                )
+        except Exception as e:
+            logger.warning(f"Result cache {backend} tier unavailable, memory only: {e}")
+        logger.info(f"Result cache: memory_entries={self.memory_entries}, ttl={self.ttl:.0f}s, disk={backend if self._disk else 'off'}")
+
+    def _count(self, name: str, n: int = 1):
+        with self._lock:
+            self._counters[name] += n
+
+    def observe_model_version(self, model_version: str) -> None:
+        """Drop entries of other model versions the first time a new version is seen."""
+        with self._lock:
+            previous = self._model_version
+            self._model_version = model_version
+        if previous is not None and previous != model_version:
+            logger.info("Model version changed; invalidating cached results")
+            self.invalidate(keep_model_version=model_version)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._memory.move_to_end(key)
+                    self._counters["memory_hits"] += 1
+                    return json.loads(entry[0])
+                del self._memory[key]
+                self._counters["expirations"] += 1
+
+        if self._disk is not None:
+            try:
+                payload, expired = self._disk.get(key, now)
+            except Exception as e:
+                logger.warning(f"Result cache read failed: {e}")
+                self._count("errors")
+                payload, expired = None, False
+            if expired:
+                self._count("expirations")
+            if payload is not None:
+                self._count("disk_hits")
+                self._remember(key, payload, now + self.ttl)
+                return json.loads(payload)
+
+        self._count("misses")
+        return None
+
+    def set(self, key: str, result: Dict[str, Any], model_version: str = "") -> None:
+        now = time.time()
+        try:
+            payload = json.dumps(result, default=_json_default).encode("utf-8")
+        except Exception as e:
+            logger.warning(f"Result not cacheable: {e}")
+            self._count("errors")
+            return
+        self._remember(key, payload, now + self.ttl)
+        self._count("sets")
+        if self._disk is not None:
+            try:
+                self._count("evictions", self._disk.set(key, model_version, payload, now + self.ttl, now))
+            except Exception as e:
+                logger.warning(f"Result cache write failed: {e}")
+                self._count("errors")
+
+    def _remember(self, key: str, payload: bytes, expires_at: float) -> None:
+        if not self.memory_entries:
+            return
+        with self._lock:
+            self._memory[key] = (payload, expires_at)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def invalidate(self, keep_model_version: Optional[str] = None) -> int:
+        """Drop everything (or everything not produced by ``keep_model_version``)."""
+        with self._lock:
+            removed = len(self._memory)
+            self._memory.clear()
+            self._counters["invalidations"] += 1
+        if self._disk is not None:
+            try:
+                removed += self._disk.invalidate(keep_model_version)
+            except Exception as e:
+                logger.warning(f"Result cache invalidation failed: {e}")
+        return removed
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+            memory_size = len(self._memory)
+        lookups = counters["memory_hits"] + counters["disk_hits"] + counters["misses"]
+        stats = {
+            **counters,
+            "hit_rate": round((counters["memory_hits"] + counters["disk_hits"]) / lookups, 4) if lookups else 0.0,
+            "memory_entries": memory_size,
+            "memory_max_entries": self.memory_entries,
+            "ttl_seconds": self.ttl
+        }
+        if self._disk is not None:
+            try:
+                stats["disk"] = self._disk.get_stats()
+            except Exception:
+                pass
+        return stats
+
+
+_result_cache: Optional[ResultCache] = None
+_result_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> Optional[ResultCache]:
+    """Process-wide result cache, or None when RESULT_CACHE=false."""
+    global _result_cache
+    if os.getenv("RESULT_CACHE", "true").lower() not in ["1", "true", "yes"]:
+        return None
+    with _result_cache_lock:
+        if _result_cache is None:
+            _result_cache = ResultCache()
+        return _result_cache
@@ -6,6 +6,7 @@ import io
 import os
 import os as _os
 import numpy as np
+from models.page_renderer import get_page_renderer
 
 logger = logging.getLogger(__name__)
 
@@ -97,8 +98,7 @@ class SimpleDocumentProcessor:
                 try:
                     logger.info("No text spans found in PDF; falling back to OCR on rendered image")
                     # Render first page to image
-                    pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))  # 2x scale for better OCR
-                    img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+                    img = get_page_renderer().render(page, grayscale=False).image()
                     ocr_result = self._image_to_boxes_with_ocr(img)
                     doc.close()
                     return {
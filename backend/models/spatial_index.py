@@ -0,0 +1,105 @@
+import math
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+
+class BoxIndex:
+    """Region queries over a page's OCR boxes.
+
+    The quads are reduced once to an ``(n, 4)`` array of axis-aligned boxes
+    (x1, y1, x2, y2) plus centers, and bucketed into a uniform grid stored in
+    CSR form (row-major cells, so one grid row is one contiguous slice). A query
+    gathers the candidates of the covered cells and intersects them with the
+    region in one vectorised step.
+    """
+
+    # Below this many boxes a vectorised scan beats the grid bookkeeping
+    MIN_GRID_BOXES = 256
+
+    def __init__(self, bounding_boxes: List[Dict[str, Any]]):
+        entries = [bb for bb in bounding_boxes
+                   if isinstance(bb, dict) and isinstance(bb.get("box"), list) and bb.get("box")]
+        try:
+            # Fast path: every box is a 4-point quad (PaddleOCR and PDF text layer output)
+            quads = np.asarray([bb["box"] for bb in entries], dtype=np.float64).reshape(len(entries), 4, 2)
+            aabbs = np.concatenate([quads.min(axis=1), quads.max(axis=1)], axis=1)
+            centers = quads.mean(axis=1)
+            texts = [str(bb.get("text", "")) for bb in entries]
+        except (TypeError, ValueError):
+            aabbs, centers, texts = [], [], []
+            for bb in entries:
+                try:
+                    points = np.asarray(bb["box"], dtype=np.float64).reshape(-1, 2)
+                except (TypeError, ValueError):
+                    continue
+                aabbs.append((points[:, 0].min(), points[:, 1].min(), points[:, 0].max(), points[:, 1].max()))
+                centers.append(points.mean(axis=0))
+                texts.append(str(bb.get("text", "")))
+
+        self.texts = texts
+        self.boxes = np.asarray(aabbs, dtype=np.float64).reshape(-1, 4)
+        self.centers = np.asarray(centers, dtype=np.float64).reshape(-1, 2)
+        self.max_x: Optional[float] = float(self.boxes[:, 2].max()) if len(texts) else None
+        self.max_y: Optional[float] = float(self.boxes[:, 3].max()) if len(texts) else None
+        self._build_grid()
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def _build_grid(self) -> None:
+        n = len(self.texts)
+        self.grid = None
+        if n < self.MIN_GRID_BOXES:
+            return
+        # ~2 boxes per cell
+        cells_per_axis = max(1, min(256, int(math.ceil(math.sqrt(n / 2.0)))))
+        self.origin_x, self.origin_y = float(self.boxes[:, 0].min()), float(self.boxes[:, 1].min())
+        self.cell_w = max(1e-6, (self.max_x - self.origin_x) / cells_per_axis)
+        self.cell_h = max(1e-6, (self.max_y - self.origin_y) / cells_per_axis)
+        self.grid_w = self.grid_h = cells_per_axis
+
+        x0, y0, x1, y1 = self._cell_range(self.boxes[:, 0], self.boxes[:, 1], self.boxes[:, 2], self.boxes[:, 3])
+        spans_x, spans_y = x1 - x0 + 1, y1 - y0 + 1
+        counts = spans_x * spans_y
+        box_ids = np.repeat(np.arange(n), counts)
+        k = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        rep_spans_x = np.repeat(spans_x, counts)
+        cells = (np.repeat(y0, counts) + k // rep_spans_x) * self.grid_w + np.repeat(x0, counts) + k % rep_spans_x
+
+        order = np.argsort(cells, kind="stable")
+        self.cell_items = box_ids[order]
+        self.cell_starts = np.searchsorted(cells[order], np.arange(self.grid_w * self.grid_h + 1))
+        self.grid = True
+
+    def _cell_range(self, x1, y1, x2, y2):
+        clip = lambda v, size: np.clip(v, 0, size - 1).astype(np.int64)
+        return (clip(np.floor((np.asarray(x1) - self.origin_x) / self.cell_w), self.grid_w),
+                clip(np.floor((np.asarray(y1) - self.origin_y) / self.cell_h), self.grid_h),
+                clip(np.floor((np.asarray(x2) - self.origin_x) / self.cell_w), self.grid_w),
+                clip(np.floor((np.asarray(y2) - self.origin_y) / self.cell_h), self.grid_h))
+
+    def _candidates(self, x1: float, y1: float, x2: float, y2: float) -> Optional[np.ndarray]:
+        """Box ids from the grid cells under the region, or None to scan everything."""
+        if self.grid is None or x2 < self.origin_x or y2 < self.origin_y or x1 > self.max_x or y1 > self.max_y:
+            return None
+        cx0, cy0, cx1, cy1 = (int(v) for v in self._cell_range(x1, y1, x2, y2))
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) * 2 > self.grid_w * self.grid_h:
+            return None
+        rows = [self.cell_items[self.cell_starts[row * self.grid_w + cx0]:self.cell_starts[row * self.grid_w + cx1 + 1]]
+                for row in range(cy0, cy1 + 1)]
+        return np.unique(np.concatenate(rows)) if rows else np.empty(0, dtype=np.int64)
+
+    def query(self, x1: float, y1: float, x2: float, y2: float) -> np.ndarray:
+        """Ids of boxes overlapping the rectangle, in reading order (top-to-bottom, left-to-right by center)."""
+        if not len(self.texts):
+            return np.empty(0, dtype=np.int64)
+        ids = self._candidates(x1, y1, x2, y2)
+        boxes = self.boxes if ids is None else self.boxes[ids]
+        hit = (np.minimum(boxes[:, 2], x2) > np.maximum(boxes[:, 0], x1)) & \
+              (np.minimum(boxes[:, 3], y2) > np.maximum(boxes[:, 1], y1))
+        hits = np.flatnonzero(hit) if ids is None else ids[hit]
+        if len(hits) > 1:
+            hits = hits[np.lexsort((self.centers[hits, 0], self.centers[hits, 1]))]
+        return hits
+
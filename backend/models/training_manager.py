@@ -92,8 +92,13 @@ class TrainingManager:
         self.model_dir.mkdir(parents=True, exist_ok=True)
         
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        # Default processor (English)
-        self.processor = LayoutLMv3Processor.from_pretrained("microsoft/layoutlmv3-base", apply_ocr=False)
+        # Default processor (English), shared with inference through the model registry
+        from models.model_registry import registry
+        self.processor = registry.acquire(
+            "layoutlmv3-processor", "microsoft/layoutlmv3-base",
+            lambda: LayoutLMv3Processor.from_pretrained("microsoft/layoutlmv3-base", apply_ocr=False),
+            precision="-"
+        )
         self.training_status = {}
         
     def train_model(
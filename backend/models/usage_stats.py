@@ -0,0 +1,328 @@
+"""
+Per-organization usage counters.
+
+Totals live in ``organization_usage`` and monthly activity in
+``organization_monthly_usage``. Mapper listeners update both on the flush
+connection, so the counters commit (or roll back) with the write that moved
+them: users, API keys and documents on insert/delete/re-parenting, documents
+and processing jobs on their transition to completed/failed. Monthly
+``documents_completed`` counts documents that are completed now, by the month
+of ``Document.completed_at``; un-completing or deleting a document takes it
+back out of that month, so incremental counts and ``backfill`` agree. Bulk
+``query.update()``/``delete()`` bypass the listeners; run ``backfill`` after
+such maintenance (scripts/backfill_usage.py).
+
+Counters are only incremented for organizations that already have a totals
+row (created with the organization or by ``backfill``); ``get_usage``
+backfills an organization on first read, so pre-existing data is counted once.
+"""
+
+import logging
+from datetime import date, datetime
+from typing import Dict, Any, Iterable, List, Optional
+
+from sqlalchemy import and_, delete, event, func, insert, inspect as sa_inspect, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models.database import (
+    Organization, User, ApiKey, Document, ProcessingJob,
+    OrganizationUsage, OrganizationMonthlyUsage,
+)
+
+logger = logging.getLogger(__name__)
+
+TOTAL_COUNTERS = ("users", "documents", "documents_completed", "api_keys", "jobs_completed", "jobs_failed")
+MONTHLY_COUNTERS = ("documents", "documents_completed", "jobs_completed", "jobs_failed")
+
+_usage = OrganizationUsage.__table__
+_monthly = OrganizationMonthlyUsage.__table__
+
+
+def month_start(when: Optional[datetime] = None) -> date:
+    when = when or datetime.utcnow()
+    return date(when.year, when.month, 1)
+
+
+# ---------------------------------------------------------------------------
+# Incremental updates (run inside the flush of the writing transaction)
+# ---------------------------------------------------------------------------
+
+def apply_deltas(connection, organization_id, totals: Dict[str, int],
+                 monthly: Optional[Dict[date, Dict[str, int]]] = None) -> None:
+    """Add ``totals`` to the organization's row and ``monthly`` to its month rows."""
+    totals = {name: n for name, n in totals.items() if n}
+    if organization_id is None or not (totals or monthly):
+        return
+    values = {name: _usage.c[name] + n for name, n in totals.items()}
+    values["updated_at"] = datetime.utcnow()
+    result = connection.execute(update(_usage).where(_usage.c.organization_id == organization_id).values(values))
+    if result.rowcount == 0:
+        # Not counted yet; the first get_usage/backfill counts this write from the base tables
+        return
+    for month, deltas in (monthly or {}).items():
+        deltas = {name: n for name, n in deltas.items() if n}
+        if deltas:
+            _upsert_month(connection, organization_id, month, deltas)
+
+
+def _upsert_month(connection, organization_id, month: date, deltas: Dict[str, int]) -> None:
+    dialect = connection.dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        dialect_insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        stmt = dialect_insert(_monthly).values(
+            organization_id=organization_id, month=month,
+            **{name: deltas.get(name, 0) for name in MONTHLY_COUNTERS}
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[_monthly.c.organization_id, _monthly.c.month],
+            set_={name: _monthly.c[name] + n for name, n in deltas.items()}
+        )
+        connection.execute(stmt)
+        return
+    key = and_(_monthly.c.organization_id == organization_id, _monthly.c.month == month)
+    result = connection.execute(update(_monthly).where(key).values({name: _monthly.c[name] + n for name, n in deltas.items()}))
+    if result.rowcount == 0:
+        connection.execute(insert(_monthly).values(organization_id=organization_id, month=month,
+                                                    **{name: deltas.get(name, 0) for name in MONTHLY_COUNTERS}))
+
+
+def _history(target, attr: str):
+    """(old, new) of a column in the current flush; old == new when unchanged."""
+    hist = sa_inspect(target).attrs[attr].history
+    if not hist.has_changes():
+        value = getattr(target, attr)
+        return value, value
+    return (hist.deleted[0] if hist.deleted else None), (hist.added[0] if hist.added else None)
+
+
+def _track_previous_value(attribute) -> None:
+    """Load the stored value before an assignment, so the flush sees old -> new even for expired rows."""
+    event.listen(attribute, "set", lambda target, value, oldvalue, initiator: value,
+                 active_history=True, retval=True)
+
+
+for _attribute in (User.organization_id, ApiKey.organization_id, Document.organization_id,
+                   Document.status, Document.completed_at, ProcessingJob.status):
+    _track_previous_value(_attribute)
+
+
+@event.listens_for(Organization, "after_insert")
+def _organization_created(mapper, connection, target):
+    connection.execute(insert(_usage).values(organization_id=target.id, updated_at=datetime.utcnow(),
+                                             **dict.fromkeys(TOTAL_COUNTERS, 0)))
+
+
+@event.listens_for(Organization, "before_delete")
+def _organization_deleted(mapper, connection, target):
+    connection.execute(delete(_monthly).where(_monthly.c.organization_id == target.id))
+    connection.execute(delete(_usage).where(_usage.c.organization_id == target.id))
+
+
+def _member_listeners(model, counter: str) -> None:
+    """users / api_keys: +1 on insert, -1 on delete, moved on re-parenting."""
+
+    @event.listens_for(model, "after_insert")
+    def _created(mapper, connection, target):
+        apply_deltas(connection, target.organization_id, {counter: 1})
+
+    @event.listens_for(model, "after_delete")
+    def _deleted(mapper, connection, target):
+        apply_deltas(connection, target.organization_id, {counter: -1})
+
+    @event.listens_for(model, "after_update")
+    def _updated(mapper, connection, target):
+        old_org, new_org = _history(target, "organization_id")
+        if old_org != new_org:
+            apply_deltas(connection, old_org, {counter: -1})
+            apply_deltas(connection, new_org, {counter: 1})
+
+
+_member_listeners(User, "users")
+_member_listeners(ApiKey, "api_keys")
+
+
+@event.listens_for(Document, "before_insert")
+@event.listens_for(Document, "before_update")
+def _stamp_completion(mapper, connection, target):
+    """completed_at is the time of the latest transition to completed, None while not completed."""
+    old_status, new_status = _history(target, "status")
+    if new_status != "completed":
+        if target.completed_at is not None:
+            target.completed_at = None
+    elif old_status != new_status or target.completed_at is None:
+        target.completed_at = datetime.utcnow()
+
+
+def _document_counts(target, organization_id, status, completed_at):
+    """The row's contribution to its organization: (organization_id, totals, monthly)."""
+    completed = int(status == "completed")
+    monthly = {month_start(target.created_at): {"documents": 1}}
+    if completed:
+        monthly.setdefault(month_start(completed_at), {})["documents_completed"] = 1
+    return organization_id, {"documents": 1, "documents_completed": completed}, monthly
+
+
+def _negated(counts):
+    organization_id, totals, monthly = counts
+    return (organization_id, {name: -n for name, n in totals.items()},
+            {month: {name: -n for name, n in deltas.items()} for month, deltas in monthly.items()})
+
+
+@event.listens_for(Document, "after_insert")
+def _document_created(mapper, connection, target):
+    apply_deltas(connection, *_document_counts(target, target.organization_id, target.status, target.completed_at))
+
+
+@event.listens_for(Document, "after_delete")
+def _document_deleted(mapper, connection, target):
+    # Counts only what exists, like a COUNT would: the month of creation and of completion both shrink
+    apply_deltas(connection, *_negated(_document_counts(target, target.organization_id, target.status,
+                                                        target.completed_at)))
+
+
+@event.listens_for(Document, "after_update")
+def _document_updated(mapper, connection, target):
+    before, after = (
+        _document_counts(target, *values) for values in zip(_history(target, "organization_id"),
+                                                            _history(target, "status"),
+                                                            _history(target, "completed_at"))
+    )
+    if before != after:
+        # Un-completing takes the completion back out of its month, so the counters match backfill
+        apply_deltas(connection, *_negated(before))
+        apply_deltas(connection, *after)
+
+
+@event.listens_for(ProcessingJob, "after_update")
+def _job_updated(mapper, connection, target):
+    old_status, new_status = _history(target, "status")
+    if old_status == new_status or new_status not in ("completed", "failed"):
+        return
+    counter = "jobs_completed" if new_status == "completed" else "jobs_failed"
+    apply_deltas(connection, target.organization_id, {counter: 1},
+                 {month_start(target.completed_at): {counter: 1}})
+
+
+# ---------------------------------------------------------------------------
+# Reads
+# ---------------------------------------------------------------------------
+
+def get_usage(db, organization_id, now: Optional[datetime] = None) -> Dict[str, Any]:
+    """Totals plus this month's activity in one query; backfills organizations not counted yet."""
+    month = month_start(now)
+    query = (
+        select(_usage, *[_monthly.c[name].label(f"monthly_{name}") for name in MONTHLY_COUNTERS])
+        .select_from(_usage.outerjoin(_monthly, and_(_monthly.c.organization_id == _usage.c.organization_id,
+                                                     _monthly.c.month == month)))
+        .where(_usage.c.organization_id == organization_id)
+    )
+    row = db.execute(query).mappings().first()
+    if row is None:
+        backfill(db, [organization_id])
+        db.commit()
+        row = db.execute(query).mappings().first()
+    if row is None:
+        return {**dict.fromkeys(TOTAL_COUNTERS, 0), **{f"monthly_{name}": 0 for name in MONTHLY_COUNTERS}}
+    usage = {name: row[name] for name in TOTAL_COUNTERS}
+    usage.update({f"monthly_{name}": row[f"monthly_{name}"] or 0 for name in MONTHLY_COUNTERS})
+    usage["updated_at"] = row["updated_at"]
+    return usage
+
+
+# ---------------------------------------------------------------------------
+# Backfill / repair
+# ---------------------------------------------------------------------------
+
+def _month_expr(column, dialect: str):
+    if dialect == "postgresql":
+        return func.date_trunc("month", column)
+    if dialect == "sqlite":
+        return func.strftime("%Y-%m-01", column)
+    return func.date_format(column, "%Y-%m-01")  # MySQL/MariaDB
+
+
+def _as_month(value) -> date:
+    if isinstance(value, datetime):
+        return value.date().replace(day=1)
+    if isinstance(value, date):
+        return value.replace(day=1)
+    return date.fromisoformat(str(value)[:10])
+
+
+def backfill(db, organization_ids: Optional[Iterable[Any]] = None) -> int:
+    """Recompute the counters of ``organization_ids`` (default: all) from the base tables.
+
+    Replaces existing rows in the caller's transaction; returns the number of
+    organizations written. Each base table is read with one GROUP BY.
+    """
+    dialect = db.get_bind().dialect.name
+    org_ids: Optional[List[Any]] = list(organization_ids) if organization_ids is not None else None
+
+    def scoped(query, column):
+        return query.where(column.in_(org_ids)) if org_ids is not None else query
+
+    orgs = db.execute(scoped(select(Organization.id), Organization.id)).scalars().all()
+    totals = {org_id: dict.fromkeys(TOTAL_COUNTERS, 0) for org_id in orgs}
+    monthly: Dict[Any, Dict[date, Dict[str, int]]] = {}
+
+    def add_month(org_id, month_value, counter, n):
+        if org_id in totals and month_value is not None:
+            months = monthly.setdefault(org_id, {})
+            months.setdefault(_as_month(month_value), dict.fromkeys(MONTHLY_COUNTERS, 0))[counter] += n
+
+    for model, counter in ((User, "users"), (ApiKey, "api_keys")):
+        rows = db.execute(scoped(select(model.organization_id, func.count()).group_by(model.organization_id),
+                                 model.organization_id))
+        for org_id, n in rows:
+            if org_id in totals:
+                totals[org_id][counter] = n
+
+    created_month = _month_expr(Document.created_at, dialect)
+    rows = db.execute(scoped(
+        select(Document.organization_id, created_month, func.count())
+        .group_by(Document.organization_id, created_month), Document.organization_id))
+    for org_id, month_value, n in rows:
+        if org_id in totals:
+            totals[org_id]["documents"] += n
+            add_month(org_id, month_value, "documents", n)
+
+    # Rows completed before completed_at existed (or written by bulk updates) are stamped first
+    db.execute(scoped(
+        update(Document).where(Document.status == "completed", Document.completed_at.is_(None))
+        .values(completed_at=Document.updated_at, updated_at=Document.updated_at), Document.organization_id))
+    db.execute(scoped(
+        update(Document).where(Document.status != "completed", Document.completed_at.isnot(None))
+        .values(completed_at=None, updated_at=Document.updated_at), Document.organization_id))
+    completed_month = _month_expr(Document.completed_at, dialect)
+    rows = db.execute(scoped(
+        select(Document.organization_id, completed_month, func.count())
+        .where(Document.status == "completed")
+        .group_by(Document.organization_id, completed_month), Document.organization_id))
+    for org_id, month_value, n in rows:
+        if org_id in totals:
+            totals[org_id]["documents_completed"] += n
+            add_month(org_id, month_value, "documents_completed", n)
+
+    job_month = _month_expr(ProcessingJob.completed_at, dialect)
+    rows = db.execute(scoped(
+        select(ProcessingJob.organization_id, ProcessingJob.status, job_month, func.count())
+        .where(ProcessingJob.status.in_(["completed", "failed"]), ProcessingJob.organization_id.isnot(None))
+        .group_by(ProcessingJob.organization_id, ProcessingJob.status, job_month), ProcessingJob.organization_id))
+    for org_id, job_status, month_value, n in rows:
+        counter = "jobs_completed" if job_status == "completed" else "jobs_failed"
+        if org_id in totals:
+            totals[org_id][counter] += n
+            add_month(org_id, month_value, counter, n)
+
+    db.execute(scoped(delete(_monthly), _monthly.c.organization_id))
+    db.execute(scoped(delete(_usage), _usage.c.organization_id))
+    now = datetime.utcnow()
+    if totals:
+        db.execute(insert(_usage), [{"organization_id": org_id, "updated_at": now, **counts}
+                                    for org_id, counts in totals.items()])
+    month_rows = [{"organization_id": org_id, "month": month, **counts}
+                  for org_id, months in monthly.items() for month, counts in months.items()]
+    if month_rows:
+        db.execute(insert(_monthly), month_rows)
+    logger.info(f"Usage counters backfilled for {len(totals)} organizations ({len(month_rows)} monthly rows)")
+    return len(totals)
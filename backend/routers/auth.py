@@ -4,15 +4,18 @@ Enhanced authentication router for production-grade IDP solution
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Dict, Any
+import copy
 import jwt
 import bcrypt
 import secrets
 from pydantic import BaseModel, EmailStr
 
 from models.database import get_db, User, Organization, ApiKey
+from models.auth_cache import token_cache, user_cache, organization_cache, token_key, cache_claims
 from models.document_processor import DocumentProcessor
 
 router = APIRouter()
@@ -101,21 +104,41 @@ def verify_token(token: str) -> dict:
             detail="Token has expired",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    except jwt.JWTError:
+    except jwt.InvalidTokenError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+def _snapshot(row) -> Dict[str, Any]:
+    """Column values of a loaded row; what the user/organization caches hold."""
+    return {attr.key: copy.deepcopy(getattr(row, attr.key)) for attr in sa_inspect(row).mapper.column_attrs}
+
+def _attach(db: Session, model, snapshot: Dict[str, Any]):
+    """Rebuild a cached row as a persistent instance of ``db`` without querying.
+
+    Changes made to it are flushed as UPDATEs like for a queried row.
+    """
+    existing = db.identity_map.get(db.identity_key(model, snapshot["id"]))
+    if existing is not None:
+        return existing
+    row = model(**copy.deepcopy(snapshot))
+    make_transient_to_detached(row)
+    db.add(row)
+    return row
+
 # Dependencies
 def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
 ) -> User:
-    """Get current authenticated user"""
+    """Get current authenticated user (token claims and user row cached briefly)"""
     token = credentials.credentials
-    payload = verify_token(token)
+    payload = token_cache.get(token_key(token))
+    if payload is None:
+        payload = verify_token(token)
+        cache_claims(token, payload)
     
     if payload.get("type") != "access":
         raise HTTPException(
@@ -130,12 +153,17 @@ def get_current_user(
             detail="Invalid token"
         )
     
-    user = db.query(User).filter(User.id == user_id).first()
-    if user is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found"
-        )
+    snapshot = user_cache.get(str(user_id))
+    if snapshot is not None:
+        user = _attach(db, User, snapshot)
+    else:
+        user = db.query(User).filter(User.id == user_id).first()
+        if user is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="User not found"
+            )
+        user_cache.set(str(user_id), _snapshot(user))
     
     if user.status != "active":
         raise HTTPException(
@@ -150,6 +178,10 @@ def get_current_organization(
     db: Session = Depends(get_db)
 ) -> Organization:
     """Get current user's organization"""
+    snapshot = organization_cache.get(str(current_user.organization_id))
+    if snapshot is not None:
+        return _attach(db, Organization, snapshot)
+    
     organization = db.query(Organization).filter(
         Organization.id == current_user.organization_id
     ).first()
@@ -160,6 +192,7 @@ def get_current_organization(
             detail="Organization not found"
         )
     
+    organization_cache.set(str(current_user.organization_id), _snapshot(organization))
     return organization
 
 # Routes
@@ -11,7 +11,7 @@ from datetime import datetime
 import uuid
 
 from models.human_in_loop import HumanInLoopManager, FeedbackType, DocumentStatus
-from models.document_processor import DocumentProcessor
+from models.model_registry import get_shared_document_processor
 
 logger = logging.getLogger(__name__)
 
@@ -19,7 +19,7 @@ router = APIRouter()
 
 # Initialize managers
 human_loop_manager = HumanInLoopManager()
-document_processor = DocumentProcessor()
+document_processor = get_shared_document_processor()
 
 # Request/Response Models
 class FeedbackRequest(BaseModel):
@@ -4,10 +4,19 @@ import os
 import logging
 import tempfile
 import uuid
-from typing import Dict, Any
+import asyncio
+from typing import Dict, Any, Optional
 import hashlib
 from collections import OrderedDict
 from fastapi import Form
+from fastapi.responses import StreamingResponse
+import json
+
+from models.inference_pool import PoolSaturatedError
+from models.result_cache import get_result_cache, make_cache_key
+from models.spatial_index import BoxIndex
+
+SUPPORTED_EXTENSIONS = ['.pdf', '.jpg', '.jpeg', '.png', '.tiff', '.bmp', '.txt', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx', '.rtf']
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -18,14 +27,46 @@ router = APIRouter()
 # Global document processor instance (will be injected from main.py)
 document_processor = None
 
+# Global inference pool (will be injected from main.py)
+inference_pool = None
+
+# Global job queue (will be injected from main.py)
+job_queue = None
+
 def get_document_processor():
     """Dependency to get the document processor instance"""
     global document_processor
     if document_processor is None:
-        from models.document_processor import DocumentProcessor
-        document_processor = DocumentProcessor()
+        from models.model_registry import get_shared_document_processor
+        document_processor = get_shared_document_processor()
     return document_processor
 
+def get_inference_pool():
+    """Dependency to get the bounded inference pool"""
+    global inference_pool
+    if inference_pool is None:
+        from models.inference_pool import InferencePool
+        inference_pool = InferencePool()
+    return inference_pool
+
+
+def get_job_queue():
+    """Dependency to get the processing job queue"""
+    global job_queue
+    if job_queue is None:
+        from models.job_queue import JobQueue
+        job_queue = JobQueue()
+    return job_queue
+
+
+def _pool_saturated(e) -> HTTPException:
+    """Map a PoolSaturatedError to a 429/503 with Retry-After."""
+    return HTTPException(
+        status_code=e.status_code,
+        detail=str(e),
+        headers={"Retry-After": str(e.retry_after)}
+    )
+
 def get_simple_processor():
     """Get a simple processor for bbox extraction only"""
     try:
@@ -277,6 +318,7 @@ def _format_response_for_frontend(raw: Dict[str, Any]) -> Dict[str, Any]:
 
 # ---------------------------------------------------------------------------
 # Lightweight LRU cache for bbox extraction to avoid reprocessing same file
+# (values hold a BoxIndex over the document's OCR boxes)
 # ---------------------------------------------------------------------------
 
 _BBOX_CACHE_MAX_SIZE = 32
@@ -307,7 +349,9 @@ def _cache_set(hash_key: str, value: Dict[str, Any]) -> None:
 @router.post("/process-document")
 async def process_document(
     file: UploadFile = File(...),
-    processor = Depends(get_document_processor)
+    max_page_parallelism: Optional[int] = Form(None),
+    processor = Depends(get_document_processor),
+    pool = Depends(get_inference_pool)
 ) -> Dict[str, Any]:
     """Process a document using ML models - Fixed version with proper file handling"""
     temp_path = None
@@ -320,12 +364,11 @@ async def process_document(
         
         # Get file extension
         file_ext = os.path.splitext(file.filename)[1].lower()
-        supported_types = ['.pdf', '.jpg', '.jpeg', '.png', '.tiff', '.bmp', '.txt', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx', '.rtf']
         
-        if file_ext not in supported_types:
+        if file_ext not in SUPPORTED_EXTENSIONS:
             raise HTTPException(
                 status_code=400,
-                detail=f"Unsupported file type: {file_ext}. Supported: {supported_types}"
+                detail=f"Unsupported file type: {file_ext}. Supported: {SUPPORTED_EXTENSIONS}"
             )
         
         # Create unique temp file
@@ -339,8 +382,29 @@ async def process_document(
         with open(temp_path, "wb") as f:
             f.write(content)
         
-        # Process document using the global processor instance
-        result = processor.process_document(str(temp_path))
+        if max_page_parallelism is not None and max_page_parallelism < 1:
+            raise HTTPException(status_code=400, detail="max_page_parallelism must be >= 1")
+
+        # Same bytes + same model version + same pipeline config -> cached result
+        result_cache = get_result_cache()
+        cache_key = None
+        result = None
+        if result_cache is not None and hasattr(processor, "get_result_fingerprint"):
+            model_version, pipeline_config = processor.get_result_fingerprint()
+            result_cache.observe_model_version(model_version)
+            cache_key = make_cache_key(content, model_version, {**pipeline_config, "ext": file_ext})
+            result = result_cache.get(cache_key)
+
+        if result is None:
+            # Process document on the inference pool so the event loop stays responsive
+            options = {"max_page_parallelism": max_page_parallelism} if max_page_parallelism else {}
+            result = await pool.process_document(processor, str(temp_path), **options)
+            if cache_key is not None:
+                result_cache.set(cache_key, result, model_version)
+            result["cache_hit"] = False
+        else:
+            logger.info(f"Result cache hit for {file.filename}")
+            result["cache_hit"] = True
 
         # Add processing metadata
         result["processing_method"] = "inference_router"
@@ -350,6 +414,11 @@ async def process_document(
         formatted = _format_response_for_frontend(result)
         return formatted
         
+    except PoolSaturatedError as e:
+        logger.warning(f"Rejecting {file.filename}: {e}")
+        raise _pool_saturated(e)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error processing document: {str(e)}", exc_info=True)
         raise HTTPException(
@@ -364,12 +433,175 @@ async def process_document(
             except Exception as cleanup_error:
                 logger.error(f"Cleanup error: {str(cleanup_error)}")
 
+def _encode_stream_event(event: Dict[str, Any], fmt: str) -> str:
+    payload = json.dumps(event, default=str)
+    if fmt == "sse":
+        return f"event: {event.get('type', 'message')}\ndata: {payload}\n\n"
+    return payload + "\n"
+
+@router.post("/process-document/stream")
+async def process_document_stream(
+    file: UploadFile = File(...),
+    format: str = Form("ndjson"),
+    max_page_parallelism: Optional[int] = Form(None),
+    processor = Depends(get_document_processor),
+    pool = Depends(get_inference_pool)
+):
+    """Stream one JSON record per page as soon as it is processed, then a merged summary.
+
+    ``format`` is "ndjson" (application/x-ndjson) or "sse" (text/event-stream).
+    """
+    if not file.filename:
+        raise HTTPException(status_code=400, detail="No file provided")
+
+    fmt = (format or "ndjson").lower()
+    if fmt not in ("ndjson", "sse"):
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'sse'")
+    if max_page_parallelism is not None and max_page_parallelism < 1:
+        raise HTTPException(status_code=400, detail="max_page_parallelism must be >= 1")
+
+    file_ext = os.path.splitext(file.filename)[1].lower()
+    if file_ext not in SUPPORTED_EXTENSIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported file type: {file_ext}. Supported: {SUPPORTED_EXTENSIONS}"
+        )
+
+    temp_dir = Path("temp")
+    temp_dir.mkdir(exist_ok=True)
+    temp_path = temp_dir / f"inference_{str(uuid.uuid4())[:8]}_{file.filename}"
+    content = await file.read()
+    with open(temp_path, "wb") as f:
+        f.write(content)
+
+    def cleanup() -> None:
+        if temp_path.exists():
+            try:
+                temp_path.unlink()
+            except Exception as cleanup_error:
+                logger.error(f"Cleanup error: {str(cleanup_error)}")
+
+    options = {"max_page_parallelism": max_page_parallelism} if max_page_parallelism else {}
+    try:
+        events = pool.stream_document(processor, str(temp_path), **options)
+    except PoolSaturatedError as e:
+        cleanup()
+        logger.warning(f"Rejecting {file.filename}: {e}")
+        raise _pool_saturated(e)
+
+    async def body():
+        try:
+            async for event in events:
+                if event.get("type") == "summary":
+                    result = event["result"]
+                    result["processing_method"] = "inference_router_stream"
+                    result["file_size"] = len(content)
+                    event = {"type": "summary", "result": _format_response_for_frontend(result)}
+                yield _encode_stream_event(event, fmt)
+        except Exception as e:
+            # Headers are already sent; report the failure in-band
+            detail = e.detail if isinstance(e, HTTPException) else str(e)
+            logger.error(f"Error streaming document: {detail}", exc_info=True)
+            yield _encode_stream_event({"type": "error", "detail": detail}, fmt)
+        finally:
+            await events.aclose()
+            cleanup()
+
+    media_type = "text/event-stream" if fmt == "sse" else "application/x-ndjson"
+    return StreamingResponse(body(), media_type=media_type, headers={"Cache-Control": "no-cache"})
+
+@router.post("/jobs", status_code=202)
+async def submit_job(
+    file: UploadFile = File(...),
+    priority: int = Form(0),
+    organization_id: str = Form(None),
+    document_id: str = Form(None),
+    queue = Depends(get_job_queue)
+) -> Dict[str, Any]:
+    """Queue a document for background processing and return its job id immediately"""
+    if not file.filename:
+        raise HTTPException(status_code=400, detail="No file provided")
+    file_ext = os.path.splitext(file.filename)[1].lower()
+    if file_ext not in SUPPORTED_EXTENSIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported file type: {file_ext}. Supported: {SUPPORTED_EXTENSIONS}"
+        )
+    try:
+        for value in (organization_id, document_id):
+            if value:
+                uuid.UUID(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="organization_id and document_id must be UUIDs")
+
+    content = await file.read()
+    try:
+        job = await asyncio.to_thread(
+            queue.submit, content, file.filename, priority, organization_id, document_id
+        )
+    except Exception as e:
+        logger.error(f"Error queueing job for {file.filename}: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Error queueing document: {str(e)}")
+
+    logger.info(f"Queued job {job['job_id']} for {file.filename} (priority={priority})")
+    return {
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "priority": job["priority"],
+        "status_url": f"/jobs/{job['job_id']}"
+    }
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str, queue = Depends(get_job_queue)) -> Dict[str, Any]:
+    """Poll a processing job; completed jobs include the formatted result"""
+    job = await asyncio.to_thread(queue.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    job.pop("file_path", None)
+    result = job.pop("result", None)
+    if job["status"] == "completed" and isinstance(result, dict):
+        job["result"] = _format_response_for_frontend(result)
+    return job
+
+
 @router.get("/health")
 async def health_check():
     """Health check for inference router"""
     return {"status": "healthy", "router": "inference"}
 
 
+@router.get("/queue")
+async def queue_status(pool = Depends(get_inference_pool)) -> Dict[str, Any]:
+    """Inference pool queue depth and wait-time statistics"""
+    stats = pool.get_stats()
+    if document_processor is not None and hasattr(document_processor, "get_ocr_batch_stats"):
+        stats["ocr_batching"] = document_processor.get_ocr_batch_stats()
+    if document_processor is not None and hasattr(document_processor, "get_layoutlm_batch_stats"):
+        stats["layoutlm_batching"] = document_processor.get_layoutlm_batch_stats()
+    if document_processor is not None and getattr(document_processor, "layoutlm_backend", None) is not None:
+        stats["layoutlm_backend"] = document_processor.layoutlm_backend.get_stats()
+    if document_processor is not None and hasattr(document_processor, "get_ocr_cache_stats"):
+        stats["ocr_cache"] = document_processor.get_ocr_cache_stats()
+    if document_processor is not None and hasattr(document_processor, "get_preprocess_stats"):
+        stats["preprocessing"] = document_processor.get_preprocess_stats()
+    if document_processor is not None and hasattr(document_processor, "get_render_stats"):
+        stats["pdf_render"] = document_processor.get_render_stats()
+    result_cache = get_result_cache()
+    if result_cache is not None:
+        stats["result_cache"] = result_cache.get_stats()
+    return stats
+
+
+@router.delete("/result-cache")
+async def clear_result_cache() -> Dict[str, Any]:
+    """Drop all cached document results"""
+    result_cache = get_result_cache()
+    if result_cache is None:
+        return {"status": "disabled", "removed": 0}
+    return {"status": "success", "removed": result_cache.invalidate()}
+
+
 @router.post("/extract-by-bbox")
 async def extract_by_bbox(
     file: UploadFile = File(...),
@@ -397,27 +629,18 @@ async def extract_by_bbox(
         with open(temp_path, "wb") as f:
             f.write(content)
 
-        # Try cache first to avoid reprocessing
+        # Try cache first to avoid reprocessing; cached documents carry their spatial index
         cached = _cache_get(file_hash)
         if cached is not None:
-            boxes = cached.get("bounding_boxes", [])
-            max_x_cached = cached.get("max_x")
-            max_y_cached = cached.get("max_y")
+            index = cached["index"]
         else:
             # Use simple processor for bbox extraction only (not full ML processing)
-            simple_processor = get_simple_processor()
-            result = simple_processor.process_document(str(temp_path))
-            boxes = result.get("bounding_boxes", [])
-            try:
-                # Precompute max extents for scaling
-                max_x_cached = max(max(p[0] for p in bb.get("box", [])) for bb in boxes if isinstance(bb, dict) and isinstance(bb.get("box"), list))
-                max_y_cached = max(max(p[1] for p in bb.get("box", [])) for bb in boxes if isinstance(bb, dict) and isinstance(bb.get("box"), list))
-            except Exception:
-                max_x_cached, max_y_cached = None, None
+            pool = get_inference_pool()
+            simple_processor = get_simple_processor() if pool.mode != "process" else None
+            result = await pool.simple_process_document(simple_processor, str(temp_path))
+            index = BoxIndex(result.get("bounding_boxes", []))
             _cache_set(file_hash, {
-                "bounding_boxes": boxes,
-                "max_x": max_x_cached,
-                "max_y": max_y_cached,
+                "index": index,
                 "filename": file.filename,
             })
 
@@ -426,67 +649,34 @@ async def extract_by_bbox(
         rx2, ry2 = rx1 + float(width), ry1 + float(height)
 
         # Optional rescale from canvas space to document pixel space
-        try:
-            if canvas_width and canvas_height and isinstance(boxes, list) and boxes:
-                max_x = max_x_cached if max_x_cached is not None else max(max(p[0] for p in bb.get("box", [])) for bb in boxes if isinstance(bb, dict) and isinstance(bb.get("box"), list))
-                max_y = max_y_cached if max_y_cached is not None else max(max(p[1] for p in bb.get("box", [])) for bb in boxes if isinstance(bb, dict) and isinstance(bb.get("box"), list))
-                if float(canvas_width) > 0 and float(canvas_height) > 0:
-                    sx = float(max_x) / float(canvas_width)
-                    sy = float(max_y) / float(canvas_height)
-                    rx1, ry1, rx2, ry2 = rx1 * sx, ry1 * sy, rx2 * sx, ry2 * sy
-        except Exception:
-            pass
-
-        def quad_in_region(quad: Any, pad_scale: float = 0.05) -> bool:
-            try:
-                xs = [p[0] for p in quad]
-                ys = [p[1] for p in quad]
-                qx1, qy1 = min(xs), min(ys)
-                qx2, qy2 = max(xs), max(ys)
-                # Slight padding to account for rounding/scaling
-                pad_x = max(2.0, (rx2 - rx1) * pad_scale)
-                pad_y = max(2.0, (ry2 - ry1) * pad_scale)
-                _rx1, _ry1 = rx1 - pad_x, ry1 - pad_y
-                _rx2, _ry2 = rx2 + pad_x, ry2 + pad_y
-                # Intersection over min-area heuristic
-                ix1, iy1 = max(_rx1, qx1), max(_ry1, qy1)
-                ix2, iy2 = min(_rx2, qx2), min(_ry2, qy2)
-                return ix2 > ix1 and iy2 > iy1
-            except Exception:
-                return False
-
-        # Collect texts inside region, roughly left-to-right top-to-bottom
-        def collect_text(pad_scale: float) -> str:
-            local_hits = []
-            for bb in boxes:
-                quad = bb.get("box")
-                if quad and quad_in_region(quad, pad_scale):
-                    cx = sum(p[0] for p in quad) / 4.0
-                    cy = sum(p[1] for p in quad) / 4.0
-                    local_hits.append((cy, cx, str(bb.get("text", ""))))
-            local_hits.sort()
-            return " ".join(t for (_, _, t) in local_hits).strip()
-
-        def count_hits(pad_scale: float) -> int:
-            c = 0
-            for bb in boxes:
-                quad = bb.get("box")
-                if quad and quad_in_region(quad, pad_scale):
-                    c += 1
-            return c
-
-        extracted_text = collect_text(0.05)
-        hits_count = count_hits(0.05)
+        if canvas_width and canvas_height and index.max_x is not None:
+            if float(canvas_width) > 0 and float(canvas_height) > 0:
+                sx = index.max_x / float(canvas_width)
+                sy = index.max_y / float(canvas_height)
+                rx1, ry1, rx2, ry2 = rx1 * sx, ry1 * sy, rx2 * sx, ry2 * sy
+
+        # Texts of boxes intersecting the (slightly padded) region, in reading order
+        def collect_hits(pad_scale: float):
+            # Slight padding to account for rounding/scaling
+            pad_x = max(2.0, (rx2 - rx1) * pad_scale)
+            pad_y = max(2.0, (ry2 - ry1) * pad_scale)
+            return index.query(rx1 - pad_x, ry1 - pad_y, rx2 + pad_x, ry2 + pad_y)
+
+        hits = collect_hits(0.05)
+        extracted_text = " ".join(index.texts[i] for i in hits).strip()
         if not extracted_text:
             # One-time retry with larger expansion
-            extracted_text = collect_text(0.10)
-            hits_count = count_hits(0.10)
+            hits = collect_hits(0.10)
+            extracted_text = " ".join(index.texts[i] for i in hits).strip()
+        hits_count = len(hits)
         
         # Debug logging
         logger.info(f"Bbox extraction: region=({rx1},{ry1},{rx2},{ry2}), hits={hits_count}, text='{extracted_text}'")
 
         return {"text": extracted_text}
 
+    except PoolSaturatedError as e:
+        raise _pool_saturated(e)
     except Exception as e:
         logger.error(f"Error extracting by bbox: {e}", exc_info=True)
         # Return empty text instead of raising error to prevent 500
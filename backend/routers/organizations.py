@@ -10,6 +10,8 @@ from pydantic import BaseModel
 
 from models.database import get_db, Organization, User, ApiKey
 from routers.auth import get_current_user, get_current_organization
+from models.auth_cache import invalidate_user, invalidate_organization
+from models.usage_stats import get_usage
 
 router = APIRouter()
 
@@ -58,16 +60,8 @@ async def get_organization(
 ):
     """Get current organization details"""
     
-    # Get user count
-    user_count = db.query(User).filter(
-        User.organization_id == current_org.id
-    ).count()
-    
-    # Get document count
-    from models.database import Document
-    document_count = db.query(Document).filter(
-        Document.organization_id == current_org.id
-    ).count()
+    # User and document counts from the usage counters
+    usage = get_usage(db, current_org.id)
     
     return OrganizationResponse(
         id=str(current_org.id),
@@ -76,8 +70,8 @@ async def get_organization(
         settings=current_org.settings,
         created_at=current_org.created_at,
         updated_at=current_org.updated_at,
-        user_count=user_count,
-        document_count=document_count
+        user_count=usage["users"],
+        document_count=usage["documents"]
     )
 
 @router.put("/", response_model=OrganizationResponse)
@@ -107,17 +101,11 @@ async def update_organization(
     current_org.updated_at = datetime.utcnow()
     
     db.commit()
+    invalidate_organization(current_org.id)
     db.refresh(current_org)
     
     # Get counts
-    user_count = db.query(User).filter(
-        User.organization_id == current_org.id
-    ).count()
-    
-    from models.database import Document
-    document_count = db.query(Document).filter(
-        Document.organization_id == current_org.id
-    ).count()
+    usage = get_usage(db, current_org.id)
     
     return OrganizationResponse(
         id=str(current_org.id),
@@ -126,8 +114,8 @@ async def update_organization(
         settings=current_org.settings,
         created_at=current_org.created_at,
         updated_at=current_org.updated_at,
-        user_count=user_count,
-        document_count=document_count
+        user_count=usage["users"],
+        document_count=usage["documents"]
     )
 
 @router.get("/users", response_model=List[UserResponse])
@@ -252,6 +240,7 @@ async def update_user(
     user.updated_at = datetime.utcnow()
     
     db.commit()
+    invalidate_user(user.id)
     db.refresh(user)
     
     return UserResponse(
@@ -307,8 +296,10 @@ async def remove_user(
             )
     
     # Remove user
+    removed_id = user.id
     db.delete(user)
     db.commit()
+    invalidate_user(removed_id)
     
     return {"message": "User removed successfully"}
 
@@ -345,6 +336,7 @@ async def update_organization_settings(
     current_org.updated_at = datetime.utcnow()
     
     db.commit()
+    invalidate_organization(current_org.id)
     
     return {"message": "Settings updated successfully", "settings": current_org.settings}
 
@@ -356,36 +348,17 @@ async def get_organization_usage(
 ):
     """Get organization usage statistics"""
     
-    # Get user count
-    user_count = db.query(User).filter(
-        User.organization_id == current_org.id
-    ).count()
-    
-    # Get document count
-    from models.database import Document
-    document_count = db.query(Document).filter(
-        Document.organization_id == current_org.id
-    ).count()
-    
-    # Get API key count
-    api_key_count = db.query(ApiKey).filter(
-        ApiKey.organization_id == current_org.id
-    ).count()
-    
-    # Get documents processed this month
-    from datetime import datetime, timedelta
-    month_start = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    
-    monthly_documents = db.query(Document).filter(
-        Document.organization_id == current_org.id,
-        Document.created_at >= month_start
-    ).count()
+    # Totals and this month's rollup in one query (kept current by models.usage_stats)
+    usage = get_usage(db, current_org.id)
     
     return {
         "organization_id": str(current_org.id),
-        "users": user_count,
-        "documents": document_count,
-        "api_keys": api_key_count,
-        "monthly_documents": monthly_documents,
+        "users": usage["users"],
+        "documents": usage["documents"],
+        "api_keys": usage["api_keys"],
+        "monthly_documents": usage["monthly_documents"],
+        "documents_completed": usage["documents_completed"],
+        "jobs_completed": usage["jobs_completed"],
+        "jobs_failed": usage["jobs_failed"],
         "created_at": current_org.created_at
     }
@@ -9,6 +9,10 @@ from pydantic import BaseModel, EmailStr
 import logging
 
 from models.supabase_client import get_supabase_client
+from models.auth_cache import (
+    token_cache, user_cache, organization_cache, token_key, cache_claims,
+    get_supabase_token_verifier,
+)
 
 router = APIRouter()
 security = HTTPBearer()
@@ -47,18 +51,46 @@ class ApiKeyResponse(BaseModel):
 
 # Utility Functions
 def verify_supabase_token(token: str) -> dict:
-    """Verify Supabase JWT token"""
+    """Verify Supabase JWT token.
+
+    Checked locally (JWT secret / cached JWKS) and remembered until it
+    expires; only tokens that cannot be checked locally go to Supabase.
+    """
+    claims = token_cache.get(token_key(token))
+    if claims is not None:
+        return claims
+
+    verifier = get_supabase_token_verifier()
+    if verifier is not None:
+        try:
+            payload = verifier.verify(token)
+        except Exception as e:
+            logger.info(f"Token rejected: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Could not validate credentials"
+            )
+        if payload is not None:
+            claims = {
+                "user_id": payload["sub"],
+                "email": payload.get("email"),
+                "role": payload.get("role"),
+                "exp": payload["exp"]
+            }
+            cache_claims(token, claims)
+            return claims
+
     try:
-        # Supabase handles JWT verification automatically
-        # We just need to get the user from the token
         client = get_supabase_client()
         result = client.supabase.auth.get_user(token)
         if result.user:
-            return {
+            claims = {
                 "user_id": result.user.id,
                 "email": result.user.email,
                 "role": result.user.role
             }
+            cache_claims(token, claims)
+            return claims
         else:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -75,20 +107,26 @@ def verify_supabase_token(token: str) -> dict:
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ) -> dict:
-    """Get current authenticated user from Supabase"""
+    """Get current authenticated user from Supabase (profile cached by user id)"""
     token = credentials.credentials
     user_data = verify_supabase_token(token)
     
-    # Get user profile from database
-    client = get_supabase_client()
-    user_profile = await client.get_user_profile(user_data["user_id"])
-    if not user_profile:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User profile not found"
-        )
+    user_profile = user_cache.get(user_data["user_id"])
+    if user_profile is None:
+        # Get user profile from database
+        client = get_supabase_client()
+        user_profile = await client.get_user_profile(user_data["user_id"])
+        if not user_profile:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User profile not found"
+            )
+        user_cache.set(user_data["user_id"], user_profile)
+        # The profile query embeds the organization row
+        if isinstance(user_profile.get("organizations"), dict) and user_profile.get("organization_id"):
+            organization_cache.set(str(user_profile["organization_id"]), user_profile["organizations"])
     
-    return user_profile
+    return dict(user_profile)
 
 async def get_current_organization(current_user: dict = Depends(get_current_user)) -> dict:
     """Get current user's organization"""
@@ -98,15 +136,18 @@ async def get_current_organization(current_user: dict = Depends(get_current_user
             detail="Organization not found"
         )
     
-    client = get_supabase_client()
-    organization = await client.get_organization(current_user["organization_id"])
-    if not organization:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Organization not found"
-        )
+    organization = organization_cache.get(str(current_user["organization_id"]))
+    if organization is None:
+        client = get_supabase_client()
+        organization = await client.get_organization(current_user["organization_id"])
+        if not organization:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Organization not found"
+            )
+        organization_cache.set(str(current_user["organization_id"]), organization)
     
-    return organization
+    return dict(organization)
 
 # Routes
 @router.post("/signup", response_model=TokenResponse)
@@ -208,6 +249,10 @@ async def login(login_data: UserLogin):
                 detail="Organization not found"
             )
         
+        # Warm the caches so the session's first requests need no lookups
+        user_cache.set(auth_result.user.id, user_profile)
+        organization_cache.set(str(organization["id"]), organization)
+        
         return TokenResponse(
             access_token=auth_result.session.access_token,
             refresh_token=auth_result.session.refresh_token,
@@ -235,10 +280,15 @@ async def login(login_data: UserLogin):
         )
 
 @router.post("/logout")
-async def logout(current_user: dict = Depends(get_current_user)):
+async def logout(
+    current_user: dict = Depends(get_current_user),
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
     """Logout user from Supabase"""
     
     try:
+        token_cache.invalidate(token_key(credentials.credentials))
+        user_cache.invalidate(current_user["id"])
         # Supabase handles logout automatically
         # Just return success message
         return {"message": "Logged out successfully"}
@@ -1,4 +1,5 @@
 from fastapi import APIRouter, HTTPException, File, UploadFile, Form
+from fastapi.concurrency import run_in_threadpool
 from typing import Dict, Any, List
 import json
 from PIL import Image
@@ -6,11 +7,12 @@ import io
 import os
 import fitz  # PyMuPDF
 from models.training_manager import TrainingManager
-from models.active_model_manager import ActiveModelManager
+from models.page_renderer import get_page_renderer
+from models.model_registry import registry, get_shared_active_model_manager
 
 router = APIRouter()
-training_manager = TrainingManager()
-active_model_manager = ActiveModelManager()
+training_manager = registry.shared("training_manager", TrainingManager)
+active_model_manager = get_shared_active_model_manager()
 
 @router.post("/train")
 async def train_model(
@@ -38,8 +40,8 @@ async def train_model(
                         if doc.page_count == 0:
                             raise ValueError("Empty PDF")
                         page = doc.load_page(0)
-                        pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))  # 2x for clarity
-                        image = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+                        # Fixed 2x: annotation boxes are drawn in the pixel space of a 2x render
+                        image = get_page_renderer().render(page, zoom=2, grayscale=False).image()
                 else:
                     # Assume standard image
                     image = Image.open(io.BytesIO(content)).convert('RGB')
@@ -126,10 +128,14 @@ async def get_active_model() -> Dict[str, Any]:
         )
 
 @router.post("/set-active")
-async def set_active_model(model_name: str = Form(...)) -> Dict[str, Any]:
-    """Set the active model"""
+async def set_active_model(model_name: str = Form(...), background: bool = Form(False)) -> Dict[str, Any]:
+    """Set the active model.
+
+    Requests in flight finish on the previous model; with ``background=true``
+    the call returns at once and the swap happens after the model is warmed up.
+    """
     try:
-        result = active_model_manager.set_active_model(model_name)
+        result = await run_in_threadpool(active_model_manager.set_active_model, model_name, background)
         if result["success"]:
             return {
                 "status": "success",
@@ -150,7 +156,7 @@ async def set_active_model(model_name: str = Form(...)) -> Dict[str, Any]:
 async def auto_set_latest_model() -> Dict[str, Any]:
     """Automatically set the latest trained model as active"""
     try:
-        result = active_model_manager.auto_set_latest_model()
+        result = await run_in_threadpool(active_model_manager.auto_set_latest_model)
         if result["success"]:
             return {
                 "status": "success",
@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+Standalone document-processing worker.
+
+Drains the processing_jobs queue without serving HTTP, so workers can be
+scaled separately from API pods. Point JOBS_DATABASE_URL (or DATABASE_URL)
+and JOB_UPLOAD_DIR at the same database/volume the API uses.
+"""
+import logging
+import signal
+
+from models.model_registry import get_shared_document_processor
+from models.job_queue import JobQueue, JobWorker
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+if __name__ == "__main__":
+    queue = JobQueue()
+    worker = JobWorker(queue, get_shared_document_processor())
+
+    signal.signal(signal.SIGTERM, lambda *_: worker.request_stop())
+    signal.signal(signal.SIGINT, lambda *_: worker.request_stop())
+
+    logger.info("Starting document processing worker...")
+    worker.run_forever()
+    logger.info("Worker stopped")
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Recompute the per-organization usage counters (organization_usage and
+organization_monthly_usage) from the users, api_keys, documents and
+processing_jobs tables.
+
+Run once after deploying the counters, and after any bulk UPDATE/DELETE that
+bypassed the ORM. Creates the counter tables, the documents.completed_at
+column and the documents (organization_id, created_at) index if they are
+missing, and stamps completed_at on completed documents that lack it.
+
+Run from backend/:
+    python scripts/backfill_usage.py
+    python scripts/backfill_usage.py --org 6f1c... --org 0a2b...
+"""
+import argparse
+import json
+import logging
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from models.database import Document, get_session_factory, init_database
+from models.usage_stats import backfill
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--org", action="append", default=None, help="Organization id (repeatable; default: all)")
+    parser.add_argument("--database-url", default=None, help="Default: DATABASE_URL")
+    args = parser.parse_args()
+
+    engine = init_database(args.database_url)
+    # create_all does not add indexes to tables that already exist
+    for index in Document.__table__.indexes:
+        index.create(engine, checkfirst=True)
+
+    org_ids = [uuid.UUID(org) for org in args.org] if args.org else None
+    db = get_session_factory(args.database_url)()
+    try:
+        started = time.perf_counter()
+        organizations = backfill(db, org_ids)
+        db.commit()
+    except Exception:
+        db.rollback()
+        logger.exception("Backfill failed; counters left unchanged")
+        return 1
+    finally:
+        db.close()
+
+    print(json.dumps({"organizations": organizations, "seconds": round(time.perf_counter() - started, 2)}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
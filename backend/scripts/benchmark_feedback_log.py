@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Correction throughput of the feedback log as history grows: the previous
+full rewrite of feedback_data.json (plus a metrics rescan) per correction vs.
+the append-only FeedbackStore. Running totals of the store are checked
+against a recount of what was written.
+
+Run from backend/:
+    python scripts/benchmark_feedback_log.py
+    python scripts/benchmark_feedback_log.py --entries 5000000 --workers 4
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from models.feedback_store import FeedbackStore
+
+FIELDS = ["invoice_number", "date", "total_amount", "vendor_name"]
+
+
+def correction(rng: random.Random, document_id: str):
+    entity_type = rng.choice(FIELDS)
+    original = f"{rng.randint(0, 999):03d}"
+    return {"document_id": document_id, "entity_type": entity_type, "original_value": original,
+            "corrected_value": original + "0", "confidence": round(rng.random(), 2), "context": None,
+            "timestamp": "2025-01-01T00:00:00"}
+
+
+# -- previous implementation: rewrite the whole file and rescan on every correction --
+
+def legacy_rate(path: Path, entries: int, rng: random.Random, checkpoints):
+    data, rates, done = {}, [], 0
+    for target in checkpoints:
+        begin, start_count = time.perf_counter(), done
+        while done < min(target, entries):
+            document_id = f"doc-{done % 5000}"
+            data.setdefault(document_id, []).append(correction(rng, document_id))
+            with open(path, "w") as f:
+                json.dump(data, f, indent=2)
+            sum(len(e) for entries_ in data.values() for e in entries_)  # metrics rescan
+            done += 1
+        if done > start_count:
+            rates.append((done, round((done - start_count) / (time.perf_counter() - begin))))
+    return rates
+
+
+def store_worker(path: str, worker: int, count: int, seed: int, queue):
+    rng = random.Random(seed + worker)
+    store = FeedbackStore(path)
+    checkpoint = max(1, count // 10)
+    begin = time.perf_counter()
+    for i in range(count):
+        document_id = f"doc-{worker}-{i % 5000}"
+        entry = correction(rng, document_id)
+        store.append(document_id, entry, 1, (entry["entity_type"], entry["original_value"], entry["corrected_value"]))
+        if (i + 1) % checkpoint == 0:
+            now = time.perf_counter()
+            queue.put((worker, i + 1, round(checkpoint / (now - begin))))
+            begin = now
+    queue.put((worker, None, None))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=1_000_000, help="Corrections written to the store in total")
+    parser.add_argument("--workers", type=int, default=1, help="Concurrent writer processes")
+    parser.add_argument("--legacy-entries", type=int, default=3000, help="Corrections for the old JSON path")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    tmp_dir = Path(tempfile.mkdtemp(prefix="feedback_bench_"))
+    try:
+        checkpoints = [args.legacy_entries * (i + 1) // 5 for i in range(5)]
+        legacy_rates = legacy_rate(tmp_dir / "feedback_data.json", args.legacy_entries,
+                                    random.Random(args.seed), checkpoints)
+
+        path = str(tmp_dir / "feedback.sqlite")
+        FeedbackStore(path)
+        per_worker = args.entries // args.workers
+        queue = multiprocessing.Queue()
+        started = time.perf_counter()
+        procs = [multiprocessing.Process(target=store_worker, args=(path, w, per_worker, args.seed, queue))
+                 for w in range(args.workers)]
+        for proc in procs:
+            proc.start()
+        store_rates, finished = {}, 0
+        while finished < args.workers:
+            worker, done, rate = queue.get()
+            if done is None:
+                finished += 1
+            else:
+                store_rates.setdefault(done, []).append(rate)
+        for proc in procs:
+            proc.join()
+        elapsed = time.perf_counter() - started
+
+        totals = FeedbackStore(path).totals()
+        written = per_worker * args.workers
+        if totals["entries"] != written or totals["corrections"] != written:
+            print(f"Running totals {totals} do not match {written} appended corrections")
+            return 1
+
+        print(json.dumps({
+            "legacy_json_corrections_per_s": [{"history": n, "rate": r} for n, r in legacy_rates],
+            "store_corrections_per_s": [{"history": n * args.workers, "rate": sum(r)}
+                                        for n, r in sorted(store_rates.items())],
+            "store_entries": written,
+            "store_workers": args.workers,
+            "store_seconds": round(elapsed, 1),
+            "store_size_mb": round(os.path.getsize(path) / (1024 * 1024), 1),
+            "totals_consistent": True
+        }, indent=2))
+        return 0
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the Donut learning data: the previous learning_data.json path
+(the whole file rewritten twice per correction, learned patterns scanned
+linearly) vs. LearningStore (batched SQLite writes, PatternIndex lookups).
+Pattern lookups of both paths are checked to return the same corrections.
+
+Run from backend/:
+    python scripts/benchmark_learning_store.py                # 100k corrections
+    python scripts/benchmark_learning_store.py --corrections 20000 --lookups 500
+"""
+import argparse
+import json
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from models.learning_store import LearningStore
+
+FIELDS = ["invoice_number", "invoice_date", "total_amount", "vendor_name", "customer_name", "tax_amount"]
+WORDS = ["invoice", "total", "amount", "due", "date", "vendor", "customer", "tax", "vat", "subtotal",
+         "payment", "terms", "bank", "account", "reference", "order", "quantity", "rate", "description"]
+
+
+def synthetic_text(rng: random.Random, words: int = 150) -> str:
+    parts = []
+    for _ in range(words):
+        parts.append(rng.choice(WORDS) if rng.random() < 0.7 else str(rng.randint(0, 99999)))
+    return " ".join(parts)
+
+
+def synthetic_correction(rng: random.Random):
+    text = synthetic_text(rng)
+    tokens = text.split()
+    original = tokens[rng.randrange(len(tokens))]
+    return rng.choice(FIELDS), original, original.upper() + "-FIXED", {"text": text}
+
+
+def pattern_of(text: str, original: str):
+    """Window around the original value, as DonutDocumentProcessor._update_patterns builds it."""
+    pos = text.find(original)
+    if pos == -1:
+        return None
+    return text[max(0, pos - 50):min(len(text), pos + len(original) + 50)]
+
+
+# -- previous implementation ----------------------------------------------------
+
+class LegacyLearningData:
+    def __init__(self, path: Path):
+        self.path = path
+        self.data = {"corrections": {}, "annotations": {}, "patterns": {}, "confidence_history": {}}
+
+    def save(self):
+        with open(self.path, "w") as f:
+            json.dump(self.data, f, indent=2)
+
+    def add_correction(self, doc_type, field, original, corrected, context):
+        correction = {"original": original, "corrected": corrected, "context": context, "timestamp": time.time()}
+        self.data["corrections"].setdefault(doc_type, {}).setdefault(field, []).append(correction)
+        self.save()
+        patterns = self.data["patterns"].setdefault(doc_type, {}).setdefault(field, [])
+        pattern = pattern_of(context["text"], original)
+        if pattern is not None:
+            patterns.append({"pattern": pattern, "correction": corrected, "confidence": 0.8})
+        self.save()
+
+    def add_pattern(self, doc_type, field, pattern, corrected):
+        self.data["patterns"].setdefault(doc_type, {}).setdefault(field, []).append(
+            {"pattern": pattern, "correction": corrected, "confidence": 0.8})
+
+    def apply_learned_patterns(self, doc_type, field, text):
+        for pattern_data in self.data["patterns"].get(doc_type, {}).get(field, []):
+            if pattern_data["pattern"] in text:
+                return pattern_data["correction"], pattern_data["confidence"]
+        return None, 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corrections", type=int, default=100_000)
+    parser.add_argument("--legacy-corrections", type=int, default=1000,
+                        help="Corrections written through the JSON path (it is quadratic)")
+    parser.add_argument("--lookups", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    corrections = [synthetic_correction(rng) for _ in range(args.corrections)]
+    tmp_dir = Path(tempfile.mkdtemp(prefix="learning_bench_"))
+    try:
+        legacy = LegacyLearningData(tmp_dir / "learning_data.json")
+        started = time.perf_counter()
+        for field, original, corrected, context in corrections[:args.legacy_corrections]:
+            legacy.add_correction("invoice", field, original, corrected, context)
+        legacy_write_s = time.perf_counter() - started
+        legacy_count = min(args.legacy_corrections, args.corrections)
+
+        store = LearningStore(str(tmp_dir / "learning.sqlite"), flush_seconds=60)
+        started = time.perf_counter()
+        for field, original, corrected, context in corrections:
+            store.add_correction("invoice", field, original, corrected, context, time.time())
+            pattern = pattern_of(context["text"], original)
+            if pattern is not None:
+                store.add_pattern("invoice", field, pattern, corrected, 0.8)
+        store.flush()
+        store_write_s = time.perf_counter() - started
+
+        # Same pattern set on both sides for the lookups
+        for field, original, corrected, context in corrections[args.legacy_corrections:]:
+            pattern = pattern_of(context["text"], original)
+            if pattern is not None:
+                legacy.add_pattern("invoice", field, pattern, corrected)
+
+        # Half the texts reuse a corrected document (a hit), half are new
+        queries = []
+        for i in range(args.lookups):
+            field, _, _, context = rng.choice(corrections)
+            queries.append((field, context["text"] if i % 2 == 0 else synthetic_text(rng)))
+
+        store.find_pattern("invoice", FIELDS[0], "")  # loads the index
+        mismatches = sum(1 for field, text in queries
+                         if legacy.apply_learned_patterns("invoice", field, text) != store.find_pattern("invoice", field, text))
+        if mismatches:
+            print(f"{mismatches}/{len(queries)} lookups differ between implementations")
+            return 1
+
+        started = time.perf_counter()
+        for field, text in queries:
+            legacy.apply_learned_patterns("invoice", field, text)
+        legacy_lookup_us = (time.perf_counter() - started) / len(queries) * 1e6
+        started = time.perf_counter()
+        for field, text in queries:
+            store.find_pattern("invoice", field, text)
+        store_lookup_us = (time.perf_counter() - started) / len(queries) * 1e6
+
+        stats = store.get_stats()
+        print(json.dumps({
+            "corrections": args.corrections,
+            "patterns": stats["total_patterns"],
+            "legacy_ms_per_correction": round(legacy_write_s / legacy_count * 1000, 3),
+            "legacy_corrections_timed": legacy_count,
+            "store_ms_per_correction": round(store_write_s / args.corrections * 1000, 4),
+            "legacy_us_per_lookup": round(legacy_lookup_us, 1),
+            "store_us_per_lookup": round(store_lookup_us, 1),
+            "lookup_speedup": round(legacy_lookup_us / store_lookup_us, 1),
+            "store_flushes": store.get_store_stats()["flushes"],
+            "lookups_identical": True
+        }, indent=2))
+        return 0
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
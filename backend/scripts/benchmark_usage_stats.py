@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Benchmark of GET /organizations/usage: the four COUNT(*) queries of the
+previous endpoint vs. the single counter read of models.usage_stats.
+
+Fills a database (a temporary SQLite file unless --database-url is given)
+with --documents documents spread over --orgs organizations and two years,
+backfills the counters, writes a few documents/jobs through the ORM so the
+incremental path is exercised too, then times both reads for every
+organization. Results of both paths are checked to be identical, and the
+incrementally maintained counters to match a fresh backfill.
+
+Run from backend/:
+    python scripts/benchmark_usage_stats.py                  # 10M documents
+    python scripts/benchmark_usage_stats.py --documents 1000000 --orgs 50
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import insert
+
+from models.database import (
+    Organization, User, ApiKey, Document, ProcessingJob,
+    get_engine, get_session_factory, init_database,
+)
+from models.usage_stats import backfill, get_usage, month_start
+
+STATUSES = ["completed"] * 8 + ["processing", "error"]
+CHUNK = 50000
+
+
+def populate(engine, documents: int, orgs: int, rng: random.Random):
+    now = datetime.utcnow()
+    org_ids = [uuid.uuid4() for _ in range(orgs)]
+    users = {org_id: [uuid.uuid4() for _ in range(rng.randint(2, 40))] for org_id in org_ids}
+    with engine.begin() as conn:
+        conn.execute(insert(Organization.__table__), [
+            {"id": org_id, "name": f"Org {i}", "slug": f"org-{i}", "settings": {}, "created_at": now, "updated_at": now}
+            for i, org_id in enumerate(org_ids)])
+        conn.execute(insert(User.__table__), [
+            {"id": user_id, "organization_id": org_id, "email": f"{user_id.hex}@example.com", "password_hash": "x",
+             "role": "user", "status": "active", "created_at": now, "updated_at": now}
+            for org_id, ids in users.items() for user_id in ids])
+        conn.execute(insert(ApiKey.__table__), [
+            {"id": uuid.uuid4(), "organization_id": org_id, "name": "key", "key_hash": uuid.uuid4().hex,
+             "permissions": {}, "created_at": now}
+            for org_id in org_ids for _ in range(rng.randint(0, 5))])
+
+    # Skewed like real tenants: a few organizations own most documents
+    weights = [1.0 / (rank + 1) for rank in range(orgs)]
+    written = 0
+    while written < documents:
+        n = min(CHUNK, documents - written)
+        rows = []
+        for org_id in rng.choices(org_ids, weights=weights, k=n):
+            created = now - timedelta(seconds=rng.randint(0, 730 * 86400))
+            rows.append({"id": uuid.uuid4(), "organization_id": org_id, "user_id": rng.choice(users[org_id]),
+                         "name": "scan.pdf", "file_path": "uploads/scan.pdf", "status": rng.choice(STATUSES),
+                         "extracted_fields": {}, "created_at": created,
+                         "updated_at": created + timedelta(minutes=rng.randint(1, 60))})
+        with engine.begin() as conn:
+            conn.execute(insert(Document.__table__), rows)
+        written += n
+        print(f"\r{written:,}/{documents:,} documents", end="", file=sys.stderr, flush=True)
+    print(file=sys.stderr)
+    return org_ids, users
+
+
+def write_through_orm(db, org_ids, users, rng: random.Random, count: int):
+    """New documents and finished jobs, counted by the mapper listeners."""
+    for _ in range(count):
+        org_id = rng.choice(org_ids)
+        document = Document(organization_id=org_id, user_id=rng.choice(users[org_id]),
+                            name="new.pdf", file_path="uploads/new.pdf", status="processing")
+        job = ProcessingJob(organization_id=org_id, status="processing")
+        db.add_all([document, job])
+        db.commit()
+        document.status = "completed"
+        job.status = rng.choice(["completed", "failed"])
+        job.completed_at = datetime.utcnow()
+        db.commit()
+
+
+# -- previous implementation: four COUNT(*) queries per request ------------------
+
+def legacy_usage(db, org_id):
+    month = datetime.combine(month_start(), datetime.min.time())
+    return {
+        "users": db.query(User).filter(User.organization_id == org_id).count(),
+        "documents": db.query(Document).filter(Document.organization_id == org_id).count(),
+        "api_keys": db.query(ApiKey).filter(ApiKey.organization_id == org_id).count(),
+        "monthly_documents": db.query(Document).filter(Document.organization_id == org_id,
+                                                       Document.created_at >= month).count(),
+    }
+
+
+def counter_usage(db, org_id):
+    usage = get_usage(db, org_id)
+    return {name: usage[name] for name in ("users", "documents", "api_keys", "monthly_documents")}
+
+
+def time_per_request(fn, db, org_ids, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for org_id in org_ids:
+            fn(db, org_id)
+        best = min(best, time.perf_counter() - started)
+    return best / len(org_ids) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=10_000_000)
+    parser.add_argument("--orgs", type=int, default=100)
+    parser.add_argument("--orm-writes", type=int, default=200, help="Documents/jobs written through the ORM after backfill")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per implementation (best is reported)")
+    parser.add_argument("--database-url", default=None, help="Empty database to fill (default: temporary SQLite file)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    tmp_dir = None
+    url = args.database_url
+    if url is None:
+        tmp_dir = tempfile.mkdtemp(prefix="usage_bench_")
+        url = f"sqlite:///{os.path.join(tmp_dir, 'usage.db')}"
+
+    rng = random.Random(args.seed)
+    init_database(url)
+    started = time.perf_counter()
+    org_ids, users = populate(get_engine(url), args.documents, args.orgs, rng)
+    populate_s = time.perf_counter() - started
+
+    db = get_session_factory(url)()
+    try:
+        started = time.perf_counter()
+        backfill(db)
+        db.commit()
+        backfill_s = time.perf_counter() - started
+
+        write_through_orm(db, org_ids, users, rng, args.orm_writes)
+
+        mismatches = [str(org_id) for org_id in org_ids if legacy_usage(db, org_id) != counter_usage(db, org_id)]
+        if mismatches:
+            print(f"{len(mismatches)}/{len(org_ids)} organizations differ: {mismatches[:5]}")
+            return 1
+
+        # The listeners must land where a fresh backfill would
+        incremental = {org_id: get_usage(db, org_id) for org_id in org_ids}
+        backfill(db)
+        db.commit()
+        drifted = [str(org_id) for org_id in org_ids
+                   if {**incremental[org_id], "updated_at": None} != {**get_usage(db, org_id), "updated_at": None}]
+        if drifted:
+            print(f"{len(drifted)}/{len(org_ids)} organizations drift from backfill: {drifted[:5]}")
+            return 1
+
+        legacy_ms = time_per_request(legacy_usage, db, org_ids, args.repeat)
+        counter_ms = time_per_request(counter_usage, db, org_ids, args.repeat)
+    finally:
+        db.close()
+
+    print(json.dumps({
+        "database": get_engine(url).dialect.name,
+        "documents": args.documents,
+        "organizations": args.orgs,
+        "populate_seconds": round(populate_s, 1),
+        "backfill_seconds": round(backfill_s, 2),
+        "legacy_ms_per_request": round(legacy_ms, 3),
+        "counter_ms_per_request": round(counter_ms, 3),
+        "speedup": round(legacy_ms / counter_ms, 1),
+        "results_identical": True
+    }, indent=2))
+    if tmp_dir:
+        get_engine(url).dispose()
+        os.remove(os.path.join(tmp_dir, "usage.db"))
+        os.rmdir(tmp_dir)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
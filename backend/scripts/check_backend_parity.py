@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Accuracy parity check for the INT8 / ONNX LayoutLM backends against fp32.
+
+Run from backend/:
+    python scripts/check_backend_parity.py --backend int8
+    python scripts/check_backend_parity.py --backend onnx --model models/trained/my_model
+"""
+import argparse
+import json
+import logging
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from transformers import LayoutLMv3ForTokenClassification, LayoutLMv3Processor
+
+from models.inference_backend import build_inference_model, load_annotation_set, check_parity
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+NUM_LABELS = 11  # matches DocumentProcessor.label2id
+
+
+def resolve_model_path(model_arg: str) -> str:
+    """Explicit path/hub id, else the active trained model, else the base checkpoint."""
+    if model_arg:
+        return model_arg
+    active_file = Path("models/active_model.json")
+    if active_file.exists():
+        with active_file.open("r") as f:
+            model_path = json.load(f).get("model_path")
+        if model_path and Path(model_path).exists():
+            return model_path
+    return "microsoft/layoutlmv3-base"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=["int8", "onnx"], required=True)
+    parser.add_argument("--model", default=None, help="Model directory or hub id (default: active model)")
+    parser.add_argument("--annotations", default="data/annotations", help="Held-out annotation directory")
+    parser.add_argument("--limit", type=int, default=None, help="Max documents to evaluate")
+    args = parser.parse_args()
+
+    model_path = resolve_model_path(args.model)
+    logger.info(f"Reference fp32 model: {model_path}")
+    processor = LayoutLMv3Processor.from_pretrained(model_path, apply_ocr=False)
+    reference = LayoutLMv3ForTokenClassification.from_pretrained(model_path, num_labels=NUM_LABELS).eval()
+
+    candidate, used = build_inference_model(reference, args.backend)
+    if used != args.backend:
+        logger.error(f"Backend '{args.backend}' could not be built")
+        return 2
+
+    samples = load_annotation_set(args.annotations, limit=args.limit)
+    if not samples:
+        logger.error(f"No usable annotations found in {args.annotations}")
+        return 2
+
+    report = check_parity(reference, candidate, processor, samples)
+    report.update({"backend": used, "model": model_path})
+    print(json.dumps(report, indent=2))
+    return 0 if report["passed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())